@@ -0,0 +1,698 @@
+"""
+asyncio API for applications that run an event loop (async web servers,
+bots): synthesis without blocking the loop, typed results and cancellation.
+
+    from async_api import synthesize, synthesize_stream
+
+    result = await synthesize("Hello world", "female.wav", timeout=60)
+    result.samples, result.sample_rate, result.timings
+
+    async for frame in synthesize_stream(long_text, "female.wav"):
+        play(frame.samples, frame.sample_rate)
+
+Requests share the worker(s) of make_audio (see get_worker) and its
+scheduler, chunk cache and cost model. Each worker slot granted by the
+scheduler gets its own asyncio connection to the worker, so nothing blocks
+the event loop while the model runs. Cancelling a request (task.cancel(),
+a timeout, leaving an `async for` early) closes its connection: the worker
+stops after the chunk (or stream frame) in progress and the slot goes to
+the next request. With kill_on_cancel=True a worker this process started is
+killed instead, which frees the device at once; a new worker starts for the
+next request.
+
+At most `max_concurrency` requests of a synthesizer run at once, the others
+wait for their turn (asyncio.Semaphore).
+"""
+import asyncio
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_merge import merge_pcm
+from audio_sink import open_sink
+from ipc import send_message_async, recv_message_async, decode_pcm
+from make_audio import (
+    split_text_into_chunks, get_worker, get_scheduler, get_chunk_cache, get_postprocessor,
+    lookup_chunks, record_chunk, load_database, METRICS
+)
+from retry import permanent_errors, backoff_delay
+from voice_bank import sample_id
+from worker_client import WorkerError
+
+ASYNC_CONCURRENCY_KEY = "async_concurrency"
+DEFAULT_CONCURRENCY = 4
+
+# Default synthesizer of each event loop (see get_synthesizer)
+_SYNTHESIZERS = {}
+
+
+class SynthesisError(Exception):
+    """
+    Raised when a request fails. `errors` maps the ids of the chunks that
+    could not be generated to their last error.
+    """
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+class SynthesisTimeout(SynthesisError, TimeoutError):
+    """Raised when a request does not finish within its timeout."""
+
+
+class ChunkResult:
+    """
+    One generated chunk of a SynthesisResult.
+    """
+
+    def __init__(self, chunk_id, text, samples, sample_rate, seconds, cached=False, attempt=1):
+        self.chunk_id = chunk_id
+        self.text = text
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.seconds = seconds  # Worker time, 0 for a cache hit
+        self.cached = cached
+        self.attempt = attempt
+
+    @property
+    def audio_seconds(self):
+        return self.samples.size / self.sample_rate
+
+    def to_dict(self):
+        return {
+            "chunk_id": self.chunk_id,
+            "chars": len(self.text),
+            "audio_seconds": self.audio_seconds,
+            "seconds": self.seconds,
+            "cached": self.cached,
+            "attempt": self.attempt,
+        }
+
+
+class SynthesisResult:
+    """
+    The audio of a request and how long each stage took.
+
+    samples are mono float32 at sample_rate, chunks joined with pauses (and
+    post-processed). timings holds seconds: "split", "queued" (waiting for
+    the first worker slot), "first_chunk" (until the first chunk arrived),
+    "synthesis" (worker time, all chunks), "encode" (output_file) and
+    "total".
+    """
+
+    def __init__(self, samples, sample_rate, chunks, timings, estimated_seconds=None,
+                 output_file=None, output_bytes=None):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.chunks = chunks
+        self.timings = timings
+        self.estimated_seconds = estimated_seconds
+        self.output_file = output_file
+        self.output_bytes = output_bytes
+
+    @property
+    def audio_seconds(self):
+        return self.samples.size / self.sample_rate if self.sample_rate else 0.0
+
+    @property
+    def rtf(self):
+        """
+        Real-time factor of the request: total time per second of audio.
+        """
+        return self.timings["total"] / self.audio_seconds if self.audio_seconds else None
+
+    def to_dict(self):
+        return {
+            "sample_rate": self.sample_rate,
+            "audio_seconds": self.audio_seconds,
+            "rtf": self.rtf,
+            "estimated_seconds": self.estimated_seconds,
+            "timings": dict(self.timings),
+            "output_file": self.output_file,
+            "output_bytes": self.output_bytes,
+            "chunks": [chunk.to_dict() for chunk in self.chunks],
+        }
+
+
+class AudioFrame:
+    """
+    A frame of synthesize_stream: samples of chunk `chunk_id`, frame `index`
+    within it. offset is the position of the frame in the audio and elapsed
+    the time since the request started, both in seconds.
+    """
+
+    def __init__(self, samples, sample_rate, chunk_id, index, offset, elapsed):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.chunk_id = chunk_id
+        self.index = index
+        self.offset = offset
+        self.elapsed = elapsed
+
+    @property
+    def audio_seconds(self):
+        return self.samples.size / self.sample_rate
+
+
+class Grant:
+    """
+    A worker slot granted by the scheduler, held until release().
+    """
+
+    def __init__(self, chunk_ids, worker, stack, error=None):
+        self.chunk_ids = chunk_ids
+        self.worker = worker
+        self.stack = stack
+        self.error = error  # Set if the worker could not be started
+
+    def release(self):
+        self.stack.close()
+
+
+def remaining(deadline):
+    """
+    Seconds left before a time.monotonic() deadline (None: no deadline).
+
+    Raises:
+        SynthesisTimeout: If the deadline has passed.
+    """
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise SynthesisTimeout("Request timed out")
+    return left
+
+
+class AsyncSynthesizer:
+    """
+    Runs synthesis requests from asyncio code (see the module docstring).
+
+    Args:
+        max_concurrency: Requests running at once; the others wait.
+        timeout: Default per-request timeout in seconds (None: no limit).
+        max_attempts: Attempts per chunk for transient errors (timeouts,
+            out of memory, lost worker), with exponential backoff.
+        kill_on_cancel: Kill the worker running a cancelled request instead
+            of letting it finish the chunk in progress (only workers this
+            process started: attached workers are shared).
+        metrics: Metrics to record the requests in (default: make_audio.METRICS).
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_CONCURRENCY, timeout=None, max_attempts=5,
+                 kill_on_cancel=False, metrics=None):
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.kill_on_cancel = kill_on_cancel
+        self.metrics = metrics or METRICS
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.worker = None
+        self.scheduler = None
+        self.cache = None
+        self.executor = None
+        self.setup_lock = asyncio.Lock()
+
+    async def _setup(self):
+        """
+        Gets the worker(s), the scheduler and the chunk cache on first use.
+        They read database.json and the cost model from disk, so this runs
+        in a thread, off the event loop.
+        """
+        async with self.setup_lock:
+            if self.executor is None:
+                self.worker, self.scheduler, self.cache = await asyncio.to_thread(
+                    lambda: (get_worker(), get_scheduler(), get_chunk_cache())
+                )
+                # Threads waiting for a slot of the (thread-based) scheduler:
+                # at most one per slot for each running request
+                self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency * self.scheduler.slots + 1,
+                                                   thread_name_prefix="async-slot")
+
+    async def close(self):
+        """
+        Waits for the slot threads and saves the cost model calibration.
+        """
+        if self.executor is not None:
+            await asyncio.to_thread(self.executor.shutdown)
+            self.executor = None
+            await asyncio.to_thread(self.scheduler.cost_model.save)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # --- Worker slots ---
+
+    def _grant(self, ticket):
+        """
+        Waits for the next slice of the ticket and a worker to run it on
+        (runs in a slot thread).
+
+        Returns:
+            Grant: Or None when the ticket has no chunks left.
+        """
+        chunk_ids = self.scheduler.acquire(ticket)
+        if not chunk_ids:
+            return None
+        stack = contextlib.ExitStack()
+        stack.callback(self.scheduler.release, ticket)
+        worker = stack.enter_context(self.worker.acquire())
+        try:
+            worker.ensure_running()
+        except Exception as e:
+            return Grant(chunk_ids, worker, stack, error=e)
+        return Grant(chunk_ids, worker, stack)
+
+    async def _acquire(self, ticket):
+        """
+        Waits for a worker slot without blocking the event loop. If the
+        wait is cancelled, the ticket is closed and a slot granted in the
+        meantime is given back.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self._grant, ticket)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            self.scheduler.close(ticket)
+
+            def release(future):
+                if not future.cancelled() and future.exception() is None and future.result():
+                    future.result().release()
+            future.add_done_callback(release)
+            raise
+
+    async def _finish(self, grant, cancelled, failed=False):
+        """
+        Gives a slot back. A worker whose connection broke is recovered, as
+        in XttsWorker.request (reconnected to its replacement if it was
+        recycled, restarted otherwise); a cancelled request's worker is
+        killed with kill_on_cancel. Neither blocks a cancellation: the slot is released
+        once the worker is dealt with.
+        """
+        if cancelled and self.kill_on_cancel:
+            action = grant.worker.kill
+        elif failed:
+            action = grant.worker.recover
+        else:
+            grant.release()
+            return
+
+        def run():
+            try:
+                action()
+            except Exception:
+                # The next ensure_running starts a new worker
+                pass
+            finally:
+                grant.release()
+
+        future = asyncio.get_running_loop().run_in_executor(self.executor, run)
+        if not cancelled:
+            await future
+
+    async def _run_slice(self, grant, chunks, sample_file, language, speed, results, done):
+        """
+        Generates the chunks of a grant on its worker through a connection
+        of its own, putting (chunk_id, part, error, seconds) on results and
+        the chunk ids in done.
+        """
+        reader, writer = await asyncio.open_unix_connection(grant.worker.socket_path)
+        try:
+            await send_message_async(writer, {
+                "op": "batch",
+                "chunks": [{"id": chunk_id, "text": chunks[chunk_id]} for chunk_id in grant.chunk_ids],
+                "sample_file": sample_id(sample_file),
+                "language": language,
+                "speed": speed,
+                "dtype": "float32"
+            })
+            # Ids come back through JSON; map them to the caller's keys
+            ids = {str(chunk_id): chunk_id for chunk_id in grant.chunk_ids}
+            started = time.perf_counter()
+            while True:
+                response, payload = await recv_message_async(reader)
+                if response.get("done"):
+                    return
+                if "id" not in response:
+                    raise WorkerError.from_response(response)
+
+                chunk_id = ids.get(str(response["id"]), response["id"])
+                seconds = time.perf_counter() - started
+                done.add(chunk_id)
+                if response["status"] == "ok":
+                    results.put_nowait((chunk_id, decode_pcm(response, payload), None, seconds))
+                else:
+                    results.put_nowait((chunk_id, None, WorkerError.from_response(response), seconds))
+                started = time.perf_counter()
+        finally:
+            # Closing the connection mid-request stops the worker's batch
+            writer.close()
+
+    async def _slot(self, ticket, chunks, sample_file, language, speed, results):
+        """
+        One worker slot of a request: runs slices until the ticket is done.
+        """
+        while True:
+            grant = await self._acquire(ticket)
+            if grant is None:
+                return
+            done = set()
+            cancelled = failed = False
+            error = grant.error
+            try:
+                if error is None:
+                    await self._run_slice(grant, chunks, sample_file, language, speed, results, done)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            except WorkerError as e:
+                error = e
+            except (OSError, ConnectionError, ValueError) as e:
+                # The worker died or hung up: recover it, the chunks are retried
+                failed = True
+                error = WorkerError(f"Worker failed mid-request: {e}", transient=True)
+                error.__cause__ = e
+            finally:
+                if not cancelled and error is not None:
+                    for chunk_id in grant.chunk_ids:
+                        if chunk_id not in done:
+                            results.put_nowait((chunk_id, None, error, 0.0))
+                await self._finish(grant, cancelled, failed)
+
+    async def _iter_chunks(self, chunks, sample_file, language, speed, use_cache, weight, timings):
+        """
+        Async counterpart of make_audio.iter_audio_batch: yields (chunk_id,
+        (samples, sample_rate) or None, error or None, worker seconds) in
+        completion order, cache hits first (seconds is None for them).
+        """
+        cache = self.cache if use_cache else None
+        hits, misses, keys = await asyncio.to_thread(lookup_chunks, chunks, sample_file, language, speed,
+                                                     cache, self.metrics)
+        for chunk_id, part in hits.items():
+            yield chunk_id, part, None, None
+
+        if not misses:
+            return
+
+        ticket = self.scheduler.open(misses, language, speed, weight)
+        results = asyncio.Queue()
+        waiting_since = time.perf_counter()
+        slots = [asyncio.ensure_future(self._slot(ticket, misses, sample_file, language, speed, results))
+                 for _ in range(min(self.scheduler.slots, len(misses)))]
+        try:
+            for _ in range(len(misses)):
+                chunk_id, part, error, seconds = await results.get()
+                if "queued" not in timings:
+                    timings["queued"] = time.perf_counter() - waiting_since - seconds
+                # The cache write goes to disk
+                await asyncio.to_thread(record_chunk, misses[chunk_id], part, error, seconds, language, speed,
+                                        self.scheduler.cost_model, cache, keys.get(chunk_id), self.metrics)
+                yield chunk_id, part, error, seconds
+        finally:
+            # If the request stopped early, the chunks not started are dropped
+            self.scheduler.close(ticket)
+            for slot in slots:
+                slot.cancel()
+            await asyncio.gather(*slots, return_exceptions=True)
+            await asyncio.to_thread(self.scheduler.cost_model.save)
+
+    # --- Requests ---
+
+    async def synthesize(self, text, sample_file, language="en", speed=1.0, max_chars=2000,
+                         timeout=None, use_cache=True, postprocess=None, pause_ms=200,
+                         output_file=None, bitrate="192k", weight=1.0):
+        """
+        Generates the audio of a text.
+
+        Args:
+            text: Text to be converted to audio.
+            sample_file: Voice sample file, or "voice:<name>" of the voice bank.
+            language: Audio language.
+            speed: Speech speed.
+            max_chars: Maximum characters per chunk, capped by the XTTS
+                limit of the language (see split_text_into_chunks).
+            timeout: Seconds before the request is cancelled (default: the
+                synthesizer's timeout).
+            use_cache: Look chunks up in (and add them to) the chunk cache.
+            postprocess: Post-processing options (see make_audio.get_postprocessor).
+            pause_ms: Silence between chunks.
+            output_file: Also encode the audio to this file (format from
+                the extension, see audio_sink.open_sink).
+            bitrate: Bitrate of compressed formats.
+            weight: Priority of the request (see make_audio.get_scheduler).
+
+        Returns:
+            SynthesisResult: The audio and its timings.
+
+        Raises:
+            SynthesisTimeout: If the timeout expired.
+            SynthesisError: If chunks could not be generated.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(
+                self._synthesize(text, sample_file, language, speed, max_chars, use_cache,
+                                 postprocess, pause_ms, output_file, bitrate, weight),
+                timeout
+            )
+        except asyncio.TimeoutError as e:
+            raise SynthesisTimeout(f"Request timed out after {timeout}s") from e
+
+    async def _synthesize(self, text, sample_file, language, speed, max_chars, use_cache,
+                          postprocess, pause_ms, output_file, bitrate, weight):
+        start = time.perf_counter()
+        async with self.semaphore:
+            await self._setup()
+            timings = {}
+            with self.metrics.stage("split", chars=len(text or "")):
+                chunks = split_text_into_chunks(text, max_chars, language)
+            if not chunks:
+                raise SynthesisError("Empty or invalid text")
+            timings["split"] = time.perf_counter() - start
+            chunks = dict(enumerate(chunks, 1))
+            estimated = self.scheduler.cost_model.estimate(chunks.values(), language, speed)
+
+            post = get_postprocessor(postprocess, self.metrics)
+            parts = {}
+            pending = dict(chunks)
+            errors = {}
+            try:
+                for attempt in range(1, self.max_attempts + 1):
+                    if not pending:
+                        break
+                    errors = {}
+                    generated = self._iter_chunks(pending, sample_file, language, speed, use_cache,
+                                                  weight, timings)
+                    try:
+                        async for chunk_id, part, error, seconds in generated:
+                            if error is None and part[0].size:
+                                if "first_chunk" not in timings:
+                                    timings["first_chunk"] = time.perf_counter() - start
+                                parts[chunk_id] = (seconds or 0.0, seconds is None, attempt)
+                                post.submit(chunk_id, *part)
+                            else:
+                                errors[chunk_id] = error or "Worker returned empty audio"
+                    finally:
+                        await generated.aclose()
+                    pending = {i: chunk for i, chunk in pending.items() if i not in parts}
+
+                    if permanent_errors(pending, errors):
+                        break
+                    if pending and attempt < self.max_attempts:
+                        await asyncio.sleep(backoff_delay(attempt))
+
+                if pending:
+                    raise SynthesisError(
+                        f"Failed to generate chunk(s): {', '.join(map(str, pending))}",
+                        {i: errors.get(i) for i in pending}
+                    )
+                processed = await asyncio.to_thread(post.results)
+            finally:
+                await asyncio.to_thread(post.close)
+
+            sample_rate = processed[1][1]
+            results = []
+            for chunk_id, text_chunk in chunks.items():
+                seconds, cached, attempt = parts[chunk_id]
+                samples, _ = processed[chunk_id]
+                results.append(ChunkResult(chunk_id, text_chunk, samples, sample_rate, seconds, cached, attempt))
+            timings["synthesis"] = sum(chunk.seconds for chunk in results)
+            timings.setdefault("queued", 0.0)
+            samples = merge_pcm([chunk.samples for chunk in results], sample_rate, pause_ms)
+
+            output_bytes = None
+            if output_file:
+                encode_start = time.perf_counter()
+                output_bytes = (await asyncio.to_thread(write_output, output_file, samples, sample_rate,
+                                                        bitrate))["bytes"]
+                timings["encode"] = time.perf_counter() - encode_start
+            timings["total"] = time.perf_counter() - start
+
+        return SynthesisResult(samples, sample_rate, results, timings, estimated, output_file, output_bytes)
+
+    async def synthesize_stream(self, text, sample_file, language="en", speed=1.0, max_chars=2000,
+                                timeout=None, weight=1.0, stream_chunk_size=20):
+        """
+        Generates the audio of a text and yields it in frames as soon as the
+        model produces them (async counterpart of make_audio.stream_audio).
+        Leaving the loop early cancels the request.
+
+        Args:
+            timeout: Seconds for the whole stream (default: the
+                synthesizer's timeout).
+            Others: See synthesize.
+
+        Yields:
+            AudioFrame: Mono float32 frames, in order.
+
+        Raises:
+            SynthesisTimeout: If the timeout expired.
+            SynthesisError: If a chunk failed (frames already yielded stay valid).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), remaining(deadline))
+        except asyncio.TimeoutError as e:
+            raise SynthesisTimeout(f"Request timed out after {timeout}s") from e
+        try:
+            await self._setup()
+            chunks = split_text_into_chunks(text, max_chars, language)
+            if not chunks:
+                raise SynthesisError("Empty or invalid text")
+            chunks = dict(enumerate(chunks, 1))
+            ticket = self.scheduler.open(chunks, language, speed, weight)
+            offset = 0.0
+            try:
+                while True:
+                    try:
+                        grant = await asyncio.wait_for(self._acquire(ticket), remaining(deadline))
+                    except asyncio.TimeoutError as e:
+                        raise SynthesisTimeout(f"Request timed out after {timeout}s") from e
+                    if grant is None:
+                        return
+                    if grant.error is not None:
+                        grant.release()
+                        raise SynthesisError(str(grant.error), {i: grant.error for i in grant.chunk_ids})
+
+                    cancelled = failed = False
+                    try:
+                        reader, writer = await asyncio.open_unix_connection(grant.worker.socket_path)
+                        try:
+                            for chunk_id in grant.chunk_ids:
+                                frames = self._stream_chunk(reader, writer, chunks[chunk_id], sample_file,
+                                                            language, speed, stream_chunk_size, deadline)
+                                async for index, samples, sample_rate in frames:
+                                    frame = AudioFrame(samples, sample_rate, chunk_id, index, offset,
+                                                       time.perf_counter() - start)
+                                    offset += frame.audio_seconds
+                                    yield frame
+                        finally:
+                            # Closing the connection mid-chunk stops the worker
+                            writer.close()
+                    except (asyncio.CancelledError, GeneratorExit, SynthesisTimeout):
+                        cancelled = True
+                        raise
+                    except (OSError, ConnectionError, ValueError) as e:
+                        failed = True
+                        raise SynthesisError(f"Worker failed mid-request: {e}") from e
+                    finally:
+                        await self._finish(grant, cancelled, failed)
+            finally:
+                self.scheduler.close(ticket)
+        finally:
+            self.semaphore.release()
+
+    async def _stream_chunk(self, reader, writer, text, sample_file, language, speed,
+                            stream_chunk_size, deadline):
+        """
+        Streams one chunk on an open worker connection.
+
+        Yields:
+            tuple: (frame index, samples, sample_rate)
+        """
+        await send_message_async(writer, {
+            "op": "stream",
+            "text": text,
+            "sample_file": sample_id(sample_file),
+            "language": language,
+            "speed": speed,
+            "dtype": "float32",
+            "stream_chunk_size": stream_chunk_size
+        })
+        latency = 0.0
+        audio_seconds = 0.0
+        index = 0
+        while True:
+            # Only time spent waiting for the worker counts, not the consumer's
+            waiting_since = time.perf_counter()
+            try:
+                response, payload = await asyncio.wait_for(recv_message_async(reader), remaining(deadline))
+            except asyncio.TimeoutError as e:
+                raise SynthesisTimeout("Request timed out") from e
+            latency += time.perf_counter() - waiting_since
+            if response.get("status") != "ok":
+                raise SynthesisError(response.get("error", "Unknown worker error"))
+            if response.get("done"):
+                break
+            samples, sample_rate = decode_pcm(response, payload)
+            audio_seconds += samples.size / sample_rate
+            yield index, samples, sample_rate
+            index += 1
+        self.metrics.observe("synthesis", latency, len(text), audio_seconds)
+
+
+def write_output(output_file, samples, sample_rate, bitrate="192k"):
+    """
+    Encodes samples to output_file (see audio_sink.open_sink).
+
+    Returns:
+        dict: {"audio_seconds", "bytes"} of the output.
+    """
+    sink = open_sink(output_file, sample_rate, bitrate)
+    try:
+        sink.write(samples)
+    except BaseException:
+        sink.abort()
+        raise
+    return sink.close()
+
+
+def get_synthesizer():
+    """
+    Returns the default synthesizer of the running event loop, created on
+    first use with "async_concurrency" of database.json as its
+    max_concurrency.
+    """
+    loop = asyncio.get_running_loop()
+    synthesizer = _SYNTHESIZERS.get(loop)
+    if synthesizer is None:
+        for other in [other for other in _SYNTHESIZERS if other.is_closed()]:
+            del _SYNTHESIZERS[other]
+        concurrency = load_database().get(ASYNC_CONCURRENCY_KEY, DEFAULT_CONCURRENCY)
+        synthesizer = _SYNTHESIZERS[loop] = AsyncSynthesizer(concurrency)
+    return synthesizer
+
+
+async def synthesize(text, sample_file, **options):
+    """
+    Generates the audio of a text with the default synthesizer (see
+    AsyncSynthesizer.synthesize).
+    """
+    return await get_synthesizer().synthesize(text, sample_file, **options)
+
+
+def synthesize_stream(text, sample_file, **options):
+    """
+    Streams the audio of a text with the default synthesizer (see
+    AsyncSynthesizer.synthesize_stream). Call it from the event loop.
+    """
+    return get_synthesizer().synthesize_stream(text, sample_file, **options)
@@ -0,0 +1,82 @@
+import numpy as np
+
+
+def to_float32(samples):
+    """
+    Returns mono float32 samples in [-1, 1] (int16 input is rescaled).
+    """
+    samples = np.asarray(samples).reshape(-1)
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32, copy=False)
+
+
+def to_int16(samples):
+    """
+    Converts float samples in [-1, 1] to int16 PCM.
+    """
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def merged_length(lengths, pause, crossfade):
+    """
+    Number of samples of the merged audio, given the part lengths and the
+    pause/crossfade sizes in samples.
+    """
+    total = sum(lengths)
+    for previous, current in zip(lengths, lengths[1:]):
+        if crossfade:
+            total -= min(crossfade, previous, current)
+        else:
+            total += pause
+    return total
+
+
+def merge_pcm(parts, sample_rate, pause_ms=200, crossfade_ms=0):
+    """
+    Joins mono PCM parts into one buffer in a single pass.
+
+    The output length is known up front, so the result is allocated once
+    and every part is copied exactly once (linear time and memory, unlike
+    repeated concatenation).
+
+    Args:
+        parts: List of 1-D sample arrays (float32 or int16).
+        sample_rate: Sample rate shared by all parts.
+        pause_ms: Silence inserted between parts.
+        crossfade_ms: If set, adjacent parts overlap by this duration with a
+            linear crossfade instead of being separated by silence.
+
+    Returns:
+        numpy.ndarray: Merged float32 samples.
+    """
+    parts = [to_float32(part) for part in parts]
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+
+    pause = int(sample_rate * pause_ms / 1000)
+    crossfade = int(sample_rate * crossfade_ms / 1000)
+
+    # Zeros double as the silence between parts
+    merged = np.zeros(merged_length([len(p) for p in parts], pause, crossfade), dtype=np.float32)
+
+    position = 0
+    for i, part in enumerate(parts):
+        overlap = 0
+        if i:
+            if crossfade:
+                overlap = min(crossfade, len(parts[i - 1]), len(part))
+                position -= overlap
+            else:
+                position += pause
+
+        if overlap:
+            fade_in = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+            window = merged[position:position + overlap]
+            window *= 1.0 - fade_in
+            window += part[:overlap] * fade_in
+
+        merged[position + overlap:position + len(part)] = part[overlap:]
+        position += len(part)
+
+    return merged
@@ -0,0 +1,281 @@
+import os
+import shutil
+import subprocess
+import threading
+import wave
+
+import numpy as np
+
+from audio_merge import to_int16
+
+
+class WavSink:
+    """
+    Writes mono 16-bit PCM to a WAV file as it arrives.
+    """
+
+    def __init__(self, output_file, sample_rate):
+        self.output_file = output_file
+        self.tmp_file = f"{output_file}.part"
+        self.sample_rate = sample_rate
+        self.num_samples = 0
+        self.file = wave.open(self.tmp_file, 'wb')
+        self.file.setnchannels(1)
+        self.file.setsampwidth(2)
+        self.file.setframerate(sample_rate)
+
+    def _write_pcm(self, pcm):
+        self.file.writeframes(pcm.tobytes())
+
+    def write(self, samples):
+        """
+        Appends mono samples (float32 in [-1, 1] or int16).
+        """
+        pcm = samples if samples.dtype == np.int16 else to_int16(samples)
+        self._write_pcm(pcm)
+        self.num_samples += pcm.size
+
+    def write_silence(self, ms):
+        if ms > 0:
+            self.write(np.zeros(int(self.sample_rate * ms / 1000), dtype=np.int16))
+
+    def _finish(self):
+        # wave patches the header sizes on close
+        self.file.close()
+
+    def close(self):
+        """
+        Finalizes the file.
+
+        Returns:
+            dict: {"audio_seconds", "bytes"} of the output.
+        """
+        self._finish()
+        os.replace(self.tmp_file, self.output_file)
+        return {
+            "audio_seconds": self.num_samples / self.sample_rate,
+            "bytes": os.path.getsize(self.output_file),
+        }
+
+    def abort(self):
+        """
+        Stops writing and removes the partial output.
+        """
+        try:
+            self._finish()
+        except Exception:
+            pass
+        if os.path.exists(self.tmp_file):
+            os.remove(self.tmp_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+
+class FfmpegSink(WavSink):
+    """
+    Encodes mono 16-bit PCM with an ffmpeg process fed through a pipe, so
+    compressed output (MP3, FLAC, Opus, AAC) is produced while the audio is
+    still being generated, without holding it in memory.
+    """
+
+    def __init__(self, output_file, sample_rate, fmt="mp3", codec_args=("-b:a", "192k")):
+        self.output_file = output_file
+        self.tmp_file = f"{output_file}.part"
+        self.sample_rate = sample_rate
+        self.num_samples = 0
+        self.process = subprocess.Popen(
+            [encoder_name(), "-hide_banner", "-loglevel", "error", "-y",
+             "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+             *codec_args, "-f", fmt, self.tmp_file],
+            stdin=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+
+    def _write_pcm(self, pcm):
+        try:
+            self.process.stdin.write(memoryview(pcm.astype("<i2", copy=False)).cast("B"))
+        except BrokenPipeError:
+            raise RuntimeError(f"Encoder exited: {self.process.stderr.read().decode(errors='replace')}")
+
+    def _finish(self):
+        self.process.stdin.close()
+        error = self.process.stderr.read().decode(errors="replace")
+        if self.process.wait() != 0:
+            raise RuntimeError(f"Encoder failed: {error.strip()}")
+
+    def abort(self):
+        self.process.kill()
+        self.process.wait()
+        if os.path.exists(self.tmp_file):
+            os.remove(self.tmp_file)
+
+
+# Compressed output formats: name -> (ffmpeg muxer, codec arguments, uses a bitrate)
+FORMATS = {
+    "mp3": ("mp3", ("-c:a", "libmp3lame"), True),
+    "flac": ("flac", ("-c:a", "flac"), False),
+    "ogg": ("ogg", ("-c:a", "libopus"), True),
+    "opus": ("opus", ("-c:a", "libopus"), True),
+    "m4a": ("ipod", ("-c:a", "aac"), True),
+}
+
+
+def encoder_name():
+    """
+    Returns the ffmpeg (or avconv) executable.
+    """
+    return shutil.which("ffmpeg") or shutil.which("avconv") or "ffmpeg"
+
+
+def output_format(output_file, fmt=None):
+    """
+    Returns the output format of a file: `fmt` if given, otherwise its
+    extension; unknown extensions are written as MP3.
+    """
+    fmt = (fmt or os.path.splitext(output_file)[1]).lower().lstrip(".")
+    return fmt if fmt == "wav" or fmt in FORMATS else "mp3"
+
+
+def is_lossless(output_file, fmt=None):
+    """
+    Tells whether output_file is written in a lossless format (WAV, FLAC).
+    """
+    return output_format(output_file, fmt) in ("wav", "flac")
+
+
+def open_sink(output_file, sample_rate, bitrate="192k", fmt=None):
+    """
+    Returns a streaming writer for output_file. The format is `fmt` (wav,
+    mp3, flac, ogg/opus, m4a) or chosen by the extension: WAV is written
+    directly, the others are encoded through a single ffmpeg process.
+    """
+    fmt = output_format(output_file, fmt)
+    if fmt == "wav":
+        return WavSink(output_file, sample_rate)
+
+    muxer, codec_args, uses_bitrate = FORMATS[fmt]
+    if uses_bitrate and bitrate:
+        codec_args += ("-b:a", str(bitrate))
+    return FfmpegSink(output_file, sample_rate, muxer, codec_args)
+
+
+def decode_audio(input_file, sample_rate, raw_file):
+    """
+    Decodes an audio file (any format ffmpeg reads) to mono 16-bit PCM at
+    sample_rate in raw_file, and maps it without loading it in memory.
+
+    Returns:
+        np.memmap: int16 samples (empty array for an empty file).
+    """
+    result = subprocess.run(
+        [encoder_name(), "-hide_banner", "-loglevel", "error", "-y", "-i", input_file,
+         "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), raw_file],
+        stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not decode {input_file}: {result.stderr.decode(errors='replace').strip()}")
+    if os.path.getsize(raw_file) == 0:
+        return np.zeros(0, dtype=np.int16)
+    return np.memmap(raw_file, dtype="<i2", mode="r")
+
+
+class OrderedWriter:
+    """
+    Writes numbered parts to a sink in order while they arrive in any
+    order (several workers, retries): each part is written as soon as all
+    the parts before it are, with a pause between parts, so encoding
+    overlaps with inference.
+
+    The sink is opened with open_sink(sample_rate) when the first part
+    arrives. Parts must all have the same sample rate. `fill(part_id)`
+    may provide parts that are never added (e.g. audio reused from a
+    previous render): it is called when such a part is next in order and
+    returns (samples, sample_rate), or None if the part will be added.
+    lengths records the number of samples written for each part.
+    """
+
+    def __init__(self, open_sink, pause_ms=200, first_id=1, metrics=None, fill=None):
+        self.open_sink = open_sink
+        self.pause_ms = pause_ms
+        self.next_id = first_id
+        self.metrics = metrics
+        self.fill = fill
+        self.sink = None
+        self.waiting = {}
+        self.lengths = {}
+        self.lock = threading.Lock()
+
+    def add(self, part_id, samples, sample_rate):
+        """
+        Queues a part (same signature as the on_result callbacks) and writes
+        every part that is now in order.
+        """
+        with self.lock:
+            self.waiting[part_id] = (samples, sample_rate)
+            self._flush()
+
+    def flush(self):
+        """
+        Writes the parts that are in order without waiting for an add():
+        with `fill`, the leading parts of the output.
+        """
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        while True:
+            part = self.waiting.pop(self.next_id, None)
+            if part is None and self.fill is not None:
+                part = self.fill(self.next_id)
+            if part is None:
+                return
+            self._write(*part)
+            self.lengths[self.next_id] = len(part[0])
+            self.next_id += 1
+
+    def _write(self, samples, sample_rate):
+        if self.sink is None:
+            self.sink = self.open_sink(sample_rate)
+        elif sample_rate != self.sink.sample_rate:
+            raise ValueError(f"Part at {sample_rate} Hz in a {self.sink.sample_rate} Hz output")
+        elif self.pause_ms:
+            self.sink.write_silence(self.pause_ms)
+
+        if self.metrics is None:
+            self.sink.write(samples)
+            return
+        with self.metrics.stage("export") as record:
+            record["audio_seconds"] = samples.size / sample_rate
+            self.sink.write(samples)
+
+    def close(self):
+        """
+        Finalizes the output once every part was added.
+
+        Returns:
+            dict: {"audio_seconds", "bytes"} of the output.
+
+        Raises:
+            RuntimeError: If parts are missing.
+        """
+        with self.lock:
+            self._flush()
+            if self.sink is None or self.waiting:
+                missing = self.next_id
+                self.abort()
+                raise RuntimeError(f"Part {missing} is missing, output not written")
+            return self.sink.close()
+
+    def abort(self):
+        """
+        Stops writing and removes the partial output.
+        """
+        if self.sink is not None:
+            self.sink.abort()
+            self.sink = None
+        self.waiting = {}
@@ -0,0 +1,221 @@
+import hashlib
+import time
+
+import numpy as np
+
+BACKENDS = ("xtts", "stub")
+
+
+class Backend:
+    """
+    Inference interface used by core.py.
+
+    A backend turns (text, voice latents) into mono float32 samples at
+    `sample_rate`; everything around it (chunking, caching, IPC, merging,
+    encoding) is shared, so any backend can be dropped into the pipeline.
+    """
+
+    name = "base"
+    device = "cpu"
+    sample_rate = 24000
+    supports_streaming = False
+
+    def version(self):
+        """
+        Identifies the model for cache keys.
+        """
+        return self.name
+
+    def get_conditioning_latents(self, audio_sample_file):
+        """
+        Returns (gpt_cond_latent, speaker_embedding) for a voice sample.
+        """
+        raise NotImplementedError
+
+    def latents_from_numpy(self, gpt_cond_latent, speaker_embedding):
+        """
+        Converts latents stored as float32 arrays (voice bank) to the type
+        inference() expects.
+        """
+        return gpt_cond_latent, speaker_embedding
+
+    def inference(self, text, language, gpt_cond_latent, speaker_embedding, speed=1.0):
+        """
+        Returns the audio of one chunk as mono float32 samples.
+        """
+        raise NotImplementedError
+
+    def inference_stream(self, text, language, gpt_cond_latent, speaker_embedding,
+                         speed=1.0, stream_chunk_size=20):
+        """
+        Yields the audio of one chunk as several float32 frames.
+        """
+        yield self.inference(text, language, gpt_cond_latent, speaker_embedding, speed)
+
+    def token_len(self, text, language):
+        """
+        Returns the number of model tokens of a text (0 without a tokenizer).
+        """
+        return 0
+
+    def memory_stats(self):
+        """
+        Returns the allocator statistics of the device, in MB (empty on CPU).
+        """
+        return {}
+
+    def release_memory(self):
+        """
+        Returns cached, unused device memory to the driver.
+        """
+
+
+class XttsBackend(Backend):
+    """
+    Coqui XTTS-v2 model (see core.my_model for loading).
+    """
+
+    name = "xtts"
+
+    def __init__(self, model, version=""):
+        self.model = model
+        self.device = model.device
+        self._version = version
+        self.supports_streaming = hasattr(model, "inference_stream")
+
+    def version(self):
+        return self._version
+
+    def get_conditioning_latents(self, audio_sample_file):
+        return self.model.get_conditioning_latents(audio_sample_file)
+
+    def latents_from_numpy(self, gpt_cond_latent, speaker_embedding):
+        import torch
+        return (torch.from_numpy(gpt_cond_latent).to(self.device),
+                torch.from_numpy(speaker_embedding).to(self.device))
+
+    def inference(self, text, language, gpt_cond_latent, speaker_embedding, speed=1.0):
+        out = self.model.inference(
+            text=text,
+            language=language,
+            gpt_cond_latent=gpt_cond_latent,
+            speaker_embedding=speaker_embedding,
+            speed=speed,
+            # Chunks already fit the model limits (text_splitter); this is
+            # only a safety net for unexpected input
+            enable_text_splitting=True
+        )
+        return to_numpy(out["wav"])
+
+    def inference_stream(self, text, language, gpt_cond_latent, speaker_embedding,
+                         speed=1.0, stream_chunk_size=20):
+        if not self.supports_streaming:
+            yield from super().inference_stream(text, language, gpt_cond_latent, speaker_embedding, speed)
+            return
+
+        frames = self.model.inference_stream(
+            text,
+            language,
+            gpt_cond_latent,
+            speaker_embedding,
+            stream_chunk_size=stream_chunk_size,
+            speed=speed,
+            enable_text_splitting=True
+        )
+        for frame in frames:
+            yield to_numpy(frame)
+
+    def token_len(self, text, language):
+        return len(self.model.tokenizer.encode(text, lang=language))
+
+    def memory_stats(self):
+        if str(self.device).split(":")[0] != "cuda":
+            return {}
+        import torch
+        return {
+            "cuda_allocated_mb": torch.cuda.memory_allocated(self.device) / 2 ** 20,
+            "cuda_reserved_mb": torch.cuda.memory_reserved(self.device) / 2 ** 20,
+            "cuda_peak_allocated_mb": torch.cuda.max_memory_allocated(self.device) / 2 ** 20,
+        }
+
+    def release_memory(self):
+        if str(self.device).split(":")[0] == "cuda":
+            import torch
+            torch.cuda.empty_cache()
+
+
+class StubBackend(Backend):
+    """
+    Deterministic CPU stand-in for XTTS, for measuring and testing the
+    pipeline without a GPU or the model weights.
+
+    The same text, voice, language and speed always give the same samples.
+    Output length follows the text length (about `chars_per_second`
+    characters per second of audio at speed 1.0), and each call sleeps
+    `rtf` seconds per second of audio generated, so timings look like a
+    real model with that real-time factor.
+    """
+
+    name = "stub"
+
+    def __init__(self, rtf=0.3, chars_per_second=15.0, latent_seconds=0.05):
+        self.rtf = rtf
+        self.chars_per_second = chars_per_second
+        self.latent_seconds = latent_seconds
+        self.supports_streaming = True
+
+    def get_conditioning_latents(self, audio_sample_file):
+        with open(audio_sample_file, 'rb') as f:
+            digest = hashlib.sha256(f.read()).digest()
+        time.sleep(self.latent_seconds)
+
+        rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+        # Same shapes as the XTTS latents
+        gpt_cond_latent = rng.standard_normal((1, 32, 1024), dtype=np.float32)
+        speaker_embedding = rng.standard_normal((1, 512, 1), dtype=np.float32)
+        return gpt_cond_latent, speaker_embedding
+
+    def num_samples(self, text, speed=1.0):
+        seconds = max(len(text), 1) / (self.chars_per_second * max(speed, 0.1))
+        return int(seconds * self.sample_rate)
+
+    def inference(self, text, language, gpt_cond_latent, speaker_embedding, speed=1.0):
+        return np.concatenate(list(self.inference_stream(
+            text, language, gpt_cond_latent, speaker_embedding, speed, stream_chunk_size=1 << 30
+        )))
+
+    def inference_stream(self, text, language, gpt_cond_latent, speaker_embedding,
+                         speed=1.0, stream_chunk_size=20):
+        seed = hashlib.sha256(
+            f"{text}\0{language}\0{float(speed):.4f}\0{float(speaker_embedding.ravel()[0]):.6f}".encode("utf-8")
+        ).digest()
+        rng = np.random.default_rng(int.from_bytes(seed[:8], "little"))
+
+        total = self.num_samples(text, speed)
+        # XTTS yields about 1024 samples per GPT token
+        frame_size = max(stream_chunk_size * 1024, 1)
+        pitch = rng.uniform(90.0, 220.0)
+
+        for start in range(0, total, frame_size):
+            count = min(frame_size, total - start)
+            time.sleep(count / self.sample_rate * self.rtf)
+
+            t = np.arange(start, start + count, dtype=np.float32) / self.sample_rate
+            # Voiced tone with a syllable-rate envelope, plus a little noise
+            envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4.0 * t)
+            frame = 0.3 * envelope * np.sin(2 * np.pi * pitch * t)
+            frame += 0.01 * rng.standard_normal(count).astype(np.float32)
+            yield frame.astype(np.float32)
+
+    def token_len(self, text, language):
+        # Roughly what the XTTS BPE tokenizer gives for Latin scripts
+        return len(text) // 2 + 1
+
+
+def to_numpy(wav):
+    """
+    Converts a model output (torch tensor, list or array) to mono float32 samples.
+    """
+    if hasattr(wav, "detach"):
+        wav = wav.detach().cpu().numpy()
+    return np.ascontiguousarray(wav, dtype=np.float32).reshape(-1)
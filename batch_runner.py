@@ -0,0 +1,198 @@
+"""
+Bulk synthesis from a JSONL file, one request per line:
+
+    {"text": "...", "output_file": "out/1.mp3", "sample_file": "female.wav", "language": "en", "speed": 1.0}
+
+Usage:
+    python batch_runner.py requests.jsonl --results results.jsonl
+
+Records are read lazily in windows; inside a window they are grouped by
+voice, so consecutive requests reuse the worker's cached latents. Every
+finished record is appended to the results manifest right away, so after a
+crash the same command resumes without redoing finished records. Records
+whose output was already produced (same output_file) are skipped, and
+identical requests (same text, voice, format and post-processing) with a
+different output_file get a copy of the first output instead of being
+synthesized again.
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import time
+
+from audio_sink import output_format
+from make_audio import make_audio, request_key, postprocess_options
+
+
+def read_records(input_file):
+    """
+    Yields (line_number, record or None, error) for each non-empty line.
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+                continue
+
+            missing = [k for k in ("text", "output_file", "sample_file") if not record.get(k)]
+            if missing:
+                yield line_number, None, f"Missing field(s): {', '.join(missing)}"
+            else:
+                yield line_number, record, None
+
+
+def load_manifest(results_file):
+    """
+    Reads the results of previous runs.
+
+    Returns:
+        tuple: ({output_file: request key} of completed records,
+                {request key: output_file} to copy duplicates from,
+                {(line, error)} of invalid lines already reported)
+    """
+    completed = {}
+    outputs = {}
+    invalid = set()
+    if not os.path.exists(results_file):
+        return completed, outputs, invalid
+
+    with open(results_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash
+                continue
+            if result.get("status") in ("ok", "copied") and os.path.exists(result["output_file"]):
+                completed[result["output_file"]] = result["key"]
+                outputs.setdefault(result["key"], result["output_file"])
+            elif result.get("status") == "invalid":
+                invalid.add((result.get("line"), result.get("error")))
+
+    return completed, outputs, invalid
+
+
+class BatchRunner:
+    """
+    Runs a JSONL request file and keeps an append-only results manifest.
+    """
+
+    def __init__(self, results_file, window=256, max_chars=2000):
+        self.results_file = results_file
+        self.window = window
+        self.max_chars = max_chars
+        self.completed, self.outputs, self.invalid = load_manifest(results_file)
+        # Post-processing of every record (database.json), part of the request key
+        self.postprocess = postprocess_options()
+        self.counts = {"ok": 0, "copied": 0, "skipped": 0, "failed": 0, "invalid": 0}
+
+    def record_result(self, result):
+        """
+        Appends one result and makes sure it reaches the disk before moving on.
+        """
+        self.counts[result["status"]] += 1
+        with open(self.results_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def run(self, input_file):
+        records = read_records(input_file)
+        while True:
+            window = list(itertools.islice(records, self.window))
+            if not window:
+                break
+            self.run_window(window)
+        return self.counts
+
+    def run_window(self, window):
+        valid = []
+        for line_number, record, error in window:
+            if error is not None:
+                print(f"⚠️  Line {line_number}: {error}")
+                if (line_number, error) in self.invalid:
+                    # Reported by a previous run
+                    self.counts["invalid"] += 1
+                else:
+                    self.invalid.add((line_number, error))
+                    self.record_result({"line": line_number, "status": "invalid", "error": error})
+            else:
+                valid.append((line_number, record))
+
+        # Same voice back to back: its latents stay hot in the worker cache
+        valid.sort(key=lambda item: (os.path.abspath(os.path.expanduser(item[1]["sample_file"])), item[0]))
+
+        for line_number, record in valid:
+            self.run_record(line_number, record)
+
+    def run_record(self, line_number, record):
+        output_file = os.path.abspath(os.path.expanduser(record["output_file"]))
+        sample_file = os.path.expanduser(record["sample_file"])
+        language = record.get("language", "en")
+        speed = float(record.get("speed", 1.0))
+        key = request_key(record["text"], sample_file, language, speed, {
+            "format": output_format(output_file),
+            "postprocess": self.postprocess,
+            "max_chars": self.max_chars,
+        })
+
+        result = {"line": line_number, "output_file": output_file, "key": key}
+
+        # 1. Already produced by this or a previous run
+        if self.completed.get(output_file) == key and os.path.exists(output_file):
+            print(f"⏭️  Line {line_number}: already done ({output_file})")
+            self.counts["skipped"] += 1
+            return
+
+        # 2. Identical request already synthesized to another file
+        source = self.outputs.get(key)
+        if source and source != output_file and os.path.exists(source):
+            os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+            shutil.copyfile(source, output_file)
+            self.completed[output_file] = key
+            print(f"📋 Line {line_number}: copied from {source}")
+            self.record_result({**result, "status": "copied", "source": source})
+            return
+
+        # 3. Synthesize
+        start = time.perf_counter()
+        try:
+            success = make_audio(record["text"], output_file, sample_file,
+                                 language=language, speed=speed, max_chars=self.max_chars)
+            error = None if success else "Generation failed"
+        except Exception as e:
+            success, error = False, str(e)
+
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        if success:
+            self.completed[output_file] = key
+            self.outputs.setdefault(key, output_file)
+            self.record_result({**result, "status": "ok"})
+        else:
+            self.record_result({**result, "status": "failed", "error": error})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk synthesis from a JSONL file")
+    parser.add_argument("input_file", help="JSONL file with one request per line")
+    parser.add_argument("--results", "-r", help="Results manifest (default: <input>.results.jsonl)")
+    parser.add_argument("--window", type=int, default=256, help="Records grouped by voice at a time")
+    parser.add_argument("--max-chars", type=int, default=2000, help="Maximum characters per chunk (capped by the XTTS limit of the language)")
+    args = parser.parse_args()
+    if args.max_chars < 1:
+        parser.error("--max-chars must be at least 1")
+
+    results_file = args.results or os.path.splitext(args.input_file)[0] + ".results.jsonl"
+    runner = BatchRunner(results_file, window=args.window, max_chars=args.max_chars)
+    counts = runner.run(args.input_file)
+
+    print(f"\n📊 Done: {counts['ok']} generated, {counts['copied']} copied, "
+          f"{counts['skipped']} skipped, {counts['failed']} failed, {counts['invalid']} invalid")
+    print(f"📄 Results: {results_file}")
@@ -0,0 +1,286 @@
+"""
+Pipeline benchmark: splitting, IPC, synthesis, merging, encoding and
+end-to-end throughput for small, medium and audiobook-sized inputs.
+
+Usage:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --sizes small,medium --repeat 5
+    python benchmarks/bench_pipeline.py --backend xtts --folder_xtts ~/xtts-webui-v1_0-portable/webui
+
+By default the workers run the deterministic stub backend (backends.py)
+with --stub-rtf 0, so the numbers are the pipeline overhead alone and need
+neither a GPU nor the model weights. Each run is saved to
+benchmarks/results/ and compared with the previous one (or --compare).
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from audio_merge import merge_pcm, to_int16
+from ipc import send_message, recv_message
+from text_splitter import split_text
+from worker_client import WorkerPool
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Timed stages (seconds, lower is better), compared between runs
+STAGES = ("split_s", "synthesis_s", "ipc_s", "merge_s", "encode_wav_s", "encode_mp3_s", "end_to_end_s")
+
+# Approximate input sizes in characters
+SIZES = {
+    "small": 600,
+    "medium": 12000,
+    "audiobook": 40000,
+}
+
+SENTENCES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "When the rain stopped, the streets were quiet and the air smelled of wet stone.",
+    "She opened the letter slowly, afraid of what it might say.",
+    "Nobody in the village remembered who had planted the old oak tree, but everyone agreed it was older than the church.",
+    "Is this really the way home?",
+    "He laughed, shook his head and walked on, ignoring the crowd that had gathered around the fountain.",
+    "The numbers were clear: sales had doubled in a year, and the factory could not keep up.",
+    "Wait!",
+    "In the morning, the fishermen pushed their boats into the grey water and rowed out past the lighthouse.",
+    "It was, she thought, the strangest summer of her life.",
+]
+
+
+def make_text(num_chars, seed=0):
+    """
+    Builds a deterministic text of about num_chars characters, in paragraphs.
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    length = 0
+    while length < num_chars:
+        paragraph = " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(3, 8)))
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def ipc_round(parts, sample_rate):
+    """
+    Sends every part over a local socket pair with the worker framing and
+    waits until the other end has received all of it.
+    """
+    left, right = socket.socketpair()
+
+    def receive():
+        for _ in parts:
+            recv_message(right)
+
+    receiver = threading.Thread(target=receive)
+    receiver.start()
+    try:
+        for samples in parts:
+            send_message(left, {"status": "ok", "sample_rate": sample_rate, "payload_bytes": samples.nbytes},
+                         memoryview(samples).cast("B"))
+        receiver.join()
+    finally:
+        left.close()
+        right.close()
+
+
+def encode_wav(samples, sample_rate):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(to_int16(samples).tobytes())
+    return buffer.getbuffer().nbytes
+
+
+def encode_mp3(samples, sample_rate):
+    from pydub import AudioSegment
+    segment = AudioSegment(to_int16(samples).tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+    return len(segment.export(io.BytesIO(), format="mp3", bitrate="192k").getvalue())
+
+
+def run_size(pool, name, sample_file, language, repeat, mp3):
+    """
+    Runs the pipeline `repeat` times on one input size.
+
+    Returns:
+        dict: Best time of each stage plus throughput figures.
+    """
+    text = make_text(SIZES[name])
+    best = {}
+
+    def record(stage, seconds):
+        best[stage] = min(best.get(stage, seconds), seconds)
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+
+        chunks, seconds = timed(split_text, text, language)
+        record("split_s", seconds)
+
+        synth_start = time.perf_counter()
+        results = {}
+        for chunk_id, part, error in pool.synthesize_batch(dict(enumerate(chunks)), sample_file, language):
+            if error is not None:
+                raise RuntimeError(f"Chunk {chunk_id} failed: {error}")
+            results[chunk_id] = part
+        record("synthesis_s", time.perf_counter() - synth_start)
+
+        parts = [results[i][0] for i in range(len(chunks))]
+        sample_rate = results[0][1]
+
+        merged, seconds = timed(merge_pcm, parts, sample_rate, pause_ms=200)
+        record("merge_s", seconds)
+
+        _, seconds = timed(encode_wav, merged, sample_rate)
+        record("encode_wav_s", seconds)
+
+        record("end_to_end_s", time.perf_counter() - start)
+
+        # Not part of the end-to-end path: measured on their own
+        _, seconds = timed(ipc_round, parts, sample_rate)
+        record("ipc_s", seconds)
+        if mp3:
+            _, seconds = timed(encode_mp3, merged, sample_rate)
+            record("encode_mp3_s", seconds)
+
+    audio_seconds = merged.size / sample_rate
+    payload_mb = sum(part.nbytes for part in parts) / (1024 * 1024)
+    return {
+        "chars": len(text),
+        "chunks": len(chunks),
+        "audio_seconds": round(audio_seconds, 2),
+        **{stage: round(seconds, 6) for stage, seconds in best.items()},
+        "ipc_mb_per_s": round(payload_mb / best["ipc_s"], 1) if best["ipc_s"] else None,
+        "chars_per_s": round(len(text) / best["end_to_end_s"], 1),
+        "real_time_factor": round(best["end_to_end_s"] / audio_seconds, 5),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latest_result(exclude=None):
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, "pipeline-*.json")))
+    files = [f for f in files if f != exclude]
+    return files[-1] if files else None
+
+
+def compare(previous_file, current, threshold=0.10):
+    """
+    Prints the change of every stage time against a previous run.
+    """
+    with open(previous_file, 'r') as f:
+        previous = json.load(f)
+
+    print(f"\n📈 Compared with {os.path.relpath(previous_file, ROOT)} "
+          f"(rev {previous.get('revision')}, backend {previous.get('backend')}):")
+    for name, result in current["results"].items():
+        old = previous.get("results", {}).get(name)
+        if not old:
+            continue
+        for stage in STAGES:
+            seconds = result.get(stage)
+            if seconds is None or not old.get(stage):
+                continue
+            change = (seconds - old[stage]) / old[stage]
+            flag = "⚠️ " if change > threshold else ("🚀" if change < -threshold else "  ")
+            print(f"  {flag} {name:<10} {stage:<14} {old[stage]:10.4f}s -> {seconds:10.4f}s  {change:+7.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline benchmark suite")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"Comma-separated input sizes ({', '.join(SIZES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size, the best time of each stage is kept")
+    parser.add_argument("--workers", type=int, default=2, help="Number of workers")
+    parser.add_argument("--backend", default="stub", choices=("stub", "xtts"), help="Worker backend (default: stub)")
+    parser.add_argument("--stub-rtf", type=float, default=0.0, help="Real-time factor of the stub backend")
+    parser.add_argument("--folder_xtts", default="", help="Location of the xtts folder (xtts backend)")
+    parser.add_argument("--sample", "-s", default=os.path.join(ROOT, "female.wav"), help="Voice sample file")
+    parser.add_argument("--language", "-l", default="en")
+    parser.add_argument("--no-mp3", action="store_true", help="Skip the MP3 encoding stage")
+    parser.add_argument("--compare", help="Results file to compare with (default: the latest saved run)")
+    parser.add_argument("--no-save", action="store_true", help="Do not save the results")
+    args = parser.parse_args()
+
+    pool = WorkerPool(
+        os.path.expanduser(args.folder_xtts),
+        num_workers=args.workers,
+        socket_path=f"/tmp/xtts_bench_pipeline_{os.getpid()}.sock",
+        use_cuda=args.backend == "xtts",
+        backend=args.backend,
+        stub_rtf=args.stub_rtf if args.backend == "stub" else None
+    )
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "backend": args.backend,
+        "stub_rtf": args.stub_rtf if args.backend == "stub" else None,
+        "workers": args.workers,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": {},
+    }
+
+    try:
+        pool.start()
+        # Warm-up: worker startup and voice latents stay out of the numbers
+        list(pool.synthesize_batch({i: SENTENCES[0] for i in range(args.workers)},
+                                   os.path.abspath(args.sample), args.language))
+
+        print(f"{'size':<10} {'chars':>7} {'chunks':>6} {'split':>8} {'synth':>8} {'merge':>8} "
+              f"{'wav':>8} {'mp3':>8} {'ipc MB/s':>9} {'e2e':>8} {'RTF':>8}")
+        for name in args.sizes.split(","):
+            result = run_size(pool, name, os.path.abspath(args.sample), args.language,
+                              args.repeat, mp3=not args.no_mp3)
+            report["results"][name] = result
+            mp3 = f"{result['encode_mp3_s']:8.3f}" if "encode_mp3_s" in result else f"{'-':>8}"
+            print(f"{name:<10} {result['chars']:>7} {result['chunks']:>6} {result['split_s']:8.3f} "
+                  f"{result['synthesis_s']:8.3f} {result['merge_s']:8.3f} {result['encode_wav_s']:8.3f} "
+                  f"{mp3} {result['ipc_mb_per_s']!s:>9} {result['end_to_end_s']:8.3f} "
+                  f"{result['real_time_factor']:8.4f}")
+    finally:
+        pool.shutdown()
+
+    output_file = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output_file = os.path.join(RESULTS_DIR, f"pipeline-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with open(output_file, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"💾 Results saved to {os.path.relpath(output_file, ROOT)}")
+
+    previous_file = args.compare or latest_result(exclude=output_file)
+    if previous_file:
+        compare(previous_file, report)
@@ -0,0 +1,244 @@
+"""
+Accuracy and latency of the CPU performance mode (int8 quantization,
+torch.compile) against the float32 model.
+
+Usage (with the Python of the XTTS venv):
+    python benchmarks/bench_quantization.py --folder_xtts ~/xtts-webui-v1_0-portable/webui \
+        --sample female.wav
+    python benchmarks/bench_quantization.py --folder_xtts ... --variants fp32,int8,int8+compile \
+        --save-audio /tmp/quantization
+
+Each variant loads the model on the CPU (load time reported, the second
+int8 load comes from the quantized-model cache), then synthesizes the same
+sentences with the same seeds. Latency is the mean inference time per
+sentence after a warm-up, with its real-time factor.
+
+XTTS samples its output, so two float32 runs with different seeds already
+differ. Accuracy is therefore reported next to that noise floor (the
+"fp32 seed 1" row): a variant is as good as float32 when its scores are
+close to the noise floor, not when they are perfect.
+    speaker sim   Cosine similarity of the speaker embeddings of the variant
+                  output and the float32 output (1.0 = same voice).
+    mel dist      Mean absolute difference of the average log-mel spectra,
+                  in dB (0 = same timbre).
+    dur ratio     Audio duration relative to float32.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import core
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+SENTENCES = [
+    "The quick brown fox jumps over the lazy dog, while the busy city wakes up slowly.",
+    "Could you tell me the way to the train station? I think I am lost.",
+    "In nineteen eighty four, the small village had only three hundred inhabitants.",
+    "Science is a way of thinking much more than it is a body of knowledge.",
+    "Wait... did you hear that? Someone is knocking at the door!",
+]
+
+VARIANTS = {
+    "fp32": {"quantize": False, "compile": False},
+    "int8": {"quantize": True, "compile": False},
+    "fp32+compile": {"quantize": False, "compile": True},
+    "int8+compile": {"quantize": True, "compile": True},
+}
+
+
+def mel_filters(sample_rate, n_fft, n_mels):
+    """
+    Triangular mel filterbank, shape (n_mels, n_fft // 2 + 1).
+    """
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    freqs = np.linspace(0, sample_rate / 2, n_fft // 2 + 1)
+    edges = mel_to_hz(np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2), n_mels + 2))
+    filters = np.zeros((n_mels, freqs.size))
+    for i in range(n_mels):
+        low, center, high = edges[i], edges[i + 1], edges[i + 2]
+        rising = (freqs - low) / (center - low)
+        falling = (high - freqs) / (high - center)
+        filters[i] = np.maximum(0.0, np.minimum(rising, falling))
+    return filters
+
+
+def mean_log_mel(samples, sample_rate, n_fft=1024, hop=256, n_mels=80):
+    """
+    Log-mel spectrum (dB) averaged over time: the timbre of a clip,
+    independent of its timing.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.size < n_fft:
+        samples = np.pad(samples, (0, n_fft - samples.size))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, n_fft)[::hop] * np.hanning(n_fft)
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    mel = power @ mel_filters(sample_rate, n_fft, n_mels).T
+    return (10.0 * np.log10(mel + 1e-10)).mean(axis=0)
+
+
+def cosine(a, b):
+    a = np.asarray(a, dtype=np.float64).ravel()
+    b = np.asarray(b, dtype=np.float64).ravel()
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def load_variant(options):
+    """
+    Loads the model with the options of a variant.
+
+    Returns:
+        (backend, load seconds)
+    """
+    core.QUANTIZE = options["quantize"]
+    core.COMPILE = options["compile"]
+    start = time.perf_counter()
+    backend = core.load_model(use_cuda=False)
+    return backend, time.perf_counter() - start
+
+
+def synthesize_all(backend, sample_file, language, seed, runs):
+    """
+    Synthesizes every sentence `runs` times with the given seed.
+
+    Returns:
+        (list of float32 outputs, mean seconds per sentence, RTF)
+    """
+    import torch
+
+    gpt_cond_latent, speaker_embedding = backend.get_conditioning_latents(sample_file)
+
+    # Warm-up: first-call allocations (and graph building when compiled)
+    torch.manual_seed(seed)
+    backend.inference(SENTENCES[0], language, gpt_cond_latent, speaker_embedding)
+
+    outputs = []
+    seconds = 0.0
+    audio_seconds = 0.0
+    for run in range(runs):
+        for sentence in SENTENCES:
+            torch.manual_seed(seed)
+            start = time.perf_counter()
+            wav = backend.inference(sentence, language, gpt_cond_latent, speaker_embedding)
+            seconds += time.perf_counter() - start
+            audio_seconds += wav.size / backend.sample_rate
+            if run == 0:
+                outputs.append(wav)
+
+    count = runs * len(SENTENCES)
+    return outputs, seconds / count, seconds / audio_seconds
+
+
+def speaker_embeddings(reference, outputs, audio_dir, name):
+    """
+    Speaker embedding of each output, computed by the float32 model.
+    """
+    embeddings = []
+    for i, wav in enumerate(outputs):
+        path = core.save_wav(os.path.join(audio_dir, f"{name}_{i}.wav"), wav, reference.sample_rate)
+        embeddings.append(reference.get_conditioning_latents(path)[1].cpu().numpy())
+    return embeddings
+
+
+def compare(reference_outputs, reference_embeddings, outputs, embeddings, sample_rate):
+    """
+    Accuracy scores of outputs against the float32 outputs (mean over sentences).
+    """
+    similarity, distance, duration = [], [], []
+    for ref, out, ref_emb, emb in zip(reference_outputs, outputs, reference_embeddings, embeddings):
+        similarity.append(cosine(ref_emb, emb))
+        distance.append(float(np.abs(mean_log_mel(ref, sample_rate) - mean_log_mel(out, sample_rate)).mean()))
+        duration.append(out.size / ref.size)
+    return {
+        "speaker_similarity": float(np.mean(similarity)),
+        "mel_distance_db": float(np.mean(distance)),
+        "duration_ratio": float(np.mean(duration)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy/latency of the int8 and compiled CPU modes")
+    parser.add_argument("--folder_xtts", required=True, help="Location of the xtts folder")
+    parser.add_argument("--sample", "-s", default=os.path.join(ROOT, "female.wav"), help="Voice sample file")
+    parser.add_argument("--language", "-l", default="en")
+    parser.add_argument("--variants", default="fp32,int8",
+                        help=f"Comma-separated variants to compare with fp32 ({', '.join(VARIANTS)})")
+    parser.add_argument("--runs", type=int, default=2, help="Timed runs over the sentences")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    parser.add_argument("--quantized-cache-dir", default=core.DEFAULT_QUANTIZED_DIR,
+                        help="Disk cache for the quantized model, empty to disable")
+    parser.add_argument("--save-audio", help="Keep the generated WAV files in this directory")
+    parser.add_argument("--no-save", action="store_true", help="Do not save the results")
+    args = parser.parse_args()
+
+    variants = [name for name in args.variants.split(",") if name and name != "fp32"]
+    unknown = [name for name in variants if name not in VARIANTS]
+    if unknown:
+        parser.error(f"unknown variant(s): {', '.join(unknown)}")
+
+    core.set_xtts_dir(args.folder_xtts)
+    core.QUANTIZED_CACHE_DIR = args.quantized_cache_dir
+    core.configure_cpu(args.threads)
+    sample_file = os.path.abspath(os.path.expanduser(args.sample))
+    audio_dir = args.save_audio or tempfile.mkdtemp(prefix="xtts_quantization_")
+    os.makedirs(audio_dir, exist_ok=True)
+
+    report = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "sentences": SENTENCES, "results": {}}
+
+    # Reference, and a second seed for the sampling noise floor
+    reference, load_seconds = load_variant(VARIANTS["fp32"])
+    sample_rate = reference.sample_rate
+    reference_outputs, latency, rtf = synthesize_all(reference, sample_file, args.language, 0, args.runs)
+    reference_embeddings = speaker_embeddings(reference, reference_outputs, audio_dir, "fp32")
+    report["results"]["fp32"] = {"load_s": load_seconds, "latency_s": latency, "real_time_factor": rtf}
+
+    noise_outputs, _, _ = synthesize_all(reference, sample_file, args.language, 1, 1)
+    noise_embeddings = speaker_embeddings(reference, noise_outputs, audio_dir, "fp32_seed1")
+    report["results"]["fp32 seed 1"] = compare(reference_outputs, reference_embeddings,
+                                               noise_outputs, noise_embeddings, sample_rate)
+
+    for name in variants:
+        backend, load_seconds = load_variant(VARIANTS[name])
+        outputs, latency, rtf = synthesize_all(backend, sample_file, args.language, 0, args.runs)
+        # Latents are computed with the variant's own model, like in production
+        embeddings = speaker_embeddings(reference, outputs, audio_dir, name.replace("+", "_"))
+        report["results"][name] = {
+            "load_s": load_seconds,
+            "latency_s": latency,
+            "real_time_factor": rtf,
+            "speedup": report["results"]["fp32"]["latency_s"] / latency,
+            **compare(reference_outputs, reference_embeddings, outputs, embeddings, sample_rate),
+        }
+        del backend
+
+    print(f"{'variant':<14} {'load s':>8} {'latency s':>10} {'RTF':>7} {'speedup':>8} "
+          f"{'speaker sim':>12} {'mel dist':>9} {'dur ratio':>10}")
+    for name, result in report["results"].items():
+        def cell(key, width, fmt):
+            value = result.get(key)
+            return f"{value:{width}{fmt}}" if value is not None else f"{'-':>{width}}"
+        print(f"{name:<14} {cell('load_s', 8, '.2f')} {cell('latency_s', 10, '.3f')} "
+              f"{cell('real_time_factor', 7, '.3f')} {cell('speedup', 8, '.2f')} "
+              f"{cell('speaker_similarity', 12, '.4f')} {cell('mel_distance_db', 9, '.2f')} "
+              f"{cell('duration_ratio', 10, '.3f')}")
+    print(f"🔊 Audio in {audio_dir}")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output_file = os.path.join(RESULTS_DIR, f"quantization-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with open(output_file, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"💾 Results saved to {os.path.relpath(output_file, ROOT)}")
@@ -0,0 +1,161 @@
+"""
+Latency of short requests while a long job is running, for each scheduling
+policy (see scheduler.py).
+
+Usage:
+    python benchmarks/bench_scheduler.py
+    python benchmarks/bench_scheduler.py --policies fifo,sjf --workers 2 --long-chars 20000
+    python benchmarks/bench_scheduler.py --backend xtts --folder_xtts ~/xtts-webui-v1_0-portable/webui
+
+A long job (an audiobook chapter) is submitted first, then short requests
+(notifications) arrive at a steady rate until it finishes. For each policy
+the table gives the p50/p99/max latency of the short requests (submission
+to last chunk) and how long the long job took. By default the workers run
+the stub backend (backends.py) with a real-time factor of 0.05, so a run
+takes about a minute and needs no model. The stub runs 20 times faster than
+XTTS on a CPU, so the slices are shortened to match (--slice-seconds 1
+instead of the default 15 of scheduler.py).
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import make_audio
+from scheduler import Scheduler, CostModel, POLICIES
+from text_splitter import split_text
+from worker_client import WorkerPool
+
+LONG_SENTENCE = ("In the morning, the fishermen pushed their boats into the grey water "
+                 "and rowed out past the lighthouse, as their fathers had done before them.")
+SHORT_TEXT = "Your order has shipped and will arrive on Tuesday."
+
+
+def synthesize(text, sample_file, language):
+    """
+    Generates a request through make_audio's scheduled path.
+
+    Returns:
+        float: Seconds until the last chunk was received.
+    """
+    chunks = {i: chunk for i, chunk in enumerate(split_text(text, language), 1)}
+    start = time.perf_counter()
+    for _, _, error in make_audio.iter_audio_batch(chunks, sample_file, language, 1.0,
+                                                   use_cache=False):
+        if error is not None:
+            raise RuntimeError(error)
+    return time.perf_counter() - start
+
+
+def run_policy(policy, cost_model, workers, sample_file, language, long_chars, interval, slice_seconds):
+    """
+    Runs the long job and the short requests under one policy.
+
+    Returns:
+        dict: Latencies of the short requests and time of the long job.
+    """
+    make_audio._SCHEDULER = Scheduler(workers, policy=policy, slice_seconds=slice_seconds,
+                                      cost_model=cost_model)
+    long_text = " ".join([LONG_SENTENCE] * max(1, long_chars // len(LONG_SENTENCE)))
+    long_result = {}
+
+    def long_job():
+        long_result["seconds"] = synthesize(long_text, sample_file, language)
+
+    latencies = []
+    threads = []
+    lock = threading.Lock()
+
+    def short_request():
+        seconds = synthesize(SHORT_TEXT, sample_file, language)
+        with lock:
+            latencies.append(seconds)
+
+    runner = threading.Thread(target=long_job)
+    runner.start()
+    # The short requests start once the long job holds the workers
+    time.sleep(interval / 2)
+    while runner.is_alive():
+        thread = threading.Thread(target=short_request)
+        thread.start()
+        threads.append(thread)
+        time.sleep(interval)
+    runner.join()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "short_requests": len(latencies),
+        "short_p50_s": float(np.percentile(latencies, 50)) if latencies else None,
+        "short_p99_s": float(np.percentile(latencies, 99)) if latencies else None,
+        "short_max_s": max(latencies, default=None),
+        "long_job_s": long_result.get("seconds"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Short-request latency under each scheduling policy")
+    parser.add_argument("--policies", default=",".join(POLICIES), help=f"Comma-separated policies ({', '.join(POLICIES)})")
+    parser.add_argument("--workers", type=int, default=1, help="Number of workers")
+    parser.add_argument("--long-chars", type=int, default=8000, help="Characters of the long job")
+    parser.add_argument("--interval", type=float, default=1.5, help="Seconds between short requests")
+    parser.add_argument("--slice-seconds", type=float, default=1.0, help="Predicted work per slot grant")
+    parser.add_argument("--backend", default="stub", choices=("stub", "xtts"), help="Worker backend (default: stub)")
+    parser.add_argument("--stub-rtf", type=float, default=0.05, help="Real-time factor of the stub backend")
+    parser.add_argument("--folder_xtts", default="", help="Location of the xtts folder (xtts backend)")
+    parser.add_argument("--sample", "-s", default=os.path.join(ROOT, "female.wav"), help="Voice sample file")
+    parser.add_argument("--language", "-l", default="en")
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    args = parser.parse_args()
+
+    policies = [name for name in args.policies.split(",") if name]
+    unknown = [name for name in policies if name not in POLICIES]
+    if unknown:
+        parser.error(f"unknown policy(ies): {', '.join(unknown)}")
+
+    pool = WorkerPool(
+        os.path.expanduser(args.folder_xtts),
+        num_workers=args.workers,
+        socket_path=f"/tmp/xtts_bench_scheduler_{os.getpid()}.sock",
+        use_cuda=args.backend == "xtts",
+        backend=args.backend,
+        stub_rtf=args.stub_rtf if args.backend == "stub" else None
+    )
+    sample_file = os.path.abspath(args.sample)
+    # In memory only: the benchmark does not touch the saved calibration
+    cost_model = CostModel(path=None)
+    results = {}
+
+    try:
+        pool.start()
+        make_audio._WORKER = pool
+        # Warm-up, which also calibrates the cost model on chunks of several lengths
+        make_audio._SCHEDULER = Scheduler(args.workers, cost_model=cost_model)
+        synthesize(" ".join([SHORT_TEXT] + [LONG_SENTENCE] * 3 + [SHORT_TEXT]),
+                   sample_file, args.language)
+
+        print(f"{'policy':<7} {'short n':>8} {'p50 s':>8} {'p99 s':>8} {'max s':>8} {'long job s':>11}")
+        for policy in policies:
+            result = run_policy(policy, cost_model, args.workers, sample_file, args.language,
+                                args.long_chars, args.interval, args.slice_seconds)
+            results[policy] = result
+
+            def cell(key, width):
+                value = result[key]
+                return f"{value:{width}.2f}" if value is not None else f"{'-':>{width}}"
+            print(f"{policy:<7} {result['short_requests']:>8} {cell('short_p50_s', 8)} "
+                  f"{cell('short_p99_s', 8)} {cell('short_max_s', 8)} {cell('long_job_s', 11)}")
+    finally:
+        pool.shutdown()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"cost_model": cost_model.snapshot(), "results": results}, f, indent=4)
+        print(f"💾 Results saved to {args.output}")
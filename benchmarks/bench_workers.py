@@ -0,0 +1,101 @@
+"""
+Throughput of the worker pool against the number of workers (CPU only).
+
+Usage:
+    python benchmarks/bench_workers.py --folder_xtts ~/xtts-webui-v1_0-portable/webui \
+        --sample female.wav --workers 1,2,4 --chunks 16
+
+Each worker count gets its own pool (CPU cores split between the workers),
+one warm-up chunk per worker, then the timed run. Results are printed as a
+table and can be saved as JSON with --output.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker_client import WorkerPool, partition_cpus
+
+SENTENCE = (
+    "The quick brown fox jumps over the lazy dog, while the busy city "
+    "wakes up slowly under a grey and quiet morning sky."
+)
+
+
+def run(folder_xtts, sample_file, num_workers, num_chunks, language, pin_cpus):
+    """
+    Measures one pool size.
+
+    Returns:
+        dict: chunks/s, audio seconds/s and real-time factor.
+    """
+    pool = WorkerPool(
+        folder_xtts,
+        num_workers=num_workers,
+        socket_path=f"/tmp/xtts_bench_{os.getpid()}.sock",
+        use_cuda=False,
+        pin_cpus=pin_cpus
+    )
+
+    try:
+        pool.start()
+        # Warm-up: latents and first-call allocations on every worker
+        warmup = {f"warmup-{i}": SENTENCE for i in range(num_workers)}
+        list(pool.synthesize_batch(warmup, sample_file, language))
+
+        chunks = {i: SENTENCE for i in range(num_chunks)}
+        audio_seconds = 0.0
+        failed = 0
+
+        start = time.perf_counter()
+        for _, part, error in pool.synthesize_batch(chunks, sample_file, language):
+            if error is not None:
+                failed += 1
+            else:
+                samples, sample_rate = part
+                audio_seconds += samples.size / sample_rate
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+    return {
+        "workers": num_workers,
+        "threads_per_worker": [len(cpus) for cpus in partition_cpus(num_workers)],
+        "chunks": num_chunks,
+        "failed": failed,
+        "seconds": elapsed,
+        "chunks_per_second": num_chunks / elapsed,
+        "audio_seconds_per_second": audio_seconds / elapsed,
+        "real_time_factor": elapsed / audio_seconds if audio_seconds else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker pool throughput benchmark")
+    parser.add_argument("--folder_xtts", required=True, help="Location of the xtts folder")
+    parser.add_argument("--sample", "-s", required=True, help="Voice sample file")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--chunks", type=int, default=16, help="Chunks per run")
+    parser.add_argument("--language", "-l", default="en")
+    parser.add_argument("--pin-cpus", action="store_true", help="Pin each worker to its cores")
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'workers':>7} {'threads':>10} {'chunks/s':>9} {'audio s/s':>10} {'RTF':>6}")
+    for num_workers in [int(n) for n in args.workers.split(",")]:
+        result = run(os.path.expanduser(args.folder_xtts), os.path.abspath(args.sample),
+                     num_workers, args.chunks, args.language, args.pin_cpus)
+        results.append(result)
+        rtf = result["real_time_factor"]
+        print(f"{num_workers:>7} {'/'.join(map(str, result['threads_per_worker'])):>10} "
+              f"{result['chunks_per_second']:>9.2f} {result['audio_seconds_per_second']:>10.2f} "
+              f"{rtf if rtf is None else round(rtf, 2)!s:>6}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=4)
+        print(f"💾 Results saved to {args.output}")
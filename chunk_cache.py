@@ -0,0 +1,190 @@
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+import wave
+
+import numpy as np
+
+from latent_cache import file_sha256, checkpoint_version
+from voice_bank import voice_name
+
+DEFAULT_CHUNK_CACHE_DIR = os.path.expanduser("~/.cache/xtts-local-api/chunks")
+
+
+def normalize_text(text):
+    """
+    Normalizes chunk text for cache lookups: Unicode NFC and collapsed
+    whitespace, so formatting-only differences hit the same entry.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def xtts_model_version(folder_xtts):
+    """
+    Version of the checkpoint used by the workers of an XTTS installation
+    (same identification as core.model_version).
+    """
+    model_dir = os.path.join(os.path.expanduser(folder_xtts), "models", "v2.0.2")
+    return checkpoint_version(os.path.join(model_dir, "config.json"),
+                              os.path.join(model_dir, "model.pth"))
+
+
+class ChunkCache:
+    """
+    Content-addressed cache of synthesized chunk audio.
+
+    The key covers everything that changes the audio: normalized chunk text,
+    the content hash of the voice sample, language, speed and model version.
+    Entries are stored as 16-bit mono WAV files; once the cache grows past
+    `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CHUNK_CACHE_DIR, max_bytes=1024 * 1024 * 1024, model_version="",
+                 voice_bank=None):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        self.model_version = model_version
+        # VoiceBank used to identify "voice:<name>" samples by their latents
+        self.voice_bank = voice_bank
+        self.lock = threading.Lock()
+
+        self.file_hashes = {}
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    def key_for(self, text, sample_file, language, speed):
+        """
+        Returns the cache key of a chunk.
+        """
+        name = voice_name(sample_file)
+        if name is not None:
+            # Bank voices: a rebuilt voice gets new entries
+            if self.voice_bank is not None and name in self.voice_bank:
+                voice_hash = self.voice_bank.voice_hash(name)
+            else:
+                voice_hash = sample_file
+        else:
+            sample_file = os.path.abspath(os.path.expanduser(sample_file))
+            st = os.stat(sample_file)
+            file_id = (sample_file, st.st_mtime_ns, st.st_size)
+            if file_id not in self.file_hashes:
+                self.file_hashes[file_id] = file_sha256(sample_file)
+            voice_hash = self.file_hashes[file_id]
+
+        raw = "\0".join([
+            normalize_text(text),
+            voice_hash,
+            language,
+            f"{float(speed):.4f}",
+            self.model_version,
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        # Two-level layout keeps directories small for large caches
+        return os.path.join(self.cache_dir, key[:2], f"{key}.wav")
+
+    def get(self, key):
+        """
+        Returns (samples, sample_rate) for a cached chunk, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with wave.open(path, 'rb') as f:
+                sample_rate = f.getframerate()
+                samples = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+        except (OSError, EOFError, wave.Error):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        # Refresh the timestamp used for LRU eviction
+        os.utime(path)
+        with self.lock:
+            self.hits += 1
+        return samples, sample_rate
+
+    def put(self, key, samples, sample_rate):
+        """
+        Stores a chunk (float32 or int16 mono samples).
+        """
+        if samples.dtype != np.int16:
+            samples = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        try:
+            with wave.open(tmp_path, 'wb') as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(sample_rate)
+                f.writeframes(samples.tobytes())
+            size = os.path.getsize(tmp_path)
+            # An entry rewritten under the same key replaces the old size
+            try:
+                size -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Could not write chunk cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self.lock:
+            self.stores += 1
+            self.total_bytes += size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".wav"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield st.st_mtime, st.st_size, path
+
+    def _evict(self):
+        """
+        Removes the least recently used entries down to 90% of max_bytes,
+        so eviction does not run on every store.
+        """
+        entries = sorted(self._entries())
+        self.total_bytes = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+
+        for _, size, path in entries:
+            if self.total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.total_bytes -= size
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the cache size.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -1,32 +1,37 @@
-import os
-import soundfile as sf
-import numpy as np
-import noisereduce as nr
-import re
-import os
-import sys
-
-
-# Specific imports to load the model locally
-from TTS.tts.configs.xtts_config import XttsConfig
-from TTS.tts.models.xtts import Xtts
-from TTS.api import TTS
-import math
-import torch
-import torchaudio
 import time
 
+# Startup profiling (see --profile-startup): seconds spent per stage
+STARTUP_BEGIN = time.perf_counter()
+STARTUP_TIMES = {}
+
 import argparse
-import sys
-import os
-import tempfile
+import gc
 import glob
-
+import json
 import os
-import gc
-import time
-from torch import cuda
+import re
+import socket
+import subprocess
+import sys
+import threading
+import wave
+from contextlib import contextmanager
+
+import numpy as np
 
+from ipc import DEFAULT_SOCKET_PATH, PCM_DTYPES, send_message, recv_message, pcm_header
+from latent_cache import LatentCache, DEFAULT_CACHE_DIR, checkpoint_version
+from audio_merge import merge_pcm
+from audio_sink import open_sink
+from text_splitter import split_text
+from backends import BACKENDS, StubBackend, XttsBackend
+from metrics import Metrics, render_prometheus, format_summary
+from cpu_mode import DEFAULT_QUANTIZED_DIR
+from voice_bank import VoiceBank, voice_name
+
+# torch, torchaudio and TTS are imported by the code paths that use them,
+# so --help, argument errors and client-only imports stay fast
+STARTUP_TIMES["imports (core)"] = time.perf_counter() - STARTUP_BEGIN
 
 
 # Path to the local XTTS-v2 model directory
@@ -38,45 +43,213 @@ VOCAB_PATH = os.path.join(MODEL_DIR, "vocab.json")
 SPEAKER_FILE_PATH = os.path.join(MODEL_DIR, "speakers_xtts.pth") 
 
 # --- Output Configurations ---
-TEMP_OUTPUT_PATH = "temp_output.wav" # Audio BEFORE noise reduction
-FINAL_OUTPUT_PATH = "output_audio_clean.wav" # Audio AFTER noise reduction
 LANGUAGE = "en"
+SAMPLE_RATE = 24000  # XTTS-v2 output sample rate
+
+# Per-stage timings of this process (model load, latents, inference,
+# merge, encode); exposed by the "metrics" worker op and --metrics
+METRICS = Metrics()
+
+# Conditioning-latent cache, created on first use (see get_conditioning_latents)
+LATENT_CACHE = None
+
+# Inference backend (see backends.py and --backend), MODEL once loaded
+BACKEND = "xtts"
+MODEL = None
+STUB_RTF = 0.3
+
+# CPU performance mode (see cpu_mode.py, --quantize and --compile)
+QUANTIZE = False
+COMPILE = False
+QUANTIZED_CACHE_DIR = DEFAULT_QUANTIZED_DIR
 
+# Prebuilt voices selected with "voice:<name>" (see voice_bank.py and --voice-bank)
+VOICE_BANK = None
 
-PROGRESS = 0
-TOTAL = 0
+
+@contextmanager
+def startup_stage(name):
+    """
+    Adds the time spent in the block to STARTUP_TIMES[name].
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMES[name] = STARTUP_TIMES.get(name, 0.0) + time.perf_counter() - start
+
+
+def startup_report():
+    """
+    Returns the startup profile as printable lines.
+    """
+    total = sum(STARTUP_TIMES.values())
+    lines = ["⏱️  Startup profile:"]
+    for name, seconds in STARTUP_TIMES.items():
+        share = seconds / total * 100 if total else 0.0
+        lines.append(f"  {name:<24} {seconds:8.3f}s  {share:5.1f}%")
+    lines.append(f"  {'total':<24} {total:8.3f}s")
+    return "\n".join(lines)
+
+
+def render_metrics(fmt="summary"):
+    """
+    Returns the metrics of this process as a table, JSON or Prometheus text.
+    """
+    snapshot = METRICS.snapshot()
+    if fmt == "json":
+        return json.dumps(snapshot, indent=4)
+    if fmt == "prometheus":
+        return render_prometheus([({"process": "core"}, snapshot)])
+    return "📊 Metrics:\n" + format_summary(snapshot)
 
 
 def my_model(use_cuda: bool = True):
     # Initializes and loads the XTTS model structure and weights
-    device = "cuda" if use_cuda else "cpu"
-    
-    # 1. Load configuration
-    config = XttsConfig()
-    config.load_json(str(CONFIG_PATH))
-    
-    # 2. Initialize the model structure
-    model = Xtts.init_from_config(config)
-    
-    # Define the vocabulary path explicitly
-    VOCAB_PATH = os.path.join(MODEL_DIR, "vocab.json") 
-    
-    # 3. Load weights (without 'eval_model', as previously corrected)
-    # We pass VOCAB_PATH explicitly
-    model.load_checkpoint(
-        config, 
-        checkpoint_path=CHECKPOINT_PATH,
-        vocab_path=VOCAB_PATH, # <--- This line resolves the join issue
-        speaker_file_path=SPEAKER_FILE_PATH
-
-    ) 
-    model.to(device)
-    
-    print(f"Model successfully loaded on: {device.upper()}")
+    with startup_stage("imports (torch, TTS)"):
+        import torch
+        from TTS.tts.configs.xtts_config import XttsConfig
+        from TTS.tts.models.xtts import Xtts
+
+    # Falls back to the CPU when CUDA is requested but not available
+    device = "cuda" if use_cuda and torch.cuda.is_available() else "cpu"
+
+    quantize = QUANTIZE and device == "cpu"
+    if QUANTIZE and not quantize:
+        print("⚠️  int8 quantization is CPU only, ignored on CUDA")
+
+    model = None
+    cache_file = None
+    if quantize:
+        import cpu_mode
+        cpu_mode.tune_cpu()
+        if QUANTIZED_CACHE_DIR:
+            cache_file = cpu_mode.quantized_cache_file(QUANTIZED_CACHE_DIR, model_version())
+            # The cached quantized model replaces config parsing, init and checkpoint load
+            with startup_stage("quantized load"):
+                model = cpu_mode.load_quantized(cache_file)
+
+    if model is None:
+        # 1. Load configuration
+        with startup_stage("config parsing"):
+            config = XttsConfig()
+            config.load_json(str(CONFIG_PATH))
+
+        # 2. Initialize the model structure
+        with startup_stage("model init"):
+            model = Xtts.init_from_config(config)
+
+        # 3. Load weights (without 'eval_model', as previously corrected)
+        # We pass VOCAB_PATH explicitly
+        # With a voice bank the built-in speakers come from its mapped
+        # arrays: a missing speaker file makes XTTS skip unpickling them
+        speaker_file_path = SPEAKER_FILE_PATH if VOICE_BANK is None else f"{SPEAKER_FILE_PATH}.unused"
+        with startup_stage("checkpoint load"):
+            model.load_checkpoint(
+                config,
+                checkpoint_path=CHECKPOINT_PATH,
+                vocab_path=VOCAB_PATH, # <--- This line resolves the join issue
+                speaker_file_path=speaker_file_path
+
+            )
+
+        if quantize:
+            with startup_stage("quantization"):
+                cpu_mode.quantize_model(model)
+            if cache_file:
+                cpu_mode.save_quantized(model, cache_file)
+
+    with startup_stage("device transfer"):
+        model.to(device)
+        if device == "cuda":
+            # Transfers are asynchronous: wait for them to be measured
+            torch.cuda.synchronize()
+
+    if COMPILE:
+        import cpu_mode
+        with startup_stage("compile"):
+            cpu_mode.compile_model(model)
+
+    print(f"Model successfully loaded on: {device.upper()}"
+          + (" (int8 quantized)" if quantize else "") + (" (compiled)" if COMPILE else ""))
     return model
     
 
 
+def set_xtts_dir(folder_xtts):
+    """
+    Points the model paths at the XTTS folder (the one holding models/v2.0.2).
+    """
+    global XTTS_DIR, MODEL_DIR, CONFIG_PATH, CHECKPOINT_PATH, VOCAB_PATH, SPEAKER_FILE_PATH
+    XTTS_DIR = os.path.expanduser(folder_xtts)
+    MODEL_DIR =  os.path.join(XTTS_DIR, "models", "v2.0.2")
+    CONFIG_PATH = os.path.join(MODEL_DIR, "config.json")
+    CHECKPOINT_PATH =  os.path.join(MODEL_DIR, "model.pth") # Assuming default name
+    VOCAB_PATH = os.path.join(MODEL_DIR, "vocab.json") 
+    SPEAKER_FILE_PATH = os.path.join(MODEL_DIR, "speakers_xtts.pth") 
+
+
+def load_model(use_cuda=True):
+    """
+    Loads the inference backend selected with --backend (XTTS by default).
+    """
+    with METRICS.stage("model_load"):
+        if BACKEND == "stub":
+            print(f"Stub backend loaded (RTF {STUB_RTF})")
+            return StubBackend(rtf=STUB_RTF)
+        return XttsBackend(my_model(use_cuda), version=model_version())
+
+
+def model_version():
+    """
+    Identifies the loaded checkpoint, so cached latents are invalidated
+    when the model files change.
+    """
+    if BACKEND != "xtts":
+        return BACKEND
+    version = checkpoint_version(CONFIG_PATH, CHECKPOINT_PATH)
+    # The conditioning encoder is part of the quantized GPT: the latents
+    # of the int8 model are cached separately
+    return f"{version}:int8" if QUANTIZE else version
+
+
+def voice_exists(audio_sample_file):
+    """
+    Tells whether a voice sample file, or a "voice:<name>" of the voice
+    bank, is available.
+    """
+    name = voice_name(audio_sample_file)
+    if name is not None:
+        return VOICE_BANK is not None and name in VOICE_BANK
+    return os.path.exists(audio_sample_file)
+
+
+def get_conditioning_latents(audio_sample_file):
+    """
+    Returns (gpt_cond_latent, speaker_embedding) for a voice sample,
+    computing them only once per voice thanks to the latent cache.
+    "voice:<name>" samples are read from the voice bank.
+    """
+    name = voice_name(audio_sample_file)
+    if name is not None:
+        if VOICE_BANK is None or name not in VOICE_BANK:
+            raise ValueError(f"Voice not found in the voice bank: {name}")
+        return MODEL.latents_from_numpy(*VOICE_BANK.get(name))
+
+    global LATENT_CACHE
+    if LATENT_CACHE is None:
+        LATENT_CACHE = LatentCache(model_version=model_version())
+    return LATENT_CACHE.get(audio_sample_file, compute_conditioning_latents, device=MODEL.device)
+
+
+def compute_conditioning_latents(audio_sample_file):
+    """
+    Encodes a voice sample with the model (latent cache misses).
+    """
+    with METRICS.stage("latents"):
+        return MODEL.get_conditioning_latents(audio_sample_file)
+
+
 def make_audios(texto, output_file, language="en", use_cuda=True, 
                 audio_sample_file="audio.mp3", speed=1.0, folder_xtts= '~/xtts-webui-v1_0-portable/webui/'):
     """
@@ -96,77 +269,129 @@ def make_audios(texto, output_file, language="en", use_cuda=True,
     output_file = os.path.expanduser(output_file)
     
     global MODEL
-    # Model loading moved to my_model()
-    MODEL = my_model()
+    # Model loading moved to load_model()
+    MODEL = load_model(use_cuda)
     
     # Checks
-    if not os.path.exists(audio_sample_file):
-        print(f"❌ Voice file not found: {audio_sample_file}")
+    if not voice_exists(audio_sample_file):
+        print(f"❌ Voice not found: {audio_sample_file}")
         return
     
     try:
         # Get latents from the reference voice
-        gpt_cond_latent, speaker_embedding = MODEL.get_conditioning_latents(audio_sample_file)
-        
-        # Split text into parts
-        MAX_CHARS = 2000
-        partes_texto = []
-        start_index = 0
+        gpt_cond_latent, speaker_embedding = get_conditioning_latents(audio_sample_file)
         
-        while start_index < len(texto):
-            end_index = min(start_index + MAX_CHARS, len(texto))
-            
-            # Ensure break at a space
-            if end_index < len(texto) and texto[end_index] != ' ':
-                last_space = texto.rfind(' ', start_index, end_index)
-                if last_space != -1:
-                    end_index = last_space
-            
-            partes_texto.append(texto[start_index:end_index].strip())
-            start_index = end_index + 1
+        # Split text at sentence boundaries, within the XTTS limits of the
+        # language (character count and tokenizer length)
+        partes_texto = split_text(
+            texto, language,
+            token_len=lambda parte: MODEL.token_len(parte, language)
+        )
         
         print(f"📝 Text parts: {len(partes_texto)}")
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            print(f"📁 Temporary directory: {temp_dir}")
-            
+        # Parts go to a single encoder as soon as they are generated
+        # (format from the extension), so encoding overlaps with inference
+        sink = None
+        try:
             for i, parte in enumerate(partes_texto):
                 if not parte:
                     continue
                 
-                # 🔥 SPEED PARAMETER ADDED HERE
-                out = MODEL.inference(
-                    text=parte,
-                    language=language,
-                    gpt_cond_latent=gpt_cond_latent,
-                    speaker_embedding=speaker_embedding,
-                    speed=speed,  # 🎯 NEW PARAMETER
-                    enable_text_splitting=True
-                )
-
-                
-                output_part = os.path.join(temp_dir, f"part{i+1}.mp3")
-                torchaudio.save(output_part, torch.tensor(out["wav"]).unsqueeze(0), 24000)
+                wav = synthesize_wav(parte, gpt_cond_latent, speaker_embedding,
+                                     language=language, speed=speed)
+                with METRICS.stage("encode") as record:
+                    record["audio_seconds"] = wav.size / SAMPLE_RATE
+                    if sink is None:
+                        sink = open_sink(output_file, SAMPLE_RATE)
+                    sink.write(wav)
                 
                 print(f"✅ Part {i+1}/{len(partes_texto)} generated (speed: {speed}x)", 
                       end='\r', flush=True)
-                time.sleep(1)  # Small pause between parts
             
-            # Merge all parts
-            merge_audio_parts_advanced(temp_dir, output_file)
-            print(f"\n🎉 Final audio generated: {output_file} (speed: {speed}x)")
+            if sink is None:
+                print("❌ Empty or invalid text.")
+                return
+            info = sink.close()
+        except BaseException:
+            if sink is not None:
+                sink.abort()
+            raise
+        print(f"\n🎉 Final audio generated: {output_file} (speed: {speed}x, "
+              f"{info['audio_seconds']:.1f}s, {info['bytes']} bytes)")
             
     except Exception as e:
         print(f"❌ Error: {e}")
 
 
 
-def merge_audio_parts_advanced(tmp_dir, output_file):
+def synthesize_wav(texto, gpt_cond_latent, speaker_embedding, language="en", speed=1.0):
     """
-    More robust version for joining audio parts
+    Runs XTTS inference for a single text chunk with precomputed latents.
+
+    Returns:
+        numpy.ndarray: Mono float32 samples at SAMPLE_RATE.
+    """
+    with METRICS.stage("inference", chars=len(texto)) as record:
+        # 🔥 SPEED PARAMETER ADDED HERE
+        wav = MODEL.inference(texto, language, gpt_cond_latent, speaker_embedding, speed=speed)
+        record["audio_seconds"] = wav.size / SAMPLE_RATE
+    return wav
+
+
+def to_pcm(wav, dtype="float32"):
+    """
+    Converts float samples in [-1, 1] to the requested PCM sample type.
+    """
+    if dtype == "int16":
+        return (np.clip(wav, -1.0, 1.0) * 32767).astype("<i2")
+    return np.ascontiguousarray(wav, dtype="<f4")
+
+
+def save_wav(output_file, wav, sample_rate=SAMPLE_RATE):
+    """
+    Encodes mono float32 samples to output_file (format from the extension).
+    WAV files are written as 16-bit PCM directly, other formats go through
+    ffmpeg (see audio_sink.open_sink).
+    """
+    with METRICS.stage("encode") as record:
+        record["audio_seconds"] = wav.size / sample_rate
+        if output_file.lower().endswith(".wav"):
+            with wave.open(output_file, 'wb') as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(sample_rate)
+                f.writeframes(to_pcm(wav, "int16").tobytes())
+            return output_file
+
+        sink = open_sink(output_file, sample_rate)
+        try:
+            sink.write(wav)
+        except BaseException:
+            sink.abort()
+            raise
+        sink.close()
+    return output_file
+
+
+def synthesize_chunk(texto, output_file, gpt_cond_latent, speaker_embedding,
+                     language="en", speed=1.0):
+    """
+    Runs XTTS inference for a single text chunk with precomputed latents
+    and saves the result to output_file.
+    """
+    wav = synthesize_wav(texto, gpt_cond_latent, speaker_embedding, language, speed)
+    return save_wav(output_file, wav)
+
+
+def merge_audio_parts_advanced(tmp_dir, output_file, pause_ms=0):
+    """
+    More robust version for joining audio parts: the parts are decoded and
+    merged sample by sample (audio_merge.merge_pcm), then encoded once,
+    instead of concatenating the encoded files byte by byte.
     """
     
-    audio_files = glob.glob(os.path.join(tmp_dir, "part*.mp3"))
+    audio_files = glob.glob(os.path.join(tmp_dir, "part*.*"))
     
     if not audio_files:
         print("No audio files found!")
@@ -174,7 +399,7 @@ def merge_audio_parts_advanced(tmp_dir, output_file):
     
     # Extract numbers from files using regex
     def extract_number(filename):
-        match = re.search(r'part(\d+)\.mp3', os.path.basename(filename))
+        match = re.search(r'part(\d+)\.', os.path.basename(filename))
         return int(match.group(1)) if match else 0
     
     # Sort by extracted numbers
@@ -184,13 +409,22 @@ def merge_audio_parts_advanced(tmp_dir, output_file):
     for i, file in enumerate(audio_files, 1):
         print(f"  {i:2d}. {os.path.basename(file)}")
     
+    import torchaudio
+
     # Merge the files
     try:
-        with open(output_file, 'wb') as outfile:
-            for audio_file in audio_files:
-                with open(audio_file, 'rb') as infile:
-                    outfile.write(infile.read())
-                print(f"✓ Added: {os.path.basename(audio_file)}")
+        parts = []
+        for audio_file in audio_files:
+            wav, sample_rate = torchaudio.load(audio_file)
+            if sample_rate != SAMPLE_RATE:
+                wav = torchaudio.functional.resample(wav, sample_rate, SAMPLE_RATE)
+            parts.append(wav.mean(dim=0).numpy())
+            print(f"✓ Added: {os.path.basename(audio_file)}")
+        
+        with METRICS.stage("merge") as record:
+            merged = merge_pcm(parts, SAMPLE_RATE, pause_ms=pause_ms)
+            record["audio_seconds"] = merged.size / SAMPLE_RATE
+        save_wav(output_file, merged)
         
         print(f"\n✅ Final file saved in: {output_file}")
         print(f"📁 Size: {os.path.getsize(output_file) / (1024*1024):.2f} MB")
@@ -201,9 +435,633 @@ def merge_audio_parts_advanced(tmp_dir, output_file):
         return False
 
 
+def error_response(error):
+    """
+    Response fields of a failed request. "transient" tells the client that
+    the same request may succeed later: the host or the GPU ran out of
+    memory (torch.cuda.OutOfMemoryError) or an operation timed out. Any
+    other error fails the same way every time.
+    """
+    transient = isinstance(error, (MemoryError, TimeoutError))
+    torch = sys.modules.get("torch")
+    out_of_memory = getattr(getattr(torch, "cuda", None), "OutOfMemoryError", None)
+    if out_of_memory is not None and isinstance(error, out_of_memory):
+        transient = True
+    return {"status": "error", "error": str(error), "transient": transient}
+
+
+def run_batch(chunks, audio_sample_file, language="en", speed=1.0, dtype="float32", emit=None):
+    """
+    Synthesizes several chunks back to back with a single set of
+    conditioning latents.
+
+    Args:
+        chunks: List of {"id", "text", optional "output_file"} dictionaries.
+            Chunks with an output_file are saved there, the others are
+            returned as raw PCM.
+        audio_sample_file: Voice sample file shared by all chunks.
+        language: Audio language.
+        speed: Speech speed.
+        dtype: PCM sample type for chunks without an output file.
+        emit: Optional callable(result, pcm) invoked as soon as each chunk
+            finishes (pcm is empty for saved or failed chunks).
+
+    Returns:
+        list: One result dictionary per chunk, with "id", "status" and
+            either "output_file"/PCM metadata or "error" and "transient".
+    """
+    audio_sample_file = os.path.expanduser(audio_sample_file)
+    if not voice_exists(audio_sample_file):
+        raise FileNotFoundError(f"Voice not found: {audio_sample_file}")
+
+    gpt_cond_latent, speaker_embedding = get_conditioning_latents(audio_sample_file)
+    results = []
+
+    for chunk in chunks:
+        start = time.perf_counter()
+        pcm = b""
+        try:
+            wav = synthesize_wav(chunk["text"], gpt_cond_latent, speaker_embedding, language, speed)
+            if chunk.get("output_file"):
+                output_file = os.path.expanduser(chunk["output_file"])
+                save_wav(output_file, wav)
+                result = {"id": chunk["id"], "status": "ok", "output_file": output_file}
+            else:
+                pcm = to_pcm(wav, dtype)
+                result = {"id": chunk["id"], "status": "ok", **pcm_header(pcm, SAMPLE_RATE)}
+        except Exception as e:
+            result = {"id": chunk["id"], **error_response(e)}
+
+        result["seconds"] = time.perf_counter() - start
+        results.append(result)
+        if emit is not None:
+            emit(result, pcm)
+
+    return results
+
+
+def run_batch_manifest(manifest_file):
+    """
+    Runs a JSON batch manifest from the command line:
+
+        {"sample_file": "voice.wav", "language": "en", "speed": 1.0,
+         "results_file": "results.json",
+         "chunks": [{"id": 1, "text": "...", "output_file": "part1.wav"}, ...]}
+
+    Results are written to results_file (or printed as JSON).
+
+    Returns:
+        bool: True if every chunk succeeded.
+    """
+    with open(os.path.expanduser(manifest_file), 'r') as f:
+        manifest = json.load(f)
+
+    results = run_batch(
+        manifest["chunks"],
+        manifest["sample_file"],
+        language=manifest.get("language", "en"),
+        speed=float(manifest.get("speed", 1.0)),
+        emit=lambda result, pcm: print(
+            f"{'✅' if result['status'] == 'ok' else '❌'} Chunk {result['id']} "
+            f"({result['seconds']:.1f}s)", flush=True
+        )
+    )
+
+    report = json.dumps({"results": results}, indent=4)
+    if manifest.get("results_file"):
+        with open(os.path.expanduser(manifest["results_file"]), 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+
+    return all(result["status"] == "ok" for result in results)
+
+
+# --- Worker Mode ---
+# A long-lived process that loads the model once and serves chunk requests
+# over a Unix socket (see ipc.py for the message framing).
+
+MODEL_LOCK = threading.Lock()
+WORKER_STOP = threading.Event()
+# Synthesis requests, counted in chunks (a batch counts one per chunk)
+JOB_OPS = ("synthesize", "stream", "batch")
+
+# --- Worker lifecycle ---
+# A long-lived model process grows (Python heap, allocator fragmentation):
+# past a number of jobs or a memory watermark, the worker starts a
+# replacement, which loads (and optionally warms up) the model and then
+# takes over the socket path, and exits once its in-flight requests are done (see
+# recycle_worker). Capacity never drops while the model reloads.
+
+WARMUP_TEXT = "Hello, this is a short sentence to warm up the model."
+# Garbage collection and release of cached device memory, every N jobs
+RELEASE_EVERY = 20
+# A failed replacement is tried again after this many jobs
+RECYCLE_RETRY_JOBS = 100
+REPLACEMENT_TIMEOUT = 600
+DRAIN_TIMEOUT = 600
+
+MAX_JOBS = None       # --max-jobs
+MAX_RSS_MB = None     # --max-rss-mb
+MAX_CUDA_MB = None    # --max-cuda-mb (reserved by the torch allocator)
+WARMUP_SAMPLE = None  # --warmup-sample
+
+LIFECYCLE_LOCK = threading.Lock()
+JOBS_SERVED = 0
+NEXT_RECYCLE_CHECK = 0
+RECYCLING = threading.Event()
+DRAINING = threading.Event()
+SOCKET_PATH = None
+SOCKET_INODE = None
+# Open connections -> True while a request is being served
+CONNECTIONS = {}
+CONNECTIONS_LOCK = threading.Lock()
+
+
+def rss_mb():
+    """
+    Returns the resident memory of this process in MB.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Peak rather than current RSS (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def memory_stats():
+    """
+    Returns the RSS and the torch allocator statistics of the worker, in MB.
+    """
+    stats = {"rss_mb": rss_mb()}
+    if MODEL is not None:
+        stats.update(MODEL.memory_stats())
+    return stats
+
+
+def release_memory():
+    """
+    Collects garbage and returns cached device memory to the driver.
+    """
+    gc.collect()
+    if MODEL is not None:
+        MODEL.release_memory()
+
+
+def recycle_reason():
+    """
+    Returns why the worker should be recycled, or None.
+    """
+    if MAX_JOBS and JOBS_SERVED >= MAX_JOBS:
+        return f"{JOBS_SERVED} jobs served"
+    memory = memory_stats()
+    if MAX_RSS_MB and memory["rss_mb"] >= MAX_RSS_MB:
+        return f"RSS {memory['rss_mb']:.0f} MB"
+    if MAX_CUDA_MB and memory.get("cuda_reserved_mb", 0) >= MAX_CUDA_MB:
+        return f"CUDA reserved {memory['cuda_reserved_mb']:.0f} MB"
+    return None
+
+
+def job_done(count=1):
+    """
+    Counts finished jobs, releases memory every RELEASE_EVERY jobs and
+    starts recycling the worker past a watermark.
+    """
+    global JOBS_SERVED
+    with LIFECYCLE_LOCK:
+        before = JOBS_SERVED
+        JOBS_SERVED += count
+        release = JOBS_SERVED // RELEASE_EVERY != before // RELEASE_EVERY
+        check = JOBS_SERVED >= NEXT_RECYCLE_CHECK
+    if release:
+        release_memory()
+
+    if (MAX_JOBS or MAX_RSS_MB or MAX_CUDA_MB) and not RECYCLING.is_set() and check:
+        reason = recycle_reason()
+        if reason and not RECYCLING.is_set():
+            RECYCLING.set()
+            threading.Thread(target=recycle_worker, args=(reason,), daemon=True).start()
+
+
+def socket_taken_over():
+    """
+    Tells whether another worker now listens on our socket path.
+    """
+    try:
+        return os.stat(SOCKET_PATH).st_ino != SOCKET_INODE
+    except OSError:
+        return False
+
+
+def socket_alive(socket_path):
+    """
+    Tells whether a worker accepts connections on socket_path (a socket
+    left behind by a crashed worker refuses them).
+    """
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    probe.settimeout(1.0)
+    try:
+        probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def drain():
+    """
+    Stops the worker once its requests in progress are done: idle
+    connections are closed (clients reconnect to the worker now on the
+    socket path) and new requests are refused.
+    """
+    DRAINING.set()
+    with CONNECTIONS_LOCK:
+        for conn, busy in CONNECTIONS.items():
+            if not busy:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    deadline = time.monotonic() + DRAIN_TIMEOUT
+    while time.monotonic() < deadline:
+        with CONNECTIONS_LOCK:
+            if not CONNECTIONS:
+                break
+        time.sleep(0.1)
+    WORKER_STOP.set()
+
+
+def recycle_worker(reason):
+    """
+    Starts a replacement worker with the same arguments and, once it has
+    taken over the socket path, drains this one (see drain).
+    """
+    global NEXT_RECYCLE_CHECK
+    print(f"♻️  Recycling worker ({reason}), starting a replacement", flush=True)
+    argv = sys.argv if "--takeover" in sys.argv else sys.argv + ["--takeover"]
+    replacement = subprocess.Popen(
+        [sys.executable] + argv,
+        stdin=subprocess.DEVNULL,
+        cwd=os.getcwd(),
+        start_new_session=True
+    )
+
+    deadline = time.monotonic() + REPLACEMENT_TIMEOUT
+    while not socket_taken_over() and not WORKER_STOP.is_set():
+        if replacement.poll() is not None or time.monotonic() > deadline:
+            if replacement.poll() is None:
+                replacement.kill()
+            print("⚠️  Replacement worker failed to start, serving on", flush=True)
+            with LIFECYCLE_LOCK:
+                NEXT_RECYCLE_CHECK = JOBS_SERVED + RECYCLE_RETRY_JOBS
+            RECYCLING.clear()
+            return
+        time.sleep(0.2)
+
+    if WORKER_STOP.is_set():
+        # Shut down while the replacement was starting: stop it as well
+        replacement.kill()
+        replacement.wait()
+        return
+
+    print(f"🔁 Replacement ready (pid {replacement.pid}), draining", flush=True)
+    drain()
+
+
+def warm_up(sample_file):
+    """
+    Runs a short synthesis before the worker takes traffic, so the first
+    request does not pay for lazy initialization (CUDA kernels, allocator
+    pools, compiled graphs) and the voice latents are cached.
+    """
+    if not voice_exists(os.path.expanduser(sample_file)):
+        print(f"⚠️  Warm-up skipped, voice not found: {sample_file}", flush=True)
+        return
+    start = time.perf_counter()
+    try:
+        with METRICS.stage("warmup", chars=len(WARMUP_TEXT)) as record:
+            gpt_cond_latent, speaker_embedding = get_conditioning_latents(os.path.expanduser(sample_file))
+            wav = MODEL.inference(WARMUP_TEXT, "en", gpt_cond_latent, speaker_embedding)
+            record["audio_seconds"] = wav.size / SAMPLE_RATE
+    except Exception as e:
+        print(f"⚠️  Warm-up failed: {e}", flush=True)
+        return
+    print(f"🔥 Warm-up done in {time.perf_counter() - start:.2f}s", flush=True)
+
+def handle_worker_request(header):
+    """
+    Executes a single worker request.
+
+    Returns:
+        tuple: (response header, response payload)
+    """
+    op = header.get("op")
+
+    if op == "ping":
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "device": str(MODEL.device),
+            "latent_cache": LATENT_CACHE.stats() if LATENT_CACHE else None,
+            "jobs": JOBS_SERVED,
+            "memory": memory_stats(),
+            "recycling": RECYCLING.is_set()
+        }, b""
+
+    if op == "synthesize":
+        audio_sample_file = os.path.expanduser(header["sample_file"])
+        output_file = header.get("output_file")
+        dtype = header.get("dtype", "float32")
+
+        if not voice_exists(audio_sample_file):
+            return {"status": "error", "error": f"Voice not found: {audio_sample_file}"}, b""
+        if dtype not in PCM_DTYPES:
+            return {"status": "error", "error": f"Unsupported PCM dtype: {dtype}"}, b""
+
+        # The model is shared by all connections, inference is serialized
+        with MODEL_LOCK:
+            gpt_cond_latent, speaker_embedding = get_conditioning_latents(audio_sample_file)
+            wav = synthesize_wav(
+                header["text"], gpt_cond_latent, speaker_embedding,
+                language=header.get("language", "en"),
+                speed=float(header.get("speed", 1.0))
+            )
+
+        # Without an output file, the raw samples go back over the socket
+        if not output_file:
+            pcm = to_pcm(wav, dtype)
+            return {"status": "ok", **pcm_header(pcm, SAMPLE_RATE)}, pcm
+
+        output_file = os.path.expanduser(output_file)
+        save_wav(output_file, wav)
+        return {"status": "ok", "output_file": output_file}, b""
+
+    if op == "metrics":
+        snapshot = METRICS.snapshot()
+        if header.get("reset"):
+            METRICS.reset()
+        snapshot.update({"jobs": JOBS_SERVED, "memory": memory_stats()})
+        return {"status": "ok", "pid": os.getpid(), "metrics": snapshot}, b""
+
+    return {"status": "error", "error": f"Unknown operation: {op}"}, b""
+
+
+def stream_worker_request(conn, header):
+    """
+    Streams the audio of one chunk back to the client as several PCM frames,
+    using XTTS incremental inference when the installed model supports it.
+    The last message carries "done": True and no payload.
+    """
+    audio_sample_file = os.path.expanduser(header["sample_file"])
+    dtype = header.get("dtype", "float32")
+    language = header.get("language", "en")
+    speed = float(header.get("speed", 1.0))
+
+    if not voice_exists(audio_sample_file):
+        send_message(conn, {"status": "error", "error": f"Voice not found: {audio_sample_file}"})
+        return
+    if dtype not in PCM_DTYPES:
+        send_message(conn, {"status": "error", "error": f"Unsupported PCM dtype: {dtype}"})
+        return
+
+    with MODEL_LOCK:
+        gpt_cond_latent, speaker_embedding = get_conditioning_latents(audio_sample_file)
+
+        frames = MODEL.inference_stream(
+            header["text"],
+            language,
+            gpt_cond_latent,
+            speaker_embedding,
+            speed=speed,
+            stream_chunk_size=int(header.get("stream_chunk_size", 20))
+        )
+
+        count = 0
+        with METRICS.stage("inference", chars=len(header["text"])) as record:
+            for frame in frames:
+                pcm = to_pcm(frame, dtype)
+                record["audio_seconds"] += pcm.size / SAMPLE_RATE
+                # A failed send means the client went away: stop generating
+                send_message(conn, {"status": "ok", "frame": count, **pcm_header(pcm, SAMPLE_RATE)}, pcm)
+                count += 1
+
+    send_message(conn, {"status": "ok", "done": True, "frames": count})
+
+
+def batch_worker_request(conn, header):
+    """
+    Runs a batch request, sending one message per chunk as it finishes and
+    a final summary with "done": True.
+    """
+    dtype = header.get("dtype", "float32")
+    if dtype not in PCM_DTYPES:
+        send_message(conn, {"status": "error", "error": f"Unsupported PCM dtype: {dtype}"})
+        return
+
+    with MODEL_LOCK:
+        results = run_batch(
+            header["chunks"],
+            header["sample_file"],
+            language=header.get("language", "en"),
+            speed=float(header.get("speed", 1.0)),
+            dtype=dtype,
+            # Per-chunk failures are reported, not raised, so the batch goes on
+            emit=lambda result, pcm: send_message(conn, result, pcm)
+        )
+
+    send_message(conn, {
+        "status": "ok",
+        "done": True,
+        "completed": [r["id"] for r in results if r["status"] == "ok"],
+        "failed": [r["id"] for r in results if r["status"] != "ok"]
+    })
+
+
+def serve_connection(conn):
+    """
+    Serves requests from one client until it disconnects, asks the worker
+    to shut down or the worker drains (see recycle_worker).
+    """
+    with conn:
+        with CONNECTIONS_LOCK:
+            CONNECTIONS[conn] = False
+        try:
+            while True:
+                try:
+                    header, _ = recv_message(conn)
+                except (ConnectionError, OSError, ValueError):
+                    return
+
+                with CONNECTIONS_LOCK:
+                    if DRAINING.is_set():
+                        # Not started: the client sends it again to the replacement
+                        return
+                    CONNECTIONS[conn] = True
+                try:
+                    keep_open = serve_request(conn, header)
+                finally:
+                    with CONNECTIONS_LOCK:
+                        CONNECTIONS[conn] = False
+
+                if header.get("op") in JOB_OPS:
+                    job_done(len(header.get("chunks") or ()) or 1)
+                if not keep_open or DRAINING.is_set():
+                    return
+        finally:
+            with CONNECTIONS_LOCK:
+                CONNECTIONS.pop(conn, None)
+
+
+def serve_request(conn, header):
+    """
+    Answers one request on a connection.
+
+    Returns:
+        bool: False if the connection must be closed.
+    """
+    if header.get("op") == "shutdown":
+        send_message(conn, {"status": "ok"})
+        WORKER_STOP.set()
+        return False
+
+    if header.get("op") in ("stream", "batch"):
+        handler = stream_worker_request if header["op"] == "stream" else batch_worker_request
+        try:
+            handler(conn, header)
+        except ConnectionError:
+            # Client went away mid-response
+            return False
+        except Exception as e:
+            try:
+                send_message(conn, error_response(e))
+            except OSError:
+                return False
+        return True
+
+    try:
+        response, payload = handle_worker_request(header)
+    except Exception as e:
+        response, payload = error_response(e), b""
 
+    try:
+        send_message(conn, response, payload)
+    except OSError:
+        return False
+    return True
 
 
+def configure_cpu(threads=None, interop_threads=None, cpu_affinity=None):
+    """
+    Limits the CPU resources of this process, so several workers can share
+    a host without oversubscribing it. Must run before the model is loaded.
+
+    Args:
+        threads: torch intra-op thread count.
+        interop_threads: torch inter-op thread count.
+        cpu_affinity: List of CPU ids this process may run on.
+    """
+    if cpu_affinity:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpu_affinity)
+        else:
+            print("⚠️  CPU affinity is not supported on this platform")
+    if BACKEND != "xtts":
+        # Only the XTTS backend runs torch
+        return
+
+    with startup_stage("imports (torch, TTS)"):
+        import torch
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        torch.set_num_interop_threads(interop_threads)
+
+    print(f"🧵 Threads: {torch.get_num_threads()} intra-op, "
+          f"{torch.get_num_interop_threads()} inter-op"
+          + (f", CPUs {cpu_affinity}" if cpu_affinity else ""), flush=True)
+
+
+def run_worker(socket_path=DEFAULT_SOCKET_PATH, use_cuda=True, threads=None,
+               interop_threads=None, cpu_affinity=None, profile_startup=False, takeover=False):
+    """
+    Loads the model once and serves chunk requests until shutdown.
+
+    Args:
+        socket_path: Unix socket path to listen on.
+        use_cuda: Use GPU if available.
+        threads, interop_threads, cpu_affinity: See configure_cpu.
+        profile_startup: Print the startup profile once the model is loaded.
+        takeover: Take the socket path over from a live worker (the
+            replacement started by recycle_worker). Otherwise only a stale
+            socket is replaced, and the worker exits if another one is
+            already listening.
+
+    Returns:
+        bool: False if another worker already listens on socket_path.
+    """
+    global MODEL, SOCKET_PATH, SOCKET_INODE
+    if not takeover and socket_alive(socket_path):
+        print(f"❌ Another worker already listens on {socket_path}", flush=True)
+        return False
+    configure_cpu(threads, interop_threads, cpu_affinity)
+    MODEL = load_model(use_cuda)
+    if WARMUP_SAMPLE:
+        warm_up(WARMUP_SAMPLE)
+    if profile_startup:
+        print(startup_report(), flush=True)
+
+    # Listen on a private path, then move it over socket_path in one step:
+    # this replaces a stale socket left behind by a crashed worker, or takes
+    # over from the worker being recycled, without a moment where clients
+    # find no socket at all
+    bind_path = f"{socket_path}.{os.getpid()}"
+    if os.path.exists(bind_path):
+        os.unlink(bind_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(bind_path)
+    server.listen(8)
+    # Checked again: another worker may have started while the model loaded
+    if not takeover and socket_alive(socket_path):
+        server.close()
+        os.unlink(bind_path)
+        print(f"❌ Another worker already listens on {socket_path}", flush=True)
+        return False
+    os.replace(bind_path, socket_path)
+    SOCKET_PATH = socket_path
+    SOCKET_INODE = os.stat(socket_path).st_ino
+    print(f"🟢 Worker ready on {socket_path} (pid {os.getpid()})", flush=True)
+
+    # Wakes up regularly to notice WORKER_STOP
+    server.settimeout(1.0)
+    try:
+        while not WORKER_STOP.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                # Another worker replaced our socket without recycling us
+                # (e.g. two workers started on a stale socket at once):
+                # clients now reach it, so finish our requests and exit
+                if not RECYCLING.is_set() and socket_taken_over():
+                    print(f"⚠️  Another worker took over {socket_path}, draining", flush=True)
+                    drain()
+                continue
+            if WORKER_STOP.is_set():
+                conn.close()
+                break
+            threading.Thread(target=serve_connection, args=(conn,), daemon=True).start()
+    finally:
+        server.close()
+        # After a recycle the path belongs to the replacement
+        if not socket_taken_over() and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print("🔴 Worker stopped", flush=True)
+    return True
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -217,16 +1075,18 @@ if __name__ == "__main__":
             """
         )
         
-    # Required arguments
+    # Required arguments (unless running as a worker)
     parser.add_argument(
         "texto",
         type=str,
+        nargs="?",
         help="Text to be converted to audio"
     )
     
     parser.add_argument(
         "output_file", 
         type=str,
+        nargs="?",
         help="Name of the output file (e.g., audio.mp3)"
     )
     
@@ -265,8 +1125,157 @@ if __name__ == "__main__":
         help="Location of the xtts folder"
     )
     
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Run as a persistent worker that keeps the model loaded"
+    )
+
+    parser.add_argument(
+        "--socket",
+        type=str,
+        dest="socket_path",
+        default=DEFAULT_SOCKET_PATH,
+        help=f"Unix socket used in worker mode (default: {DEFAULT_SOCKET_PATH})"
+    )
+    
+    parser.add_argument(
+        "--threads",
+        type=int,
+        help="torch intra-op threads for this process"
+    )
+
+    parser.add_argument(
+        "--interop-threads",
+        type=int,
+        help="torch inter-op threads for this process"
+    )
+
+    parser.add_argument(
+        "--cpu-affinity",
+        type=lambda value: [int(cpu) for cpu in value.split(",") if cpu],
+        help="Comma-separated CPU ids to pin this process to (e.g. 0,1,2,3)"
+    )
+
+    parser.add_argument(
+        "--batch",
+        type=str,
+        dest="batch_manifest",
+        help="Run a JSON manifest of chunks in a single call (see run_batch_manifest)"
+    )
+
+    parser.add_argument(
+        "--latent-cache-dir",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help=f"Disk cache for speaker latents, empty to disable (default: {DEFAULT_CACHE_DIR})"
+    )
+
+    parser.add_argument(
+        "--latent-cache-entries",
+        type=int,
+        default=32,
+        help="Number of voices kept in memory (default: 32)"
+    )
+
+    parser.add_argument(
+        "--latent-cache-mb",
+        type=int,
+        default=256,
+        help="Size limit of the disk latent cache in MB (default: 256)"
+    )
+    
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="xtts",
+        help="Inference backend: the XTTS model, or a deterministic CPU stub for "
+             "benchmarks and tests (default: xtts)"
+    )
+
+    parser.add_argument(
+        "--stub-rtf",
+        type=float,
+        default=0.3,
+        help="Real-time factor simulated by the stub backend (default: 0.3)"
+    )
+
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="CPU performance mode: int8 dynamic quantization of the GPT linear layers, "
+             "cached on disk after the first load"
+    )
+
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compile the GPT and the vocoder with torch.compile (torch >= 2.0)"
+    )
+
+    parser.add_argument(
+        "--quantized-cache-dir",
+        type=str,
+        default=DEFAULT_QUANTIZED_DIR,
+        help=f"Disk cache for the quantized model, empty to disable (default: {DEFAULT_QUANTIZED_DIR})"
+    )
+
+    parser.add_argument(
+        "--voice-bank",
+        type=str,
+        help="Voice bank built with voice_bank.py; its voices are selected with --sample voice:<name>"
+    )
+
+    parser.add_argument(
+        "--max-jobs",
+        type=int,
+        help="Worker mode: recycle the worker after this many synthesized chunks"
+    )
+
+    parser.add_argument(
+        "--max-rss-mb",
+        type=float,
+        help="Worker mode: recycle the worker when its resident memory exceeds this many MB"
+    )
+
+    parser.add_argument(
+        "--max-cuda-mb",
+        type=float,
+        help="Worker mode: recycle the worker when the torch allocator reserves more than this many MB"
+    )
+
+    parser.add_argument(
+        "--warmup-sample",
+        type=str,
+        help="Worker mode: run a warm-up synthesis with this voice before taking traffic "
+             "(default: no warm-up)"
+    )
+
+    parser.add_argument(
+        "--takeover",
+        action="store_true",
+        help="Worker mode: take the socket path over from a live worker (used when recycling)"
+    )
+
+    parser.add_argument(
+        "--metrics",
+        choices=("summary", "json", "prometheus"),
+        help="Print per-stage timings (model load, latents, inference, merge, encode) at the end"
+    )
+
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Report the time spent in imports, config parsing, checkpoint load "
+             "and device transfer (alone: load the model, print the report and exit)"
+    )
+    
     # Parse arguments
-    args = parser.parse_args()
+    with startup_stage("argument parsing"):
+        args = parser.parse_args()
+
+    if not (args.worker or args.batch_manifest or args.profile_startup) and (args.texto is None or args.output_file is None):
+        parser.error("texto and output_file are required unless --worker, --batch or --profile-startup is given")
 
     # python3 ~/Downloads/python/make_audio_novenv.py 'Hello Man, I am the Batman. You - Gabriel - are THE GOAT !!!!'  batman2.mp3 -s "~/xtts-webui-v1_0-portable/webui/speakers/Batman_voice.wav"
 
@@ -278,13 +1287,68 @@ if __name__ == "__main__":
     # Call the make_audios function
 
 
-    XTTS_DIR = os.path.expanduser(args.folder_xtts)
-    MODEL_DIR =  os.path.join(XTTS_DIR, "models", "v2.0.2")
-    CONFIG_PATH = os.path.join(MODEL_DIR, "config.json")
-    CHECKPOINT_PATH =  os.path.join(MODEL_DIR, "model.pth") # Assuming default name
-    VOCAB_PATH = os.path.join(MODEL_DIR, "vocab.json") 
-    SPEAKER_FILE_PATH = os.path.join(MODEL_DIR, "speakers_xtts.pth") 
+    BACKEND = args.backend
+    STUB_RTF = args.stub_rtf
+
+    QUANTIZE = args.quantize
+    COMPILE = args.compile
+
+    MAX_JOBS = args.max_jobs
+    MAX_RSS_MB = args.max_rss_mb
+    MAX_CUDA_MB = args.max_cuda_mb
+    WARMUP_SAMPLE = args.warmup_sample
+    QUANTIZED_CACHE_DIR = args.quantized_cache_dir
+
+    set_xtts_dir(args.folder_xtts or XTTS_DIR)
+
+    if args.voice_bank:
+        VOICE_BANK = VoiceBank(args.voice_bank)
+        if VOICE_BANK.model_version.removesuffix(":int8") != model_version().removesuffix(":int8"):
+            print("⚠️  The voice bank was built with another model, voices may sound different")
+        print(f"🗂️  Voice bank: {len(VOICE_BANK)} voices ({args.voice_bank})")
+
+    LATENT_CACHE = LatentCache(
+        model_version=model_version(),
+        max_entries=args.latent_cache_entries,
+        # Stub latents are cheap and not torch tensors: memory tier only
+        cache_dir=args.latent_cache_dir if BACKEND == "xtts" else None,
+        max_disk_bytes=args.latent_cache_mb * 1024 * 1024
+    )
+    
+    if args.profile_startup and not (args.worker or args.batch_manifest or args.texto):
+        configure_cpu(args.threads, args.interop_threads, args.cpu_affinity)
+        MODEL = load_model(args.use_cuda)
+        print(startup_report())
+        sys.exit(0)
     
+    if args.worker:
+        try:
+            started = run_worker(
+                socket_path=args.socket_path,
+                use_cuda=args.use_cuda,
+                threads=args.threads,
+                interop_threads=args.interop_threads,
+                cpu_affinity=args.cpu_affinity,
+                profile_startup=args.profile_startup,
+                takeover=args.takeover
+            )
+        except KeyboardInterrupt:
+            started = True
+        sys.exit(0 if started else 1)
+
+    if args.batch_manifest:
+        MODEL = load_model(args.use_cuda)
+        if args.profile_startup:
+            print(startup_report())
+        try:
+            success = run_batch_manifest(args.batch_manifest)
+        except Exception as e:
+            print(f"❌ Error running batch: {e}")
+            sys.exit(1)
+        if args.metrics:
+            print(render_metrics(args.metrics))
+        sys.exit(0 if success else 2)
+
     try:
         make_audios(
             texto=args.texto,
@@ -295,6 +1359,10 @@ if __name__ == "__main__":
             speed = float(args.speed),
             folder_xtts = args.folder_xtts
         )
+        if args.profile_startup:
+            print(startup_report())
+        if args.metrics:
+            print(render_metrics(args.metrics))
     except Exception as e:
         print(f"❌ Error generating audio: {e}")
         sys.exit(1)
\ No newline at end of file
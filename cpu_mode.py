@@ -0,0 +1,172 @@
+"""
+Opt-in CPU performance mode for the XTTS model (see core.py --quantize and
+--compile).
+
+- Dynamic int8 quantization of the linear layers of the GPT part (the
+  autoregressive decoder, where most of the CPU time goes). Weights are
+  stored as int8 and activations are quantized on the fly, which roughly
+  halves the GPT time on recent x86 CPUs. The HiFi-GAN vocoder is made of
+  convolutions and stays in float32.
+- The quantized model is saved to disk, keyed by the checkpoint and the
+  torch/TTS versions, so later loads skip reading the float32 checkpoint
+  and quantizing it again.
+- Optional torch.compile of the GPT and the vocoder (torch >= 2.0).
+
+torch is imported inside the functions, like everywhere in core.py.
+"""
+import hashlib
+import json
+import os
+
+DEFAULT_QUANTIZED_DIR = os.path.expanduser("~/.cache/xtts-local-api/quantized")
+
+
+def _package_version(*names):
+    from importlib import metadata
+
+    for name in names:
+        try:
+            return metadata.version(name)
+        except metadata.PackageNotFoundError:
+            continue
+    return ""
+
+
+def quantized_cache_file(cache_dir, model_version, dtype="qint8"):
+    """
+    Returns the cache file of the quantized model. The key covers the
+    checkpoint and the torch/TTS versions: a quantized model is a pickled
+    module and can only be loaded back by the versions that saved it.
+    """
+    import torch
+
+    raw = json.dumps([model_version, dtype, torch.__version__, _package_version("coqui-tts", "TTS")])
+    key = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(os.path.expanduser(cache_dir), f"xtts_{key}.pt")
+
+
+def conv1d_to_linear(module):
+    """
+    Replaces the HuggingFace GPT-2 Conv1D layers (a linear layer with a
+    transposed weight) by nn.Linear, in place, so dynamic quantization
+    picks them up.
+
+    Returns:
+        int: Number of layers replaced.
+    """
+    import torch
+
+    replaced = 0
+    for name, child in module.named_children():
+        # Matched by name: importing transformers just for the type is not needed
+        if type(child).__name__ == "Conv1D" and getattr(child, "weight", None) is not None \
+                and child.weight.dim() == 2:
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features, bias=child.bias is not None)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                if child.bias is not None:
+                    linear.bias.copy_(child.bias)
+            setattr(module, name, linear)
+            replaced += 1
+        else:
+            replaced += conv1d_to_linear(child)
+    return replaced
+
+
+def quantize_model(model):
+    """
+    Applies dynamic int8 quantization to the linear layers of model.gpt,
+    in place. CPU only.
+
+    Returns:
+        The model.
+    """
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    model.eval()
+    conv1d_to_linear(model.gpt)
+    quantize_dynamic(model.gpt, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def save_quantized(model, cache_file):
+    """
+    Saves the whole quantized model (structure and weights). Failures only
+    cost the speed-up of the next load.
+    """
+    import torch
+
+    tmp_file = f"{cache_file}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        torch.save(model, tmp_file)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        print(f"⚠️  Could not save the quantized model: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def load_quantized(cache_file):
+    """
+    Loads a model saved by save_quantized.
+
+    Returns:
+        The model, or None if the file is missing or unreadable.
+    """
+    import torch
+
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        # A pickled module: only files written by save_quantized are loaded
+        model = torch.load(cache_file, map_location="cpu", weights_only=False)
+    except Exception as e:
+        print(f"⚠️  Ignoring unreadable quantized model {cache_file}: {e}")
+        return None
+    model.eval()
+    return model
+
+
+def compile_model(model):
+    """
+    Wraps the GPT and the vocoder with torch.compile. The first chunks of
+    each new length are slower while the graphs are built.
+
+    Returns:
+        bool: False if torch.compile is unavailable or failed.
+    """
+    import torch
+
+    if not hasattr(torch, "compile"):
+        print("⚠️  torch.compile needs torch >= 2.0, running uncompiled")
+        return False
+    try:
+        # The forward methods are compiled rather than the modules: XTTS
+        # calls gpt_inference.generate(), which would bypass a compiled
+        # wrapper. Text and audio lengths change with every chunk, so
+        # dynamic shapes avoid a recompilation per length.
+        for module in (model.gpt.gpt_inference, model.hifigan_decoder):
+            module.forward = torch.compile(module.forward, dynamic=True)
+    except Exception as e:
+        print(f"⚠️  torch.compile failed, running uncompiled: {e}")
+        return False
+    return True
+
+
+def tune_cpu():
+    """
+    Thread settings for CPU inference: denormal floats flushed to zero
+    (slow paths in the vocoder otherwise) and a single inter-op thread,
+    since the model runs one operator at a time.
+    """
+    import torch
+
+    torch.set_flush_denormal(True)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Already set (--interop-threads) or parallel work already started
+        pass
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+# Every message on the worker socket is framed as:
+#   4-byte big-endian header length | UTF-8 JSON header | binary payload
+# The size of the (optional) binary payload is stored in header["payload_bytes"].
+HEADER_STRUCT = struct.Struct(">I")
+MAX_HEADER_BYTES = 16 * 1024 * 1024
+
+DEFAULT_SOCKET_PATH = os.path.join(
+    tempfile.gettempdir(), f"xtts_worker_{os.getuid()}.sock"
+)
+
+
+def send_message(sock, header, payload=b""):
+    """
+    Sends one framed message (JSON header + optional binary payload).
+
+    Args:
+        sock: Connected stream socket.
+        header: JSON-serializable dictionary.
+        payload: Optional bytes-like object (e.g. a contiguous NumPy array)
+            sent right after the header.
+    """
+    # A flat byte view works for bytes as well as contiguous NumPy arrays,
+    # so PCM buffers are sent without an intermediate copy
+    payload = memoryview(payload).cast("B")
+
+    header = dict(header)
+    header["payload_bytes"] = payload.nbytes
+    raw_header = json.dumps(header).encode("utf-8")
+
+    sock.sendall(HEADER_STRUCT.pack(len(raw_header)) + raw_header)
+    if payload.nbytes:
+        sock.sendall(payload)
+
+
+def recv_exact(sock, size):
+    """
+    Reads exactly `size` bytes from the socket into a new bytearray.
+
+    Raises:
+        ConnectionError: If the peer closes the connection mid-message.
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ConnectionError("Connection closed by peer")
+        received += count
+
+    return buffer
+
+
+def recv_message(sock):
+    """
+    Reads one framed message.
+
+    Returns:
+        tuple: (header dict, payload bytearray)
+
+    Raises:
+        ConnectionError: If the connection is closed or the frame is invalid.
+    """
+    (header_size,) = HEADER_STRUCT.unpack(recv_exact(sock, HEADER_STRUCT.size))
+    if header_size > MAX_HEADER_BYTES:
+        raise ConnectionError(f"Invalid header size: {header_size}")
+
+    header = json.loads(recv_exact(sock, header_size).decode("utf-8"))
+    payload_size = int(header.get("payload_bytes", 0))
+    payload = recv_exact(sock, payload_size) if payload_size else bytearray()
+
+    return header, payload
+
+
+# --- Raw PCM ---
+# Audio travels as raw little-endian samples plus metadata in the header,
+# so no codec runs between the model and the final encode.
+
+PCM_DTYPES = ("float32", "int16")
+
+
+def pcm_header(samples, sample_rate, channels=1):
+    """
+    Returns the header fields describing a NumPy PCM buffer.
+    """
+    return {
+        "sample_rate": int(sample_rate),
+        "channels": int(channels),
+        "dtype": str(samples.dtype),
+        "num_samples": int(samples.shape[0]),
+    }
+
+
+def decode_pcm(header, payload):
+    """
+    Wraps a received PCM payload in a NumPy array without copying it.
+
+    Returns:
+        tuple: (samples, sample_rate)
+    """
+    dtype = header.get("dtype", "float32")
+    if dtype not in PCM_DTYPES:
+        raise ValueError(f"Unsupported PCM dtype: {dtype}")
+
+    samples = np.frombuffer(payload, dtype=np.dtype(dtype).newbyteorder("<"))
+    if samples.shape[0] != header.get("num_samples", samples.shape[0]):
+        raise ValueError("PCM payload does not match num_samples")
+
+    return samples, int(header["sample_rate"])
+
+
+# --- asyncio ---
+# The same framing over asyncio streams (see async_api.py).
+
+async def send_message_async(writer, header, payload=b""):
+    """
+    Sends one framed message on an asyncio StreamWriter (see send_message).
+    """
+    payload = memoryview(payload).cast("B")
+
+    header = dict(header)
+    header["payload_bytes"] = payload.nbytes
+    raw_header = json.dumps(header).encode("utf-8")
+
+    writer.write(HEADER_STRUCT.pack(len(raw_header)) + raw_header)
+    if payload.nbytes:
+        writer.write(payload)
+    await writer.drain()
+
+
+async def recv_message_async(reader):
+    """
+    Reads one framed message from an asyncio StreamReader (see recv_message).
+
+    Raises:
+        ConnectionError: If the connection is closed or the frame is invalid.
+    """
+    try:
+        (header_size,) = HEADER_STRUCT.unpack(await reader.readexactly(HEADER_STRUCT.size))
+        if header_size > MAX_HEADER_BYTES:
+            raise ConnectionError(f"Invalid header size: {header_size}")
+
+        header = json.loads((await reader.readexactly(header_size)).decode("utf-8"))
+        payload_size = int(header.get("payload_bytes", 0))
+        payload = await reader.readexactly(payload_size) if payload_size else b""
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError("Connection closed by peer") from e
+
+    return header, payload
@@ -0,0 +1,161 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+import wave
+
+import numpy as np
+
+from voice_bank import sample_id
+
+DEFAULT_JOBS_DIR = os.path.expanduser("~/.cache/xtts-local-api/jobs")
+
+
+class JobLocked(Exception):
+    """Raised when another process is running the same job."""
+
+
+def job_key(text, sample_file, language, speed, max_chars, output_file=None, stable=False):
+    """
+    Identifies a long job: the same request gives the same job directory,
+    so running it again resumes it. Renders of the same text to different
+    outputs, or with stable chunking (see text_splitter), are separate jobs.
+    """
+    if output_file is not None:
+        output_file = os.path.abspath(os.path.expanduser(output_file))
+    raw = json.dumps([text, sample_id(sample_file), language,
+                      float(speed), max_chars, output_file, bool(stable)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    Persistent directory of a long job, so a crash does not throw away the
+    chunks that were already generated.
+
+    Layout of `<jobs_dir>/<key>/`:
+        job.json         The chunk texts, written once when the job starts.
+        manifest.jsonl   One line per completed chunk, appended and fsynced
+                         right after its audio is on disk.
+        part_00001.wav   16-bit mono audio of each completed chunk.
+
+    A manifest line is only written once its WAV file is complete, so every
+    chunk listed in the manifest can be read back; a line cut short by a
+    crash is ignored and that chunk is generated again.
+
+    The directory is locked (flock on `.lock`) until close() or remove():
+    a second process running the same job gets JobLocked instead of
+    clearing or appending to the parts of the first one.
+    """
+
+    def __init__(self, jobs_dir, key, chunks):
+        self.path = os.path.join(os.path.expanduser(jobs_dir), key)
+        self.manifest_file = os.path.join(self.path, "manifest.jsonl")
+        self.chunks = list(chunks)
+        self.lock = threading.Lock()
+        self.completed = {}
+
+        os.makedirs(self.path, exist_ok=True)
+        self.lock_file = open(os.path.join(self.path, ".lock"), 'a')
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.lock_file.close()
+            raise JobLocked(f"The job in {self.path} is running in another process")
+
+        job_file = os.path.join(self.path, "job.json")
+        chunks_hash = hashlib.sha256(json.dumps(self.chunks).encode("utf-8")).hexdigest()
+
+        try:
+            with open(job_file, 'r', encoding='utf-8') as f:
+                same_chunks = json.load(f).get("chunks_hash") == chunks_hash
+        except (OSError, json.JSONDecodeError):
+            same_chunks = False
+
+        if same_chunks:
+            self._load_manifest()
+        else:
+            # New job, or chunked differently by another version: start over
+            self.clear_parts()
+            with open(job_file, 'w', encoding='utf-8') as f:
+                json.dump({"chunks_hash": chunks_hash, "chunks": self.chunks}, f)
+
+    def _part_file(self, chunk_id):
+        return os.path.join(self.path, f"part_{int(chunk_id):05d}.wav")
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_file):
+            return
+        with open(self.manifest_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if os.path.exists(self._part_file(entry["id"])):
+                    self.completed[entry["id"]] = entry
+
+    def clear_parts(self):
+        for name in os.listdir(self.path):
+            if name.startswith("part_") or name == "manifest.jsonl":
+                os.remove(os.path.join(self.path, name))
+        self.completed = {}
+
+    def load_parts(self):
+        """
+        Reads back the completed chunks.
+
+        Returns:
+            dict: {chunk_id: (samples, sample_rate)}
+        """
+        parts = {}
+        for chunk_id in sorted(self.completed):
+            try:
+                with wave.open(self._part_file(chunk_id), 'rb') as f:
+                    sample_rate = f.getframerate()
+                    samples = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+            except (OSError, EOFError, wave.Error):
+                # Damaged part: generate it again
+                continue
+            parts[chunk_id] = (samples, sample_rate)
+        return parts
+
+    def save_part(self, chunk_id, samples, sample_rate):
+        """
+        Stores a completed chunk and records it in the manifest.
+        """
+        if samples.dtype != np.int16:
+            samples = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+
+        path = self._part_file(chunk_id)
+        tmp_path = f"{path}.tmp"
+        with wave.open(tmp_path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(sample_rate)
+            f.writeframes(samples.tobytes())
+        os.replace(tmp_path, path)
+
+        entry = {"id": chunk_id, "samples": int(samples.size), "sample_rate": sample_rate}
+        with self.lock:
+            with open(self.manifest_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.completed[chunk_id] = entry
+
+    def close(self):
+        """
+        Releases the job directory, keeping its parts for a later run.
+        """
+        if not self.lock_file.closed:
+            self.lock_file.close()
+
+    def remove(self):
+        """
+        Deletes the job directory once the final output exists.
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.close()
@@ -0,0 +1,190 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/xtts-local-api/latents")
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """
+    Returns the SHA-256 hex digest of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def checkpoint_version(*paths):
+    """
+    Identifies a model checkpoint by the path, size and modification time
+    of its files, so caches are invalidated when the model changes.
+    """
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            parts.append(f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(path)
+    return "|".join(parts)
+
+
+class LatentCache:
+    """
+    Two-tier cache of XTTS conditioning latents (gpt_cond_latent, speaker_embedding).
+
+    Entries are keyed by the content hash of the voice sample plus the model
+    version, so renaming a sample keeps its entry and changing the model
+    invalidates it. The memory tier is an LRU limited to `max_entries`; the
+    disk tier stores one `.pt` file per voice and evicts the least recently
+    used files once it grows past `max_disk_bytes`.
+    """
+
+    def __init__(self, model_version="", max_entries=32, cache_dir=DEFAULT_CACHE_DIR,
+                 max_disk_bytes=256 * 1024 * 1024):
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max_disk_bytes
+
+        self.entries = OrderedDict()
+        # (path, mtime, size) -> content hash, avoids re-hashing unchanged files
+        self.file_hashes = {}
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key_for(self, audio_sample_file):
+        """
+        Returns the cache key of a voice sample file.
+        """
+        st = os.stat(audio_sample_file)
+        file_id = (os.path.abspath(audio_sample_file), st.st_mtime_ns, st.st_size)
+
+        content_hash = self.file_hashes.get(file_id)
+        if content_hash is None:
+            content_hash = file_sha256(audio_sample_file)
+            self.file_hashes[file_id] = content_hash
+
+        return hashlib.sha256(f"{content_hash}:{self.model_version}".encode("utf-8")).hexdigest()
+
+    def get(self, audio_sample_file, compute, device=None):
+        """
+        Returns the latents for a voice sample, computing them only on a miss.
+
+        Args:
+            audio_sample_file: Voice sample file.
+            compute: Callable(audio_sample_file) -> (gpt_cond_latent, speaker_embedding).
+            device: Device the latents loaded from disk are moved to.
+
+        Returns:
+            tuple: (gpt_cond_latent, speaker_embedding)
+        """
+        with self.lock:
+            key = self.key_for(audio_sample_file)
+
+            # 1. Memory tier
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+                return self.entries[key]
+
+            # 2. Disk tier
+            latents = self._load_from_disk(key, device)
+            if latents is not None:
+                self.disk_hits += 1
+            else:
+                # 3. Miss: encode the reference audio
+                self.misses += 1
+                latents = compute(audio_sample_file)
+                self._save_to_disk(key, latents)
+
+            self._remember(key, latents)
+            return latents
+
+    def _remember(self, key, latents):
+        self.entries[key] = latents
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pt")
+
+    def _load_from_disk(self, key, device):
+        if not self.cache_dir:
+            return None
+
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+
+        import torch
+        try:
+            gpt_cond_latent, speaker_embedding = torch.load(path, map_location=device or "cpu")
+        except Exception as e:
+            print(f"⚠️  Discarding unreadable latent cache entry {path}: {e}")
+            os.remove(path)
+            return None
+
+        # Refresh the timestamp used for LRU eviction
+        os.utime(path)
+        return gpt_cond_latent, speaker_embedding
+
+    def _save_to_disk(self, key, latents):
+        if not self.cache_dir:
+            return
+
+        import torch
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        try:
+            torch.save(tuple(t.detach().cpu() for t in latents), tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️  Could not write latent cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """
+        Removes the least recently used files until the disk tier fits its limit.
+        """
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pt"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            st = os.stat(path)
+            files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def stats(self):
+        """
+        Returns hit/miss counters and current sizes.
+        """
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self.entries),
+            "max_entries": self.max_entries,
+        }
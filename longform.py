@@ -0,0 +1,165 @@
+"""
+Long-form synthesis in constant memory: books, long articles, or text piped
+from another program.
+
+Usage:
+    python longform.py book.txt book.mp3 --sample female.wav --language en
+    cat chapter*.txt | python longform.py - book.mp3 --sample female.wav
+
+The text is read lazily and chunked incrementally (text_splitter.iter_text_chunks).
+Chunks are generated a window at a time, and each window is appended to the
+output (WAV, or MP3/FLAC/Opus through an ffmpeg pipe) before the next one starts. Only
+one window of text and audio is held in memory, however long the input is.
+
+If a run is interrupted, running it again reuses the chunks already in the
+chunk cache, so only the rest is synthesized.
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+from audio_sink import open_sink
+from make_audio import get_worker, get_postprocessor, generate_with_retry, METRICS
+from text_splitter import iter_text_chunks
+
+
+def default_window():
+    """
+    Chunks per window: enough to keep every worker busy.
+    """
+    num_workers = len(getattr(get_worker(), "workers", [None]))
+    return max(8, 2 * num_workers)
+
+
+def render_longform(source, output_file, sample_file, language='en', speed=1.0, max_chars=2000,
+                    window=None, pause_ms=200, bitrate="192k", use_cache=True, metrics=None,
+                    max_attempts=5, postprocess=None):
+    """
+    Renders text from a file or stream to an audio file in constant memory.
+
+    Args:
+        source: Path of a UTF-8 text file, "-" for stdin, or a file-like
+            object / iterable of strings.
+        output_file: Output file (.wav, .mp3, .flac, .ogg, .opus or .m4a).
+        sample_file: Voice sample file.
+        language: Audio language.
+        speed: Speech speed.
+        max_chars: Maximum characters per chunk, capped by the XTTS limit
+            of the language (see make_audio.split_text_into_chunks).
+        window: Chunks generated and written at a time (default: default_window()).
+        pause_ms: Silence between chunks.
+        bitrate: Bitrate of compressed formats.
+        use_cache: Reuse cached audio of identical chunks (see ChunkCache).
+        metrics: Metrics to record the stages in (default: make_audio.METRICS).
+        max_attempts: Attempts per chunk for transient errors.
+        postprocess: Post-processing of the chunks (see make_audio.get_postprocessor).
+
+    Returns:
+        dict: {"chunks", "chars", "audio_seconds", "bytes", "seconds"} on
+            success, None on error.
+    """
+    output_file = os.path.expanduser(output_file)
+    metrics = metrics or METRICS
+    window = window or default_window()
+
+    if source == "-":
+        stream, close_stream = sys.stdin, False
+    elif isinstance(source, str):
+        stream, close_stream = open(os.path.expanduser(source), 'r', encoding='utf-8'), True
+    else:
+        stream, close_stream = source, False
+
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    chunks = iter_text_chunks(stream, language, max_chars)
+    sink = None
+    post = get_postprocessor(postprocess, metrics)
+    next_id = 1
+    chars = 0
+
+    try:
+        while True:
+            with metrics.stage("split") as record:
+                batch = dict(enumerate(itertools.islice(chunks, window), next_id))
+                record["chars"] = sum(len(text) for text in batch.values())
+            if not batch:
+                break
+
+            # Chunks are post-processed in the background as they arrive
+            results = generate_with_retry(batch, sample_file, language, speed, use_cache, metrics,
+                                          max_attempts=max_attempts, on_result=post.submit)
+            results = post.results()
+            failed = [i for i in batch if i not in results]
+            if failed:
+                print(f"❌ Failed to generate chunk(s): {', '.join(map(str, failed))}")
+                if sink is not None:
+                    sink.abort()
+                return None
+
+            # Written in text order; the window's audio is released afterwards
+            with metrics.stage("export") as record:
+                for chunk_id in sorted(results):
+                    samples, sample_rate = results[chunk_id]
+                    if sink is None:
+                        sink = open_sink(output_file, sample_rate, bitrate)
+                    elif pause_ms:
+                        sink.write_silence(pause_ms)
+                    sink.write(samples)
+                    record["audio_seconds"] += samples.size / sample_rate
+
+            chars += sum(len(text) for text in batch.values())
+            next_id += len(batch)
+            print(f"📖 Chunks 1-{next_id - 1} written "
+                  f"({sink.num_samples / sink.sample_rate / 60:.1f} min of audio)", flush=True)
+    except BaseException:
+        if sink is not None:
+            sink.abort()
+        raise
+    finally:
+        post.close()
+        if close_stream:
+            stream.close()
+
+    if sink is None:
+        print("❌ Empty or invalid text.")
+        return None
+
+    info = sink.close()
+    return {
+        "chunks": next_id - 1,
+        "chars": chars,
+        **info,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-form synthesis in constant memory")
+    parser.add_argument("source", help="UTF-8 text file, or - for stdin")
+    parser.add_argument("output_file", help="Output file (.wav, .mp3, .flac, .ogg, .opus or .m4a)")
+    parser.add_argument("--sample", "-s", required=True, dest="sample_file", help="Voice sample file")
+    parser.add_argument("--language", "-l", default="en", help="Text language (default: en)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Voice speed")
+    parser.add_argument("--max-chars", type=int, default=2000, help="Maximum characters per chunk (capped by the XTTS limit of the language)")
+    parser.add_argument("--window", type=int, help="Chunks generated and written at a time")
+    parser.add_argument("--pause-ms", type=int, default=200, help="Silence between chunks")
+    parser.add_argument("--bitrate", default="192k", help="Bitrate of compressed formats")
+    args = parser.parse_args()
+    if args.max_chars < 1:
+        parser.error("--max-chars must be at least 1")
+
+    result = render_longform(
+        args.source, args.output_file, args.sample_file,
+        language=args.language, speed=args.speed, max_chars=args.max_chars,
+        window=args.window, pause_ms=args.pause_ms, bitrate=args.bitrate
+    )
+    if result is None:
+        sys.exit(1)
+
+    print(f"🎉 {args.output_file}: {result['chunks']} chunks, {result['audio_seconds'] / 60:.1f} min "
+          f"of audio, {result['bytes'] / 1024 / 1024:.1f} MB in {result['seconds']:.1f}s")
@@ -1,71 +1,132 @@
+import hashlib
+import json
 import os
-import subprocess
-import tempfile
+import queue
+import threading
 import time
+
+import numpy as np
 from pydub import AudioSegment
 
-import json
-import os
+from audio_merge import merge_pcm, to_int16
+from audio_sink import open_sink, is_lossless, OrderedWriter
+from text_splitter import split_text
+from metrics import Metrics
+from postprocess import PostProcessor, DEFAULT_OPTIONS as POSTPROCESS_DEFAULTS
+from render_manifest import load_manifest, save_manifest, remove_manifest, plan_reuse, PreviousRender
+from scheduler import Scheduler, CostModel, DEFAULT_OPTIONS as SCHEDULER_DEFAULTS
+from job_store import JobStore, JobLocked, DEFAULT_JOBS_DIR, job_key
+from retry import permanent_errors, backoff_delay
+from chunk_cache import ChunkCache, DEFAULT_CHUNK_CACHE_DIR, xtts_model_version
+from latent_cache import file_sha256
+from worker_client import XttsWorker, WorkerPool, WorkerError
+from voice_bank import VoiceBank, voice_name, sample_id
 
 DATABASE_FILE = "database.json"
 XTTS_KEY = "xtts_folder"
+WORKERS_KEY = "workers"
+PIN_CPUS_KEY = "pin_cpus"
+CHUNK_CACHE_MB_KEY = "chunk_cache_mb"
+CHUNK_CACHE_DIR_KEY = "chunk_cache_dir"
+JOBS_DIR_KEY = "jobs_dir"
+BACKEND_KEY = "backend"
+STUB_RTF_KEY = "stub_rtf"
+QUANTIZE_KEY = "quantize"
+COMPILE_KEY = "compile"
+POSTPROCESS_KEY = "postprocess"
+VOICE_BANK_KEY = "voice_bank"
+SCHEDULER_KEY = "scheduler"
+RECYCLE_KEY = "worker_recycle"
+WARMUP_SAMPLE_KEY = "warmup_sample"
 
-def split_text_into_chunks(text, max_chars=2000):
+# Shared client for the persistent XTTS worker (see get_worker)
+_WORKER = None
+# Shared chunk audio cache, False when disabled (see get_chunk_cache)
+_CHUNK_CACHE = None
+# Voice bank of "voice_bank" in database.json, False when not set (see get_voice_bank)
+_VOICE_BANK = None
+# Scheduler of the worker slots between concurrent requests (see get_scheduler)
+_SCHEDULER = None
+# Per-stage timings of this process (split, synthesis, cache hits,
+# post-processing, export); pass metrics= to the functions below to record a single
+# job separately, or set METRICS.callback to receive every observation
+METRICS = Metrics()
+
+def request_key(text, sample_file, language, speed, settings=None):
     """
-    Splits text into chunks, respecting full words and punctuation marks.
+    Identifies a synthesis request: identical text, voice, language and
+    speed give the same key. `settings` (JSON-serializable) holds anything
+    else that shapes the output, such as its format or post-processing.
     """
-    if not text or not isinstance(text, str):
-        return []
-    
-    text = text.strip()
-    if len(text) <= max_chars:
-        return [text]
-    
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = start + max_chars
-        
-        # If not the end of the text, adjust to break at a word boundary
-        if end < len(text):
-            # Find the last space before the limit
-            last_space = text.rfind(' ', start, end)
-            
-            # If a space was found, break there
-            if last_space != -1 and last_space > start:
-                end = last_space
-            # If no space was found, look for punctuation for a better break point
-            else:
-                for char in ['.', '!', '?', ';', ',']:
-                    last_punctuation = text.rfind(char, start, end)
-                    if last_punctuation != -1:
-                        end = last_punctuation + 1
-                        break
-        
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        
-        start = end
-    
-    # Merge very small chunks (less than 10 chars) with the previous one
-    if len(chunks) > 1:
-        final_chunks = []
-        for chunk in chunks:
-            if len(chunk) < 10 and final_chunks:
-                final_chunks[-1] = final_chunks[-1] + " " + chunk
-            else:
-                final_chunks.append(chunk)
-        return final_chunks
-    
-    return chunks
+    request = [text, sample_id(sample_file), language, float(speed)]
+    if settings is not None:
+        request.append(settings)
+    raw = json.dumps(request, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def split_text_into_chunks(text, max_chars=2000, language='en', stable=False):
+    """
+    Splits text into chunks at sentence boundaries (see text_splitter.split_text).
+
+    Chunks never exceed the XTTS character limit of the language
+    (text_splitter.XTTS_CHAR_LIMITS: 250 for "en", 82 for "zh", 71 for
+    "ja"...), so the model does not split or truncate them again. max_chars
+    can only lower that limit: the default of 2000 is always capped by it.
+    With stable=True the boundaries are content-defined and stay put when
+    the text is edited elsewhere.
+    """
+    return split_text(text, language, max_chars, stable=stable)
+
 
+def pcm_to_segment(samples, sample_rate):
+    """
+    Wraps mono PCM samples (float32 in [-1, 1] or int16) in a pydub AudioSegment
+    without going through a codec.
+    """
+    if samples.dtype != np.int16:
+        samples = to_int16(samples)
+    return AudioSegment(
+        data=samples.tobytes(),
+        sample_width=2,
+        frame_rate=sample_rate,
+        channels=1
+    )
 
-def merge_audios(part_files, output_file):
+
+def segment_to_pcm(segment, sample_rate):
     """
-    Merges multiple audio files into a single one using pydub.
+    Returns the samples of a pydub AudioSegment as mono int16 at the given
+    sample rate.
     """
+    segment = segment.set_channels(1).set_frame_rate(sample_rate).set_sample_width(2)
+    return np.frombuffer(segment.raw_data, dtype=np.int16)
+
+
+def merge_audios(part_files, output_file, pause_ms=200, crossfade_ms=0, bitrate="192k",
+                 metrics=None):
+    """
+    Merges multiple audio parts into a single file.
+    
+    The parts are joined into one preallocated buffer (see audio_merge.merge_pcm),
+    so merging takes linear time even for hundreds of parts, and the result
+    is encoded exactly once.
+    
+    Args:
+        part_files: Parts in order. Each one is either a path to an audio file
+            or a (samples, sample_rate) tuple of raw PCM as returned by
+            generate_audio_pcm.
+        output_file: Final file, format from the extension (see audio_sink.open_sink).
+        pause_ms: Silence between parts.
+        crossfade_ms: Overlap adjacent parts with a crossfade instead of a pause.
+        bitrate: Bitrate of compressed formats.
+        metrics: Metrics to record the merge and export stages in
+            (default: METRICS).
+    
+    Returns:
+        bool: True on success, False on error.
+    """
+    metrics = metrics or METRICS
     try:
         if not part_files:
             print("❌ No files to merge.")
@@ -76,37 +137,47 @@ def merge_audios(part_files, output_file):
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
         
-        # Use pydub to merge the audios
-        final_audio = None
+        # All parts are brought to the sample rate of the first PCM part
+        sample_rate = next((part[1] for part in part_files if not isinstance(part, str)), 24000)
+        parts = []
         
         for i, file in enumerate(part_files, 1):
-            if not os.path.exists(file):
-                print(f"❌ File not found: {file}")
-                continue
-            
             try:
-                part_audio = AudioSegment.from_file(file)
-                
-                if final_audio is None:
-                    final_audio = part_audio
+                if isinstance(file, str):
+                    if not os.path.exists(file):
+                        print(f"❌ File not found: {file}")
+                        continue
+                    samples = segment_to_pcm(AudioSegment.from_file(file), sample_rate)
                 else:
-                    # Add a small pause between chunks (0.2 seconds)
-                    pause = AudioSegment.silent(duration=200)
-                    final_audio = final_audio + pause + part_audio
+                    samples, part_rate = file
+                    if part_rate != sample_rate:
+                        samples = segment_to_pcm(pcm_to_segment(samples, part_rate), sample_rate)
                 
-                print(f"   ✅ Part {i} added ({len(part_audio)/1000:.1f}s)")
+                parts.append(samples)
+                print(f"   ✅ Part {i} added ({len(samples) / sample_rate:.1f}s)")
                 
             except Exception as e:
                 print(f"❌ Error processing part {i}: {e}")
                 continue
         
-        if final_audio is None:
+        if not parts:
             print("❌ No valid audio to merge.")
             return False
         
-        # Export the final audio
-        # Using format="mp3" and a good bitrate for quality
-        final_audio.export(output_file, format="mp3", bitrate="192k")
+        with metrics.stage("merge") as record:
+            merged = merge_pcm(parts, sample_rate, pause_ms=pause_ms, crossfade_ms=crossfade_ms)
+            record["audio_seconds"] = merged.size / sample_rate
+        
+        # Export the final audio (single encode)
+        with metrics.stage("export") as record:
+            record["audio_seconds"] = merged.size / sample_rate
+            sink = open_sink(output_file, sample_rate, bitrate)
+            try:
+                sink.write(merged)
+            except BaseException:
+                sink.abort()
+                raise
+            sink.close()
         
         return True
         
@@ -115,26 +186,116 @@ def merge_audios(part_files, output_file):
         return False
 
 
-def make_audio(text, output_file, sample_file, language='en', speed=1.0, max_chars=2000):
+def get_postprocessor(options=None, metrics=None, callback=None):
+    """
+    Returns a PostProcessor for one job.
+
+    Args:
+        options: Post-processing options (see postprocess.DEFAULT_OPTIONS),
+            False to pass the chunks through, or None for the "postprocess"
+            setting of database.json.
+        metrics: Metrics to record the "postprocess" stage in.
+        callback: Receives each processed chunk (see PostProcessor).
+    """
+    return PostProcessor(postprocess_options(options), metrics, callback)
+
+
+def postprocess_options(options=None):
+    """
+    Resolves post-processing options (see get_postprocessor) to a full
+    dictionary of postprocess.DEFAULT_OPTIONS.
+    """
+    if options is None:
+        options = load_database().get(POSTPROCESS_KEY, {})
+    if options is False:
+        options = {"denoise": False, "trim": False, "loudness": None}
+    return {key: options.get(key, default) for key, default in POSTPROCESS_DEFAULTS.items()}
+
+
+def render_settings(sample_file, language, speed, postprocess, pause_ms):
+    """
+    Everything besides the text that shapes a rendered output, as recorded
+    in its manifest (see render_manifest): the audio of a previous render
+    is only reused when these are identical.
+    """
+    name = voice_name(sample_file)
+    if name is not None:
+        bank = get_voice_bank()
+        voice = bank.voice_hash(name) if bank is not None and name in bank else sample_file
+    else:
+        path = os.path.abspath(os.path.expanduser(sample_file))
+        # A missing sample fails later, in the worker, with its own error
+        voice = file_sha256(path) if os.path.exists(path) else path
+    return {
+        "voice": voice,
+        "language": language,
+        "speed": float(speed),
+        "model": worker_model_version(),
+        "postprocess": postprocess_options(postprocess),
+        "pause_ms": pause_ms,
+    }
+
+
+def make_audio(text, output_file, sample_file, language='en', speed=1.0, max_chars=2000,
+               use_cache=True, metrics=None, resume=True, max_attempts=5, postprocess=None,
+               pause_ms=200, bitrate="192k", weight=1.0, incremental=False):
     """
     Generates audio by splitting text into chunks and merging them.
     
+    Chunks are written to the output in text order as soon as they are
+    ready, through a single encoder process (see audio_sink), so encoding
+    overlaps with inference and the output is never decoded again.
+    
+    With incremental=True, chunk boundaries are content-defined and a
+    manifest is written next to the output (see render_manifest). Rendering
+    the same output again after editing the text then copies the audio of
+    the unchanged chunks from the previous output and only generates the
+    edited ones. Only WAV and FLAC outputs can be rendered incrementally:
+    the kept audio of a lossy output would be re-encoded on every render.
+    
+    Every finished chunk is saved to a job directory (see JobStore), so if
+    the process dies, running the same request again resumes where it
+    stopped. Chunks that fail with a transient error (timeout, out of
+    memory, lost worker) are retried with exponential backoff; a permanent
+    error stops the job right away.
+    
     Args:
         text: Text to be converted to audio.
-        output_file: Final output file.
+        output_file: Final output file: WAV, MP3, FLAC, OGG/Opus or M4A,
+            chosen by the extension (anything else is written as MP3).
         sample_file: Voice sample file.
         language: Audio language.
         speed: Speech speed.
-        max_chars: Maximum characters per chunk.
+        max_chars: Maximum characters per chunk, capped by the XTTS limit
+            of the language (see split_text_into_chunks).
+        use_cache: Reuse cached audio of identical chunks (see ChunkCache).
+        metrics: Metrics to record the stages of this job in (default: METRICS).
+        resume: Keep finished chunks in the job directory ("jobs_dir" in
+            database.json) and reuse them.
+        max_attempts: Attempts per chunk for transient errors.
+        postprocess: Post-processing of the chunks (denoise, trim, loudness),
+            see get_postprocessor. It runs on a background thread while
+            the next chunks are generated.
+        pause_ms: Silence between chunks.
+        bitrate: Bitrate of compressed formats.
+        weight: Priority of this job when several requests share the
+            worker(s) (see get_scheduler).
+        incremental: Stable chunk boundaries, and reuse of the previous
+            render of output_file (WAV or FLAC only).
     
     Returns:
         bool: True on success, False on error.
     """
 
     output_file = os.path.expanduser(output_file)
+    metrics = metrics or METRICS
+    if incremental and not is_lossless(output_file):
+        print(f"⚠️  Incremental rendering needs a WAV or FLAC output, rendering {output_file} in full.")
+        incremental = False
     
     # 1. Split the text into chunks respecting word boundaries
-    chunks = split_text_into_chunks(text, max_chars)
+    with metrics.stage("split", chars=len(text or "")):
+        chunks = split_text_into_chunks(text, max_chars, language, stable=incremental)
     
     if not chunks:
         print("❌ Empty or invalid text.")
@@ -142,130 +303,598 @@ def make_audio(text, output_file, sample_file, language='en', speed=1.0, max_cha
     
     print(f"📝 Text split into {len(chunks)} chunks.")
     
-    # 2. Create a temporary directory for audio parts
-    with tempfile.TemporaryDirectory() as temp_dir:
-        print(f"📁 Temporary directory: {temp_dir}")
-        
-        part_files = []
-        
-        # 3. Generate audio for each chunk
-        for i, chunk in enumerate(chunks, 1):
-            print(f"\n🎵 Generating chunk {i}/{len(chunks)}...")
-            print(f"   Characters: {len(chunk)}")
-            print(f"   Content: {chunk[:100]}...")
-            
-            part_file = os.path.join(temp_dir, f"part_{i:03d}.mp3")
-            
-            # Try up to 3 times for each chunk
-            success = False
-            for attempt in range(1, 4):
-                print(f"   Attempt {attempt}/3")
-                
-                if generate_audio_chunk(
-                    chunk, part_file, sample_file, language, speed
-                ):
-                    part_files.append(part_file)
-                    success = True
-                    break
-                else:
-                    time.sleep(2)  # Pause between attempts
-            
-            if not success:
-                print(f"❌ Failed to generate chunk {i}")
-                return False
-        
-        # 4. Merge all audios
-        print(f"\n🔗 Merging {len(part_files)} audio parts...")
-        
-        if merge_audios(part_files, output_file):
-            print(f"✅ Final audio generated: {output_file}")
-            
-            # Check if the final file was created
-            if os.path.exists(output_file):
-                size = os.path.getsize(output_file)
-                print(f"📊 Final size: {size} bytes")
-                
-                # Get duration
-                try:
-                    audio = AudioSegment.from_file(output_file)
-                    duration = len(audio) / 1000.0
-                    print(f"⏱️  Total duration: {duration:.2f} seconds")
-                except:
-                    pass
-                
-                return True
-        
+    # 2. Pick up the chunks finished by an interrupted run of the same job
+    store = None
+    results = {}
+    if resume:
+        jobs_dir = load_database().get(JOBS_DIR_KEY, DEFAULT_JOBS_DIR)
+        try:
+            store = JobStore(jobs_dir, job_key(text, sample_file, language, speed, max_chars,
+                                               output_file, incremental), chunks)
+        except JobLocked as e:
+            print(f"⚠️  {e}, this run will not save its chunks")
+        else:
+            results = store.load_parts()
+            if results:
+                print(f"♻️  Resuming job: {len(results)}/{len(chunks)} chunks already done ({store.path})")
+    
+    # 3. Chunks whose text did not change since the previous render of this
+    #    output are copied from it, in order, as the writer reaches them
+    previous = None
+    settings = None
+    if incremental:
+        settings = render_settings(sample_file, language, speed, postprocess, pause_ms)
+        manifest = load_manifest(output_file, settings)
+        reuse = plan_reuse(manifest, chunks) if manifest else {}
+        if reuse:
+            try:
+                previous = PreviousRender(output_file, manifest["sample_rate"], reuse)
+            except (OSError, RuntimeError) as e:
+                print(f"⚠️  Could not read the previous render, generating every chunk: {e}")
+            else:
+                print(f"♻️  Reusing {len(previous.reuse)}/{len(chunks)} unchanged chunks of {output_file}")
+                results = {i: part for i, part in results.items() if i not in previous.reuse}
+    
+    try:
+        return _render(chunks, results, store, previous, settings, output_file, sample_file, language,
+                       speed, use_cache, metrics, max_attempts, postprocess, pause_ms, bitrate, weight)
+    finally:
+        if previous is not None:
+            previous.close()
+        if store is not None:
+            store.close()
+
+
+def _render(chunks, results, store, previous, settings, output_file, sample_file, language, speed,
+            use_cache, metrics, max_attempts, postprocess, pause_ms, bitrate, weight):
+    """
+    Generates the chunks missing from results and previous, and writes the
+    output (steps 4 and 5 of make_audio).
+    """
+    # 4. Generate raw PCM for the remaining chunks in batch requests. Cached
+    #    chunks are reused as they are, and only the chunks that failed with
+    #    a transient error are sent again.
+    #    Each chunk is post-processed on a background thread as soon as it
+    #    arrives, then written to the output once the chunks before it are;
+    #    the job store keeps the raw audio.
+    reused = previous.reuse if previous is not None else {}
+    pending = {i: chunk for i, chunk in enumerate(chunks, 1) if i not in results and i not in reused}
+    
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    writer = OrderedWriter(lambda sample_rate: open_sink(output_file, sample_rate, bitrate),
+                           pause_ms=pause_ms, metrics=metrics, fill=previous.get if previous else None)
+    post = get_postprocessor(postprocess, metrics, callback=writer.add)
+    
+    def on_result(chunk_id, samples, sample_rate):
+        if store:
+            store.save_part(chunk_id, samples, sample_rate)
+        post.submit(chunk_id, samples, sample_rate)
+    
+    try:
+        with post:
+            writer.flush()
+            for chunk_id, part in sorted(results.items()):
+                post.submit(chunk_id, *part)
+            results.update(generate_with_retry(
+                pending, sample_file, language, speed, use_cache, metrics,
+                max_attempts=max_attempts, on_result=on_result, weight=weight
+            ))
+            # Raises the errors of the post-processing and encoding thread
+            post.results()
+    except Exception as e:
+        print(f"❌ Error writing {output_file}: {e}")
+        writer.abort()
+        return False
+    pending = {i: chunk for i, chunk in pending.items() if i not in results}
+    
+    if pending:
+        writer.abort()
+        print(f"❌ Failed to generate chunk(s): {', '.join(map(str, pending))}")
+        if store and store.completed:
+            print(f"💾 Finished chunks kept in {store.path}, run the same request again to resume.")
+        elif store:
+            store.remove()
+        return False
+    
+    # 5. Finalize the output: duration and size come from the samples written
+    try:
+        info = writer.close()
+        if settings is not None:
+            save_manifest(output_file, settings, chunks, writer.lengths, writer.sink.sample_rate, pause_ms)
+        else:
+            # The output no longer matches a manifest of an earlier render
+            remove_manifest(output_file)
+    except Exception as e:
+        print(f"❌ Error writing {output_file}: {e}")
         return False
+    
+    print(f"✅ Final audio generated: {output_file}")
+    if reused:
+        print(f"♻️  {len(reused)} chunk(s) reused, {len(chunks) - len(reused)} generated")
+    print(f"📊 Final size: {info['bytes']} bytes")
+    print(f"⏱️  Total duration: {info['audio_seconds']:.2f} seconds")
+    
+    if store:
+        store.remove()
+    return True
 
 
-def generate_audio_chunk(text, output_file, sample_file, language, speed):
+def stream_audio(text, sample_file, language='en', speed=1.0, max_chars=2000, metrics=None):
     """
-    Generates audio for a specific chunk using the external XTTS script.
+    Generates audio chunk by chunk and yields PCM frames as soon as they are
+    produced, so playback can start before the whole text is synthesized.
+    
+    Args:
+        text: Text to be converted to audio.
+        sample_file: Voice sample file.
+        language: Audio language.
+        speed: Speech speed.
+        max_chars: Maximum characters per chunk, capped by the XTTS limit
+            of the language (see split_text_into_chunks).
+        metrics: Optional dict filled with latency measurements:
+            time_to_first_audio (s), chunk_latencies (generation time
+            of each chunk, s), audio_seconds and total_time (s).
+    
+    Yields:
+        tuple: (samples, sample_rate) with mono float32 samples.
     """
+    if metrics is None:
+        metrics = {}
+    metrics.update({
+        "time_to_first_audio": None,
+        "chunk_latencies": [],
+        "audio_seconds": 0.0,
+        "total_time": None
+    })
 
-    # Get the XTTS folder path from database.json
-    folder_xtts = get_xtts_folder_path()
+    chunks = split_text_into_chunks(text, max_chars, language)
+    if not chunks:
+        print("❌ Empty or invalid text.")
+        return
 
-    # Expand the path (handles potential ~)
-    folder_xtts_expanded = os.path.expanduser(folder_xtts)
+    worker = get_worker()
+    start = time.perf_counter()
 
-    # 2. Construct the paths using os.path.join() for OS compatibility
-    # Activation is unnecessary, so we directly use the python binary path
-    python_venv = os.path.join(folder_xtts_expanded, "venv", "bin", "python3")
-    script_python = os.path.expanduser("core.py")
-    
-    # Construct the command list for subprocess.run
-    command = [
-        python_venv,
-        script_python,
-        text,
-        output_file,
-        '-s',
-        os.path.expanduser(sample_file),
-        '-l',
-        language,
-        '-speed',
-        str(speed),
-        '-folder_xtts',
-        folder_xtts_expanded
+    for chunk in chunks:
+        # Only time spent waiting for the worker counts as chunk latency,
+        # not the time the consumer spends handling the yielded frames
+        latency = 0.0
+        chunk_audio = 0.0
+        waiting_since = time.perf_counter()
+
+        for samples, sample_rate in worker.stream_pcm(chunk, sample_file, language, speed):
+            now = time.perf_counter()
+            latency += now - waiting_since
+            if metrics["time_to_first_audio"] is None:
+                metrics["time_to_first_audio"] = now - start
+            chunk_audio += samples.size / sample_rate
+            metrics["audio_seconds"] += samples.size / sample_rate
+
+            yield samples, sample_rate
+            waiting_since = time.perf_counter()
+
+        latency += time.perf_counter() - waiting_since
+        metrics["chunk_latencies"].append(latency)
+        METRICS.observe("synthesis", latency, len(chunk), chunk_audio)
+
+    metrics["total_time"] = time.perf_counter() - start
 
-    ]
 
-    # input(command) # Debug line removed
+def get_worker():
+    """
+    Returns the shared XTTS worker client, creating it on first use.
+    The worker process itself is started (or attached to) lazily.
     
-    try:
-        result = subprocess.run(
-            command, 
-            check=True, 
-            text=True, 
-            capture_output=True,
-            timeout=300  # 5 minutes timeout
-        )
+    Setting "workers" (and optionally "pin_cpus") in database.json to more
+    than one returns a WorkerPool that generates chunks concurrently, with
+    the CPU cores split between the workers.
+
+    "backend": "stub" runs the workers on the deterministic stub backend
+    (no model or GPU needed, see backends.py), with "stub_rtf" as its
+    simulated real-time factor.
+
+    "quantize": true and "compile": true enable the CPU performance mode of
+    the model (int8 GPT layers, torch.compile, see cpu_mode.py).
+
+    "voice_bank" is the path of a voice bank (see voice_bank.py) shared by
+    the workers; its voices are selected with sample_file="voice:<name>".
+
+    "worker_recycle", e.g. {"max_jobs": 2000, "max_rss_mb": 6000,
+    "max_cuda_mb": 5000}, makes each worker replace itself past one of
+    these watermarks (see core.recycle_worker). With "warmup_sample", a
+    new worker runs a warm-up synthesis with that voice before taking
+    traffic (default: no warm-up).
+    """
+    global _WORKER
+    if _WORKER is None:
+        db_data = load_database()
+        num_workers = int(db_data.get(WORKERS_KEY, 1))
+        backend = db_data.get(BACKEND_KEY, "xtts")
+        options = {
+            "backend": backend,
+            "stub_rtf": db_data.get(STUB_RTF_KEY),
+            "quantize": bool(db_data.get(QUANTIZE_KEY, False)),
+            "compile_model": bool(db_data.get(COMPILE_KEY, False)),
+            "voice_bank": db_data.get(VOICE_BANK_KEY),
+            "warmup_sample": db_data.get(WARMUP_SAMPLE_KEY),
+        }
+        recycle = db_data.get(RECYCLE_KEY, {})
+        options.update({key: recycle.get(key) for key in ("max_jobs", "max_rss_mb", "max_cuda_mb")})
+        folder_xtts = get_xtts_folder_path() if backend == "xtts" else db_data.get(XTTS_KEY, "")
         
+        if num_workers > 1:
+            _WORKER = WorkerPool(
+                folder_xtts,
+                num_workers=num_workers,
+                pin_cpus=bool(db_data.get(PIN_CPUS_KEY, False)),
+                **options
+            )
+        else:
+            _WORKER = XttsWorker(folder_xtts, **options)
+    return _WORKER
+
+
+def get_scheduler():
+    """
+    Returns the shared scheduler of the worker slots (see scheduler.py).
+    Requests running concurrently in this process (server jobs, threads
+    calling make_audio) take turns on the worker(s) a slice of chunks at a
+    time, shortest predicted job first by default.
+
+    "scheduler" in database.json sets its options, e.g.
+    {"policy": "fair", "slice_seconds": 10}. The cost model is calibrated
+    separately for each backend, quantization and number of workers.
+    """
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        db_data = load_database()
+        options = {**SCHEDULER_DEFAULTS, **db_data.get(SCHEDULER_KEY, {})}
+        worker = get_worker()
+        slots = len(worker.workers) if isinstance(worker, WorkerPool) else 1
+        profile = f"{db_data.get(BACKEND_KEY, 'xtts')}{':int8' if db_data.get(QUANTIZE_KEY) else ''}/{slots}"
+        _SCHEDULER = Scheduler(
+            slots,
+            policy=options["policy"],
+            slice_seconds=options["slice_seconds"],
+            aging=options["aging"],
+            cost_model=CostModel(options["cost_model"], profile)
+        )
+    return _SCHEDULER
+
+
+def worker_metrics(reset=False):
+    """
+    Returns the metrics snapshots of the running worker(s), one per process.
+    """
+    snapshots = get_worker().metrics(reset)
+    if isinstance(snapshots, dict):
+        snapshots = [snapshots]
+    return [snapshot for snapshot in snapshots or [] if snapshot]
+
+
+def generate_audio_chunk(text, output_file, sample_file, language, speed):
+    """
+    Generates audio for a specific chunk using the persistent XTTS worker
+    (core.py --worker), which keeps the model loaded between chunks.
+    """
+    try:
+        get_worker().synthesize(text, output_file, sample_file, language, speed)
+
         # Check if the file was created and is not empty
         if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
             print(f"✅ Chunk generated: {os.path.basename(output_file)}")
             return True
         else:
             print("❌ Audio file not created or is empty.")
-            # Optional: Print script output for debugging if file is missing
-            # print(f"   Script STDOUT: {result.stdout[:200]}")
-            # print(f"   Script STDERR: {result.stderr[:200]}")
             return False
-            
-    except subprocess.CalledProcessError as e:
+
+    except WorkerError as e:
         print(f"❌ Error generating chunk: {e}")
-        if e.stderr:
-            print(f"   STDERR: {e.stderr[:200]}")
-        return False
-    except subprocess.TimeoutExpired:
-        print("❌ Timeout while generating chunk.")
         return False
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
         return False
 
 
+def generate_audio_pcm(text, sample_file, language, speed):
+    """
+    Generates raw PCM for a specific chunk using the persistent XTTS worker.
+    The samples come back over the worker socket, so nothing is encoded
+    or written to disk.
+
+    Returns:
+        tuple: (samples, sample_rate) or None on error.
+    """
+    try:
+        samples, sample_rate = get_worker().synthesize_pcm(text, sample_file, language, speed)
+    except WorkerError as e:
+        print(f"❌ Error generating chunk: {e}")
+        return None
+    except Exception as e:
+        print(f"❌ Unexpected error: {e}")
+        return None
+
+    if samples.size == 0:
+        print("❌ Worker returned empty audio.")
+        return None
+
+    print(f"✅ Chunk generated: {samples.size / sample_rate:.1f}s of audio")
+    return samples, sample_rate
+
+
+def get_chunk_cache():
+    """
+    Returns the shared chunk audio cache, or None if it is disabled
+    ("chunk_cache_mb": 0 in database.json).
+    """
+    global _CHUNK_CACHE
+    if _CHUNK_CACHE is None:
+        db_data = load_database()
+        max_mb = int(db_data.get(CHUNK_CACHE_MB_KEY, 1024))
+        if max_mb <= 0:
+            _CHUNK_CACHE = False
+            return None
+        _CHUNK_CACHE = ChunkCache(
+            cache_dir=db_data.get(CHUNK_CACHE_DIR_KEY, DEFAULT_CHUNK_CACHE_DIR),
+            max_bytes=max_mb * 1024 * 1024,
+            model_version=worker_model_version(),
+            voice_bank=get_voice_bank()
+        )
+    return _CHUNK_CACHE or None
+
+
+def worker_model_version():
+    """
+    Identifies the model the workers run (checkpoint, int8 or not, or the
+    backend name), for cache keys and render manifests.
+    """
+    db_data = load_database()
+    if db_data.get(BACKEND_KEY, "xtts") != "xtts":
+        return db_data[BACKEND_KEY]
+    model_version = xtts_model_version(get_xtts_folder_path())
+    if db_data.get(QUANTIZE_KEY):
+        # The int8 model sounds slightly different: kept apart
+        model_version += ":int8"
+    return model_version
+
+
+def get_voice_bank():
+    """
+    Returns the voice bank set with "voice_bank" in database.json, or None.
+    """
+    global _VOICE_BANK
+    if _VOICE_BANK is None:
+        path = load_database().get(VOICE_BANK_KEY)
+        try:
+            _VOICE_BANK = VoiceBank(path) if path else False
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Could not open the voice bank {path}: {e}")
+            _VOICE_BANK = False
+    return _VOICE_BANK or None
+
+
+def voice_exists(sample_file):
+    """
+    Tells whether a voice sample file, or a "voice:<name>" of the voice
+    bank, is available.
+    """
+    name = voice_name(sample_file)
+    if name is not None:
+        bank = get_voice_bank()
+        return bank is not None and name in bank
+    return os.path.exists(os.path.expanduser(sample_file))
+
+
+def lookup_chunks(chunks, sample_file, language, speed, cache, metrics=None):
+    """
+    Looks chunks up in the chunk cache (None: no cache), recording each hit
+    as "cache_hit" in metrics (default: METRICS).
+
+    Returns:
+        tuple: ({chunk_id: (samples, sample_rate)} of the hits,
+                {chunk_id: text} of the misses, {chunk_id: cache key})
+    """
+    if cache is None:
+        return {}, dict(chunks), {}
+    metrics = metrics or METRICS
+    hits, misses, keys = {}, {}, {}
+    for chunk_id, text in chunks.items():
+        start = time.perf_counter()
+        keys[chunk_id] = cache.key_for(text, sample_file, language, speed)
+        part = cache.get(keys[chunk_id])
+        if part is not None:
+            metrics.observe("cache_hit", time.perf_counter() - start, len(text), part[0].size / part[1])
+            hits[chunk_id] = part
+        else:
+            misses[chunk_id] = text
+    return hits, misses, keys
+
+
+def record_chunk(text, part, error, seconds, language, speed, cost_model, cache=None, key=None, metrics=None):
+    """
+    Books a chunk generated by a worker in `seconds`: its audio goes to the
+    chunk cache (under `key`), it calibrates the cost model and it is
+    recorded as "synthesis" in metrics (default: METRICS).
+    """
+    metrics = metrics or METRICS
+    if error is None and part[0].size:
+        audio_seconds = part[0].size / part[1]
+        if cache is not None:
+            cache.put(key, *part)
+        cost_model.observe(len(text), language, speed, seconds, audio_seconds)
+    else:
+        audio_seconds = 0.0
+    metrics.observe("synthesis", seconds, len(text), audio_seconds, error=error is not None)
+
+
+def iter_audio_batch(chunks, sample_file, language, speed, use_cache=True, metrics=None, weight=1.0):
+    """
+    Yields (chunk_id, (samples, sample_rate) or None, error or None) for
+    each chunk, in completion order. Chunks found in the chunk cache are
+    returned without any inference; only the misses are sent to the
+    worker(s), and their audio is added to the cache.
+    
+    The misses go through the scheduler (see get_scheduler): each worker
+    slot it grants runs a slice of the chunks, so other requests can be
+    served in between. `weight` is the priority of this request.
+    
+    Each chunk is recorded in metrics (default: METRICS) as "cache_hit" or
+    "synthesis", timing the worker for that chunk, not the consumer, and
+    every synthesized chunk calibrates the scheduler's cost model.
+    """
+    metrics = metrics or METRICS
+    cache = get_chunk_cache() if use_cache else None
+    hits, misses, keys = lookup_chunks(chunks, sample_file, language, speed, cache, metrics)
+    for chunk_id, part in hits.items():
+        yield chunk_id, part, None
+    
+    if not misses:
+        return
+    
+    worker = get_worker()
+    scheduler = get_scheduler()
+    ticket = scheduler.open(misses, language, speed, weight)
+    results = queue.Queue()
+    stop = threading.Event()
+    
+    def run():
+        # One thread per worker slot the request may hold at a time
+        while not stop.is_set():
+            slice_ids = scheduler.acquire(ticket)
+            if not slice_ids:
+                return
+            done = set()
+            try:
+                with worker.acquire() as slot_worker:
+                    # A worker starting up would count as the first chunk's time
+                    slot_worker.ensure_running()
+                    started = time.perf_counter()
+                    for chunk_id, part, error in slot_worker.synthesize_batch(
+                        {i: misses[i] for i in slice_ids}, sample_file, language, speed
+                    ):
+                        done.add(chunk_id)
+                        results.put((chunk_id, part, error, time.perf_counter() - started))
+                        if stop.is_set():
+                            break
+                        started = time.perf_counter()
+            except Exception as e:
+                # The exception itself is kept: retry.is_transient looks at its type
+                for chunk_id in slice_ids:
+                    if chunk_id not in done:
+                        results.put((chunk_id, None, e, 0.0))
+            finally:
+                scheduler.release(ticket)
+    
+    threads = [threading.Thread(target=run, daemon=True) for _ in range(min(scheduler.slots, len(misses)))]
+    for thread in threads:
+        thread.start()
+    
+    try:
+        for _ in range(len(misses)):
+            chunk_id, part, error, seconds = results.get()
+            record_chunk(misses[chunk_id], part, error, seconds, language, speed, scheduler.cost_model,
+                         cache, keys.get(chunk_id), metrics)
+            yield chunk_id, part, error
+    finally:
+        # If the caller stopped early, the chunks not started are dropped
+        stop.set()
+        scheduler.close(ticket)
+        for thread in threads:
+            thread.join()
+        scheduler.cost_model.save()
+
+
+def generate_with_retry(chunks, sample_file, language, speed, use_cache=True, metrics=None,
+                        max_attempts=5, on_result=None, weight=1.0):
+    """
+    Generates a batch of chunks (see generate_audio_batch), retrying the
+    chunks that failed with a transient error (timeout, out of memory,
+    lost worker) with exponential backoff. A permanent error stops the
+    retries right away.
+    
+    Returns:
+        dict: {chunk_id: (samples, sample_rate)} for the chunks that
+            succeeded. Missing ids failed.
+    """
+    results = {}
+    pending = dict(chunks)
+    
+    for attempt in range(1, max_attempts + 1):
+        if not pending:
+            break
+        print(f"\n🎵 Generating {len(pending)} chunk(s), attempt {attempt}/{max_attempts}...")
+        
+        errors = {}
+        results.update(generate_audio_batch(
+            pending, sample_file, language, speed, use_cache, metrics,
+            errors=errors, on_result=on_result, weight=weight
+        ))
+        pending = {i: chunk for i, chunk in pending.items() if i not in results}
+        
+        permanent = permanent_errors(pending, errors)
+        if permanent:
+            for i, error in permanent.items():
+                print(f"❌ Chunk {i} failed permanently: {error}")
+            break
+        
+        if pending and attempt < max_attempts:
+            delay = backoff_delay(attempt)
+            print(f"⏳ {len(pending)} chunk(s) failed with transient errors, retrying in {delay:.1f}s...")
+            time.sleep(delay)
+    
+    return results
+
+
+def generate_audio_batch(chunks, sample_file, language, speed, use_cache=True, metrics=None,
+                         errors=None, on_result=None, weight=1.0):
+    """
+    Generates raw PCM for several chunks in a single worker request, so the
+    voice latents and per-call overhead are paid once per batch. Chunks
+    already in the chunk cache skip inference entirely.
+    
+    Args:
+        chunks: Dict {chunk_id: text}.
+        use_cache: Look chunks up in (and add them to) the chunk cache.
+        metrics: Metrics to record the chunks in (default: METRICS).
+        errors: Optional dict filled with {chunk_id: error} for the chunks
+            that failed (an error message or the exception that stopped
+            the batch), to tell transient from permanent failures.
+        on_result: Optional callable(chunk_id, samples, sample_rate) invoked
+            as soon as each chunk succeeds.
+        weight: Priority of the request in the scheduler (see get_scheduler).
+    
+    Returns:
+        dict: {chunk_id: (samples, sample_rate)} for the chunks that
+            succeeded. Missing ids failed and can be retried.
+    """
+    results = {}
+    if errors is None:
+        errors = {}
+    try:
+        for chunk_id, part, error in iter_audio_batch(chunks, sample_file, language, speed, use_cache, metrics, weight):
+            if error is not None:
+                print(f"❌ Error generating chunk {chunk_id}: {error}")
+                errors[chunk_id] = error
+            elif part[0].size == 0:
+                print(f"❌ Worker returned empty audio for chunk {chunk_id}.")
+                errors[chunk_id] = "Worker returned empty audio"
+            else:
+                results[chunk_id] = part
+                if on_result is not None:
+                    on_result(chunk_id, *part)
+                print(f"✅ Chunk {chunk_id} ready ({part[0].size / part[1]:.1f}s of audio)")
+    except WorkerError as e:
+        print(f"❌ Error generating chunks: {e}")
+        errors.update({chunk_id: e for chunk_id in chunks if chunk_id not in results})
+    except Exception as e:
+        print(f"❌ Unexpected error: {e}")
+        errors.update({chunk_id: e for chunk_id in chunks if chunk_id not in results})
+    
+    return results
+
+
 # --- Database Functions (From previous interactions) ---
 
 def load_database():
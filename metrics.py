@@ -0,0 +1,177 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Stages reported by the pipeline (other names are accepted too)
+STAGES = (
+    "model_load",   # Loading the backend / checkpoint
+    "latents",      # Conditioning latents of a voice (cache misses only)
+    "inference",    # One chunk through the model
+    "split",        # Text chunking
+    "synthesis",    # One chunk as seen by the client (worker wait, IPC, cache)
+    "postprocess",  # Denoise, trim and loudness of one chunk (background thread)
+    "merge",        # Joining the chunk PCM
+    "encode",       # Writing PCM to a file in the worker (WAV or ffmpeg)
+    "export",       # Writing the final output (WAV or the ffmpeg pipe)
+)
+
+
+class Metrics:
+    """
+    Thread-safe per-stage timing counters.
+
+    Every observation adds a duration to its stage, optionally with the
+    number of characters processed and the seconds of audio produced, so
+    each stage reports calls, total/max time, characters per second, audio
+    seconds per second and real-time factor (time spent / audio produced,
+    below 1.0 is faster than real time).
+
+    A callback(stage, record) receives each observation as it happens;
+    snapshot() returns everything as a JSON-serializable dictionary and
+    render_prometheus() turns snapshots into Prometheus text.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}
+
+    def observe(self, stage, seconds, chars=0, audio_seconds=0.0, error=False):
+        """
+        Records one occurrence of a stage.
+        """
+        with self.lock:
+            entry = self.stages.setdefault(stage, {
+                "count": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                "chars": 0, "audio_seconds": 0.0,
+            })
+            entry["count"] += 1
+            entry["errors"] += int(error)
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["chars"] += chars
+            entry["audio_seconds"] += audio_seconds
+
+        if self.callback is not None:
+            self.callback(stage, {"seconds": seconds, "chars": chars,
+                                  "audio_seconds": audio_seconds, "error": error})
+
+    @contextmanager
+    def stage(self, stage, chars=0):
+        """
+        Times the block as one occurrence of stage. The yielded dictionary
+        can be updated inside the block with "chars" and "audio_seconds"
+        once they are known.
+        """
+        record = {"chars": chars, "audio_seconds": 0.0}
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            self.observe(stage, time.perf_counter() - start, record["chars"], record["audio_seconds"], error=True)
+            raise
+        self.observe(stage, time.perf_counter() - start, record["chars"], record["audio_seconds"])
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+            self.started = time.time()
+
+    def snapshot(self):
+        """
+        Returns the counters of every stage plus derived rates.
+        """
+        with self.lock:
+            stages = {name: dict(entry) for name, entry in self.stages.items()}
+
+        for entry in stages.values():
+            seconds = entry["seconds"]
+            entry["chars_per_second"] = entry["chars"] / seconds if seconds and entry["chars"] else None
+            entry["audio_seconds_per_second"] = (
+                entry["audio_seconds"] / seconds if seconds and entry["audio_seconds"] else None
+            )
+            entry["real_time_factor"] = seconds / entry["audio_seconds"] if entry["audio_seconds"] else None
+
+        return {"uptime_seconds": time.time() - self.started, "stages": stages}
+
+
+# Prometheus families: (name, type, help, snapshot field)
+PROMETHEUS_FAMILIES = (
+    ("stage_calls_total", "counter", "Occurrences of each pipeline stage.", "count"),
+    ("stage_errors_total", "counter", "Occurrences of each stage that raised an error.", "errors"),
+    ("stage_seconds_total", "counter", "Total time spent in each stage.", "seconds"),
+    ("stage_max_seconds", "gauge", "Longest single occurrence of each stage.", "max_seconds"),
+    ("stage_chars_total", "counter", "Characters processed by each stage.", "chars"),
+    ("stage_audio_seconds_total", "counter", "Seconds of audio produced by each stage.", "audio_seconds"),
+    ("stage_real_time_factor", "gauge", "Stage time per second of audio produced.", "real_time_factor"),
+)
+
+
+def _labels(labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+def render_prometheus(snapshots, prefix="xtts_"):
+    """
+    Renders snapshots in the Prometheus text exposition format.
+
+    Args:
+        snapshots: List of (labels dict, Metrics.snapshot()) pairs, e.g. one
+            per process, all rendered under the same metric families.
+        prefix: Metric name prefix.
+
+    Returns:
+        str: Prometheus text.
+    """
+    lines = []
+    for name, kind, help_text, field in PROMETHEUS_FAMILIES:
+        lines.append(f"# HELP {prefix}{name} {help_text}")
+        lines.append(f"# TYPE {prefix}{name} {kind}")
+        for labels, snapshot in snapshots:
+            for stage, entry in sorted(snapshot["stages"].items()):
+                value = entry.get(field)
+                if value is None:
+                    continue
+                lines.append(f"{prefix}{name}{{{_labels({**labels, 'stage': stage})}}} {value:.6g}")
+
+    lines.append(f"# HELP {prefix}uptime_seconds Seconds since the metrics were started or reset.")
+    lines.append(f"# TYPE {prefix}uptime_seconds gauge")
+    for labels, snapshot in snapshots:
+        label_text = f"{{{_labels(labels)}}}" if labels else ""
+        lines.append(f"{prefix}uptime_seconds{label_text} {snapshot['uptime_seconds']:.6g}")
+
+    # Worker lifecycle (see core.py): jobs served and memory watermarks
+    workers = [(labels, snapshot) for labels, snapshot in snapshots if "memory" in snapshot]
+    if workers:
+        lines.append(f"# HELP {prefix}worker_jobs_total Chunks synthesized by the worker process.")
+        lines.append(f"# TYPE {prefix}worker_jobs_total counter")
+        for labels, snapshot in workers:
+            label_text = f"{{{_labels(labels)}}}" if labels else ""
+            lines.append(f"{prefix}worker_jobs_total{label_text} {snapshot['jobs']}")
+        lines.append(f"# HELP {prefix}worker_memory_mb Resident memory and torch allocator statistics of the worker.")
+        lines.append(f"# TYPE {prefix}worker_memory_mb gauge")
+        for labels, snapshot in workers:
+            for kind, value in sorted(snapshot["memory"].items()):
+                kind = kind[:-3] if kind.endswith("_mb") else kind
+                lines.append(f"{prefix}worker_memory_mb{{{_labels({**labels, 'kind': kind})}}} {value:.6g}")
+
+    return "\n".join(lines) + "\n"
+
+
+def format_summary(snapshot):
+    """
+    Returns a short human-readable table of a snapshot.
+    """
+    lines = [f"{'stage':<12} {'calls':>6} {'total s':>9} {'max s':>8} {'chars/s':>9} {'audio s':>9} {'RTF':>7}"]
+    for stage, entry in snapshot["stages"].items():
+        cps = entry["chars_per_second"]
+        rtf = entry["real_time_factor"]
+        lines.append(
+            f"{stage:<12} {entry['count']:>6} {entry['seconds']:>9.3f} {entry['max_seconds']:>8.3f} "
+            f"{(f'{cps:.1f}' if cps else '-'):>9} {entry['audio_seconds']:>9.1f} "
+            f"{(f'{rtf:.3f}' if rtf else '-'):>7}"
+        )
+    return "\n".join(lines)
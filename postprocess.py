@@ -0,0 +1,197 @@
+"""
+Post-processing of generated chunks: spectral denoise, silence trimming and
+loudness normalization, in vectorized NumPy.
+
+PostProcessor runs it on a background thread, so chunk N is processed while
+the workers generate chunk N+1: the client is otherwise idle waiting for
+the workers, and NumPy releases the GIL in the FFTs and matrix products.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Defaults of the "postprocess" setting in database.json: every step is off
+# until enabled per call or in the config
+DEFAULT_OPTIONS = {
+    "denoise": False,       # Spectral gating (XTTS output is usually clean)
+    "trim": False,          # Remove leading/trailing silence of each chunk
+    "loudness": None,       # Target RMS level of the speech in dBFS (e.g. -20.0)
+}
+
+
+def _frame_db(samples, frame):
+    """
+    RMS level in dBFS of consecutive frames of `frame` samples.
+    """
+    count = samples.size // frame
+    if count == 0:
+        return np.full(1, 20 * np.log10(np.sqrt(np.mean(samples ** 2)) + 1e-10))
+    frames = samples[:count * frame].reshape(count, frame)
+    return 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+
+
+def trim_silence(samples, sample_rate, threshold_db=40.0, pad_ms=30, frame_ms=10):
+    """
+    Removes the leading and trailing silence of a chunk: frames more than
+    `threshold_db` below the loudest one. `pad_ms` is kept on each side so
+    soft onsets and endings are not cut.
+    """
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    levels = _frame_db(samples, frame)
+    voiced = np.flatnonzero(levels > levels.max() - threshold_db)
+    if voiced.size == 0:
+        return samples
+
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(samples.size, (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def spectral_denoise(samples, n_fft=1024, hop=256, strength=1.5, floor=0.1, noise_percentile=10):
+    """
+    Spectral gating: the noise spectrum is estimated from the quietest
+    frames of the chunk, and every bin is attenuated by how close it is to
+    `strength` times that noise level (down to `floor`).
+    """
+    if samples.size < n_fft:
+        return samples
+
+    window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+    padded = np.pad(samples, (n_fft, n_fft))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop] * window
+    spectrum = np.fft.rfft(frames, axis=1)
+    magnitude = np.abs(spectrum)
+
+    # Noise profile: mean spectrum of the quietest frames (pauses, edges)
+    energy = (magnitude ** 2).sum(axis=1)
+    quiet = energy <= np.percentile(energy, noise_percentile)
+    noise = magnitude[quiet].mean(axis=0)
+    gain = np.clip(1.0 - strength * noise / (magnitude + 1e-10), floor, 1.0)
+    # Smoothing over 3 frames avoids "musical noise" from isolated bins
+    gain[1:-1] = (gain[:-2] + gain[1:-1] + gain[2:]) / 3
+
+    # Overlap-add with the window normalization of each sample
+    processed = np.fft.irfft(spectrum * gain, n=n_fft, axis=1) * window
+    starts = np.arange(frames.shape[0]) * hop
+    indices = (starts[:, None] + np.arange(n_fft)).ravel()
+    output = np.bincount(indices, weights=processed.ravel(), minlength=padded.size)
+    norm = np.bincount(indices, weights=np.tile(window ** 2, frames.shape[0]), minlength=padded.size)
+    output = output / np.maximum(norm, 1e-8)
+    return output[n_fft:n_fft + samples.size].astype(np.float32)
+
+
+def normalize_loudness(samples, sample_rate, target_db=-20.0, peak_db=-1.0, max_gain_db=20.0):
+    """
+    Brings the speech level of a chunk to `target_db` (RMS in dBFS over the
+    frames louder than -50 dBFS and within 10 dB of the average, a simplified
+    EBU R128 gate), without pushing the peak above `peak_db`.
+    """
+    levels = _frame_db(samples, max(1, int(sample_rate * 0.05)))
+    gated = levels[levels > -50.0]
+    if gated.size == 0:
+        return samples
+
+    def energy(db):
+        return 10 * np.log10(np.mean(10 ** (db / 10)))
+
+    gated = gated[gated > energy(gated) - 10.0]
+    gain_db = np.clip(target_db - energy(gated), -max_gain_db, max_gain_db)
+
+    peak = np.abs(samples).max()
+    if peak > 0:
+        gain_db = min(gain_db, peak_db - 20 * np.log10(peak))
+    return (samples * 10 ** (gain_db / 20)).astype(np.float32)
+
+
+def process(samples, sample_rate, denoise=False, trim=False, loudness=None):
+    """
+    Runs the enabled steps on one chunk.
+
+    Args:
+        samples: Mono samples (float32 in [-1, 1] or int16).
+        sample_rate: Sample rate of the samples.
+        denoise, trim, loudness: See DEFAULT_OPTIONS.
+
+    Returns:
+        np.ndarray: float32 samples.
+    """
+    if samples.dtype == np.int16:
+        samples = samples.astype(np.float32) / 32768.0
+    else:
+        samples = np.asarray(samples, dtype=np.float32)
+
+    if denoise:
+        samples = spectral_denoise(samples)
+    if trim:
+        samples = trim_silence(samples, sample_rate)
+    if loudness is not None:
+        samples = normalize_loudness(samples, sample_rate, loudness)
+    return samples
+
+
+class PostProcessor:
+    """
+    Post-processes chunks on a background thread as they are generated.
+
+    submit() queues a chunk and returns at once; results() waits for the
+    queued chunks and returns them processed. A callback(chunk_id, samples,
+    sample_rate) also receives each chunk once processed (e.g. an
+    audio_sink.OrderedWriter). With all steps disabled the chunks are
+    passed through.
+    """
+
+    def __init__(self, options=None, metrics=None, callback=None):
+        self.options = {key: (options or {}).get(key, default) for key, default in DEFAULT_OPTIONS.items()}
+        self.enabled = bool(self.options["denoise"] or self.options["trim"]
+                            or self.options["loudness"] is not None)
+        self.metrics = metrics
+        self.callback = callback
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="postprocess")
+        self.lock = threading.Lock()
+        self.futures = {}
+
+    def _run(self, chunk_id, samples, sample_rate):
+        if self.metrics is None:
+            samples = process(samples, sample_rate, **self.options)
+        else:
+            with self.metrics.stage("postprocess") as record:
+                record["audio_seconds"] = samples.size / sample_rate
+                samples = process(samples, sample_rate, **self.options)
+        if self.callback is not None:
+            self.callback(chunk_id, samples, sample_rate)
+        return samples, sample_rate
+
+    def submit(self, chunk_id, samples, sample_rate):
+        """
+        Queues a chunk (same signature as the on_result callbacks).
+        """
+        with self.lock:
+            if self.enabled:
+                self.futures[chunk_id] = self.executor.submit(self._run, chunk_id, samples, sample_rate)
+                return
+            self.futures[chunk_id] = (samples, sample_rate)
+        if self.callback is not None:
+            self.callback(chunk_id, samples, sample_rate)
+
+    def results(self):
+        """
+        Waits for the queued chunks and returns them, then forgets them.
+
+        Returns:
+            dict: {chunk_id: (samples, sample_rate)}
+        """
+        with self.lock:
+            futures, self.futures = self.futures, {}
+        return {chunk_id: future.result() if self.enabled else future
+                for chunk_id, future in futures.items()}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
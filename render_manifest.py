@@ -0,0 +1,142 @@
+"""
+Manifests of rendered outputs, for incremental re-renders of edited texts.
+
+make_audio writes `<output>.manifest.json` next to each output:
+    {"format": 1, "settings": {voice, language, speed, model, post-processing,
+     pause}, "sample_rate", "chunks": [{"sha256", "chars", "start", "samples"}]}
+where start/samples locate each chunk's audio in the output, in samples.
+
+When the same output is rendered again from an edited text (chunked with
+content-defined boundaries, see text_splitter.split_text(stable=True)), the
+chunks whose text is unchanged are copied from the previous output instead
+of being generated, and only the edited ones go to the workers.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from audio_sink import decode_audio
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(output_file):
+    return f"{output_file}.manifest.json"
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_manifest(output_file, settings):
+    """
+    Reads the manifest of a previous render of output_file.
+
+    Returns:
+        dict: The manifest, or None if there is none, the output is gone or
+            it was rendered with other settings (voice, speed, model...),
+            in which case nothing can be reused.
+    """
+    path = manifest_path(output_file)
+    if not os.path.exists(path) or not os.path.exists(output_file):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != MANIFEST_VERSION or manifest.get("settings") != settings:
+        return None
+    return manifest
+
+
+def save_manifest(output_file, settings, chunks, lengths, sample_rate, pause_ms):
+    """
+    Writes the manifest of a finished render.
+
+    Args:
+        chunks: Chunk texts, in order.
+        lengths: {chunk_id (1-based): samples written}, see
+            audio_sink.OrderedWriter.lengths.
+    """
+    pause = int(sample_rate * pause_ms / 1000)
+    entries = []
+    start = 0
+    for chunk_id, text in enumerate(chunks, 1):
+        entries.append({"sha256": chunk_hash(text), "chars": len(text),
+                        "start": start, "samples": lengths[chunk_id]})
+        start += lengths[chunk_id] + pause
+
+    path = manifest_path(output_file)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"format": MANIFEST_VERSION, "settings": settings, "sample_rate": sample_rate,
+                   "chunks": entries}, f)
+    os.replace(tmp_path, path)
+
+
+def remove_manifest(output_file):
+    path = manifest_path(output_file)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def plan_reuse(manifest, chunks):
+    """
+    Matches the chunks of the new text with those of the previous render.
+
+    Returns:
+        dict: {chunk_id (1-based): (start, samples)} of the chunks whose
+            audio can be copied from the previous output.
+    """
+    previous = {}
+    for entry in manifest["chunks"]:
+        previous.setdefault(entry["sha256"], []).append(entry)
+
+    reuse = {}
+    for chunk_id, text in enumerate(chunks, 1):
+        entries = previous.get(chunk_hash(text))
+        if entries:
+            # A repeated chunk takes the next copy of it
+            entry = entries.pop(0) if len(entries) > 1 else entries[0]
+            reuse[chunk_id] = (entry["start"], entry["samples"])
+    return reuse
+
+
+class PreviousRender:
+    """
+    The audio of a previous output, decoded once to a temporary raw file
+    and read chunk by chunk (memory-mapped, so long outputs are not loaded
+    in memory). Lossy formats lose a little quality at each re-encode of
+    the reused chunks; re-render WAV or FLAC while iterating on a text.
+    """
+
+    def __init__(self, output_file, sample_rate, reuse):
+        self.sample_rate = sample_rate
+        fd, self.raw_file = tempfile.mkstemp(prefix="xtts_previous_", suffix=".pcm")
+        os.close(fd)
+        try:
+            self.samples = decode_audio(output_file, sample_rate, self.raw_file)
+        except BaseException:
+            self.close()
+            raise
+        # Chunks past the end of a truncated output are generated again
+        self.reuse = {chunk_id: (start, count) for chunk_id, (start, count) in reuse.items()
+                      if start + count <= self.samples.size}
+
+    def get(self, chunk_id):
+        """
+        Returns (samples, sample_rate) of a reused chunk, None for the others.
+        """
+        if chunk_id not in self.reuse:
+            return None
+        start, count = self.reuse[chunk_id]
+        return np.array(self.samples[start:start + count]), self.sample_rate
+
+    def close(self):
+        self.samples = None
+        if os.path.exists(self.raw_file):
+            os.remove(self.raw_file)
@@ -0,0 +1,43 @@
+import random
+
+from worker_client import WorkerError
+
+# Failures that may succeed on a later attempt, raised in this process
+TRANSIENT_ERRORS = (TimeoutError, ConnectionError, MemoryError)
+
+
+def is_transient(error):
+    """
+    Tells whether a failure is worth retrying.
+
+    Timeouts, out-of-memory errors and lost workers are transient; anything
+    else (missing voice file, invalid text, a model error for that input)
+    fails the same way every time and is permanent. Worker errors carry an
+    explicit flag (WorkerError.transient, set by the client for a lost
+    worker and by the worker for out of memory), so the message is never
+    inspected.
+
+    Args:
+        error: An exception, or an error message (always permanent).
+    """
+    if isinstance(error, WorkerError):
+        return error.transient
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def permanent_errors(pending, errors):
+    """
+    Returns {chunk_id: error} of the pending chunks that failed with a
+    permanent error: retrying the batch is pointless if there is any.
+    """
+    return {i: errors[i] for i in pending if i in errors and not is_transient(errors[i])}
+
+
+def backoff_delay(attempt, base=0.5, factor=2.0, max_delay=30.0, jitter=0.2):
+    """
+    Returns how long to wait before retry number `attempt` (1 = first retry):
+    base * factor^(attempt - 1), capped at max_delay, +/- jitter so several
+    clients do not retry in lockstep.
+    """
+    delay = min(max_delay, base * factor ** (attempt - 1))
+    return delay * random.uniform(1.0 - jitter, 1.0 + jitter)
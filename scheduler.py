@@ -0,0 +1,336 @@
+"""
+Cost model and scheduling of synthesis requests on the worker(s).
+
+CostModel predicts how long a chunk takes to generate from its length and
+language:
+    audio seconds   = characters / (speech rate of the language * speed)
+    synthesis time  = overhead + real-time factor * audio seconds
+The speech rate of each language, the real-time factor and the per-chunk
+overhead are calibrated from the chunks actually generated (exponentially
+weighted, so they follow the hardware and model in use) and saved to disk,
+so the next runs start calibrated.
+
+Scheduler hands the worker slots (one per worker) to the requests waiting
+for them. A request gets a slot for a slice of its chunks worth at most
+`slice_seconds` of predicted work, then gives it back: a long job is
+preempted between chunks, and a short request never waits for more than one
+slice. Policies:
+    sjf   Shortest remaining predicted work first (default). Waiting lowers
+          the priority value (`aging`), so a steady flow of short requests
+          cannot starve a long job forever.
+    fair  Weighted fair sharing: the request that received the least worker
+          time (divided by its weight) goes first.
+    fifo  Arrival order: a job keeps the workers until it is done.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+
+DEFAULT_COST_MODEL = os.path.expanduser("~/.cache/xtts-local-api/cost_model.json")
+
+# Defaults of the "scheduler" setting in database.json
+DEFAULT_OPTIONS = {
+    "policy": "sjf",
+    "slice_seconds": 15.0,                 # Predicted work per slot grant
+    "aging": 0.5,                          # sjf: seconds of priority gained per second waited
+    "cost_model": DEFAULT_COST_MODEL,      # Calibration file, None to keep it in memory
+}
+
+POLICIES = ("sjf", "fair", "fifo")
+
+# Starting point before any chunk was measured
+DEFAULT_CHARS_PER_SECOND = 15.0
+DEFAULT_RTF = 1.0
+DEFAULT_OVERHEAD = 0.2
+
+
+class CostModel:
+    """
+    Predicts the synthesis time of chunks (see the module docstring).
+
+    Calibrations are stored per profile (backend, quantization, number of
+    workers), since each runs at its own real-time factor.
+    """
+
+    def __init__(self, path=None, profile="default", decay=0.95):
+        self.path = os.path.expanduser(path) if path else None
+        self.profile = profile
+        # Weight kept by the past at each new observation
+        self.decay = decay
+        self.lock = threading.Lock()
+
+        self.rates = {}  # language -> characters per second of audio at speed 1.0
+        # Exponentially weighted sums for the least-squares fit of
+        # seconds = overhead + rtf * audio_seconds
+        self.sums = {"n": 0.0, "x": 0.0, "y": 0.0, "xx": 0.0, "xy": 0.0}
+        self.observations = 0
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                profile = json.load(f).get("profiles", {}).get(self.profile)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable cost model {self.path}: {e}")
+            return
+        if profile:
+            self.rates = dict(profile.get("rates", {}))
+            self.sums.update(profile.get("sums", {}))
+            self.observations = int(profile.get("observations", 0))
+
+    def save(self):
+        """
+        Writes the calibration (only if it changed). Failures only cost the
+        calibration of the next runs.
+        """
+        if not self.path or not self.dirty:
+            return
+        with self.lock:
+            profile = {"rates": dict(self.rates), "sums": dict(self.sums), "observations": self.observations}
+            self.dirty = False
+
+        tmp_file = f"{self.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            data = {}
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            data.setdefault("profiles", {})[self.profile] = profile
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_file, self.path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not save the cost model: {e}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def parameters(self):
+        """
+        Returns (real-time factor, overhead seconds per chunk).
+        """
+        with self.lock:
+            n, x, y, xx, xy = (self.sums[key] for key in ("n", "x", "y", "xx", "xy"))
+        if n <= 0 or x <= 0:
+            return DEFAULT_RTF, DEFAULT_OVERHEAD
+
+        mean_x, mean_y = x / n, y / n
+        variance = xx / n - mean_x ** 2
+        # The fit needs chunks of different lengths; otherwise (or if it
+        # gives nonsense) only the average time per audio second is used
+        if variance > 0.01 * mean_x ** 2:
+            rtf = (xy / n - mean_x * mean_y) / variance
+            overhead = mean_y - rtf * mean_x
+            if rtf > 0 and overhead >= 0:
+                return rtf, overhead
+        overhead = min(DEFAULT_OVERHEAD, mean_y / 2)
+        return (mean_y - overhead) / mean_x, overhead
+
+    def audio_seconds(self, chars, language, speed=1.0):
+        rate = self.rates.get(language, DEFAULT_CHARS_PER_SECOND)
+        return max(chars, 1) / (rate * max(speed, 0.1))
+
+    def chunk_seconds(self, text, language, speed=1.0):
+        """
+        Predicted synthesis time of one chunk, in seconds.
+        """
+        rtf, overhead = self.parameters()
+        return overhead + rtf * self.audio_seconds(len(text), language, speed)
+
+    def estimate(self, chunks, language, speed=1.0):
+        """
+        Predicted synthesis time of several chunks (texts), in seconds.
+        """
+        rtf, overhead = self.parameters()
+        return sum(overhead + rtf * self.audio_seconds(len(text), language, speed) for text in chunks)
+
+    def observe(self, chars, language, speed, seconds, audio_seconds):
+        """
+        Calibrates the model with a chunk that was generated.
+        """
+        if chars <= 0 or audio_seconds <= 0 or seconds <= 0:
+            return
+        rate = chars / (audio_seconds * max(speed, 0.1))
+        with self.lock:
+            previous = self.rates.get(language)
+            self.rates[language] = rate if previous is None else previous + (1 - self.decay) * (rate - previous)
+            for key, value in (("n", 1.0), ("x", audio_seconds), ("y", seconds),
+                               ("xx", audio_seconds ** 2), ("xy", audio_seconds * seconds)):
+                self.sums[key] = self.decay * self.sums[key] + value
+            self.observations += 1
+            self.dirty = True
+
+    def snapshot(self):
+        rtf, overhead = self.parameters()
+        with self.lock:
+            return {"rtf": rtf, "overhead_s": overhead, "chars_per_second": dict(self.rates),
+                    "observations": self.observations}
+
+
+class Ticket:
+    """
+    The chunks of one request, waiting for (or running on) worker slots.
+    Created by Scheduler.open.
+    """
+
+    def __init__(self, number, costs, weight):
+        self.number = number
+        self.pending = list(costs.items())  # [(chunk_id, predicted seconds)] in order
+        self.remaining = sum(costs.values())
+        self.weight = max(float(weight), 1e-3)
+        self.service = 0.0  # Predicted seconds of worker time received
+        self.waiting = 0    # Threads of this request waiting for a slot
+        self.waiting_since = None
+        self.running = 0
+
+
+class Scheduler:
+    """
+    Hands out worker slots to concurrent requests, a slice of chunks at a
+    time, in the order of the policy (see the module docstring).
+
+    A request opens a ticket with its chunks, then each of its threads calls
+    acquire() for the next slice, generates it on one worker and calls
+    release(). close() ends the request, dropping the chunks not started.
+    """
+
+    def __init__(self, slots=1, policy="sjf", slice_seconds=15.0, aging=0.5, cost_model=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy {policy!r} ({', '.join(POLICIES)})")
+        self.slots = max(int(slots), 1)
+        self.free = self.slots
+        self.policy = policy
+        self.slice_seconds = float(slice_seconds)
+        self.aging = float(aging)
+        self.cost_model = cost_model or CostModel()
+
+        self.condition = threading.Condition()
+        self.tickets = []  # Open tickets, in arrival order
+        self.counter = itertools.count(1)
+
+    def open(self, chunks, language, speed=1.0, weight=1.0):
+        """
+        Registers a request.
+
+        Args:
+            chunks: Dict {chunk_id: text}.
+            weight: Share of the workers under the "fair" policy, and
+                divisor of the remaining work under "sjf" (2.0 = twice the
+                priority).
+
+        Returns:
+            Ticket: To pass to acquire, release and close.
+        """
+        costs = {chunk_id: self.cost_model.chunk_seconds(text, language, speed)
+                 for chunk_id, text in chunks.items()}
+        with self.condition:
+            ticket = Ticket(next(self.counter), costs, weight)
+            # A new request starts level with the least-served open one, not
+            # at zero: it gets its share from now on, without catching up
+            if self.tickets:
+                ticket.service = min(t.service / t.weight for t in self.tickets) * ticket.weight
+            self.tickets.append(ticket)
+        return ticket
+
+    def _priority(self, ticket, now):
+        if self.policy == "fifo":
+            return ticket.number
+        if self.policy == "fair":
+            return ticket.service / ticket.weight
+        return ticket.remaining / ticket.weight - self.aging * (now - ticket.waiting_since)
+
+    def queue_priority(self, seconds, weight=1.0, waited=0.0):
+        """
+        Priority (lower first) of a request that has not opened a ticket
+        yet, e.g. a job waiting in the server queue, in the order of the
+        policy: under "fair" and "fifo" no waiting request has received any
+        service, so they keep their arrival order (0 for all).
+
+        Args:
+            seconds: Predicted work of the request (CostModel.estimate).
+            weight: See open.
+            waited: Seconds since the request arrived.
+        """
+        if self.policy != "sjf":
+            return 0.0
+        return seconds / max(float(weight), 1e-3) - self.aging * waited
+
+    def _next(self):
+        """
+        The waiting ticket that gets the next free slot.
+        """
+        now = time.monotonic()
+        waiting = [ticket for ticket in self.tickets if ticket.waiting and ticket.pending]
+        return min(waiting, key=lambda ticket: (self._priority(ticket, now), ticket.number), default=None)
+
+    def acquire(self, ticket):
+        """
+        Waits for a worker slot, then takes the next slice of the ticket's
+        chunks. The caller must release() the slot once the slice is done.
+
+        Returns:
+            list: Chunk ids of the slice, empty when the ticket has no
+                chunks left (no slot is held then).
+        """
+        with self.condition:
+            if not ticket.waiting:
+                ticket.waiting_since = time.monotonic()
+            ticket.waiting += 1
+            try:
+                while ticket.pending and not (self.free and self._next() is ticket):
+                    self.condition.wait()
+                if not ticket.pending:
+                    return []
+
+                self.free -= 1
+                ticket.running += 1
+                chunk_ids, cost = [], 0.0
+                while ticket.pending and (not chunk_ids or cost + ticket.pending[0][1] <= self.slice_seconds):
+                    chunk_id, chunk_cost = ticket.pending.pop(0)
+                    chunk_ids.append(chunk_id)
+                    cost += chunk_cost
+                ticket.remaining -= cost
+                ticket.service += cost
+                # Other threads of the request age again from now
+                ticket.waiting_since = time.monotonic()
+                return chunk_ids
+            finally:
+                ticket.waiting -= 1
+                self.condition.notify_all()
+
+    def release(self, ticket):
+        """
+        Gives back the slot taken by acquire().
+        """
+        with self.condition:
+            self.free += 1
+            ticket.running -= 1
+            self.condition.notify_all()
+
+    def close(self, ticket):
+        """
+        Ends a request: its chunks not started are dropped and its waiting
+        threads return.
+        """
+        with self.condition:
+            ticket.pending = []
+            ticket.remaining = 0.0
+            if ticket in self.tickets:
+                self.tickets.remove(ticket)
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {
+                "policy": self.policy,
+                "slots": self.slots,
+                "busy": self.slots - self.free,
+                "requests": len(self.tickets),
+                "waiting": sum(1 for ticket in self.tickets if ticket.waiting and not ticket.running),
+                "queued_seconds": sum(ticket.remaining for ticket in self.tickets),
+            }
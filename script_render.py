@@ -0,0 +1,360 @@
+"""
+Multi-speaker scripts (dialogue, podcasts, audiobooks with characters)
+rendered into one audio file.
+
+Script format (UTF-8 text):
+
+    # Voices: name = sample file, with optional default language and speed
+    @voice narrator = male.wav
+    @voice alice = female.wav language=pt speed=1.1
+
+    narrator: It was a cold morning when Alice came in.
+    alice: Bom dia! Tudo bem?
+    alice [language=en speed=1.2]: Sorry, I mean: good morning!
+    [pause 800]
+    narrator: Nobody answered.
+      A line without a voice tag continues the previous one.
+
+or JSON:
+
+    {"voices": {"alice": {"sample": "female.wav", "language": "en", "speed": 1.0}},
+     "lines": [{"voice": "alice", "text": "Hello!"}, {"pause_ms": 800}, ...]}
+
+Usage:
+    python script_render.py dialogue.txt podcast.mp3
+
+Sample paths are relative to the script file; "voice:<name>" selects a
+voice of the voice bank (see voice_bank.py). Only declared voice names
+start a line, so "Note: ..." inside a text is not mistaken for a voice.
+
+Lines are chunked, then the chunks are grouped by (voice, language, speed)
+and each group is generated as one batch: the voice latents are computed
+once per group and every batch is homogeneous. The results are put back in
+script order and written with a pause between chunks and a longer one
+between turns.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+from audio_sink import open_sink
+from job_store import JobStore, JobLocked, DEFAULT_JOBS_DIR
+from make_audio import (
+    split_text_into_chunks, generate_with_retry, get_postprocessor, load_database, voice_exists,
+    JOBS_DIR_KEY, METRICS
+)
+from voice_bank import voice_name, sample_id
+
+VOICE_RE = re.compile(r"^@voice\s+(?P<name>[\w\-]+)\s*=?\s*(?P<sample>\S+)(?P<options>.*)$")
+LINE_RE = re.compile(r"^(?P<name>[\w\-]+)\s*(?:\[(?P<options>[^\]]*)\])?\s*:\s*(?P<text>.*)$")
+PAUSE_RE = re.compile(r"^\[pause\s+(?P<ms>\d+)\s*(?:ms)?\]$", re.IGNORECASE)
+
+
+def parse_options(text, line_number):
+    """
+    Parses "language=pt speed=1.2" into a dictionary.
+    """
+    options = {}
+    for item in text.split():
+        key, _, value = item.partition("=")
+        if key == "language" and value:
+            options["language"] = value
+        elif key == "speed" and value:
+            try:
+                options["speed"] = float(value)
+            except ValueError:
+                raise ValueError(f"Line {line_number}: invalid speed {value!r}")
+        else:
+            raise ValueError(f"Line {line_number}: unknown option {item!r} (language=, speed=)")
+    return options
+
+
+def parse_script(text, base_dir="."):
+    """
+    Parses a script in the text or JSON format.
+
+    Args:
+        text: Script content.
+        base_dir: Directory the sample paths are relative to.
+
+    Returns:
+        list: Lines in script order, each {"voice", "sample_file", "language",
+            "speed", "text", "pause_ms"}, where pause_ms is an explicit pause
+            before the line (None for the default).
+
+    Raises:
+        ValueError: On a syntax error or an unknown voice.
+    """
+    def sample_path(path):
+        if voice_name(path) is not None:
+            return path
+        return os.path.normpath(os.path.join(base_dir, os.path.expanduser(path)))
+
+    if text.lstrip().startswith("{"):
+        data = json.loads(text)
+        voices = {
+            name: {"sample_file": sample_path(voice["sample"]),
+                   "language": voice.get("language", "en"),
+                   "speed": float(voice.get("speed", 1.0))}
+            for name, voice in data.get("voices", {}).items()
+        }
+        raw_lines = data.get("lines", [])
+    else:
+        voices = {}
+        raw_lines = []
+        for line_number, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            match = VOICE_RE.match(line)
+            if match:
+                voices[match["name"]] = {
+                    "sample_file": sample_path(match["sample"]),
+                    "language": "en",
+                    "speed": 1.0,
+                    **parse_options(match["options"], line_number),
+                }
+                continue
+
+            match = PAUSE_RE.match(line)
+            if match:
+                raw_lines.append({"pause_ms": int(match["ms"])})
+                continue
+
+            match = LINE_RE.match(line)
+            if match and match["name"] in voices:
+                raw_lines.append({"voice": match["name"], "text": match["text"],
+                                  **parse_options(match["options"] or "", line_number)})
+            elif raw_lines and "voice" in raw_lines[-1]:
+                raw_lines[-1]["text"] = f"{raw_lines[-1]['text']} {line}".strip()
+            else:
+                raise ValueError(f"Line {line_number}: expected 'voice: text' with a declared voice")
+
+    lines = []
+    pause_ms = None
+    for number, raw in enumerate(raw_lines, 1):
+        if "pause_ms" in raw and "voice" not in raw:
+            pause_ms = (pause_ms or 0) + int(raw["pause_ms"])
+            continue
+        voice = voices.get(raw.get("voice"))
+        if voice is None:
+            raise ValueError(f"Line {number}: unknown voice {raw.get('voice')!r}")
+        if not raw.get("text", "").strip():
+            continue
+        lines.append({
+            "voice": raw["voice"],
+            "sample_file": voice["sample_file"],
+            "language": raw.get("language", voice["language"]),
+            "speed": float(raw.get("speed", voice["speed"])),
+            "text": raw["text"].strip(),
+            "pause_ms": pause_ms,
+        })
+        pause_ms = None
+    return lines
+
+
+def schedule(lines, max_chars=2000):
+    """
+    Chunks the lines and groups the chunks for inference.
+
+    Returns:
+        tuple: (chunks, groups) where chunks is the list of
+            (line index, chunk text) in script order (chunk id = position + 1)
+            and groups maps (sample_file, language, speed) to {chunk_id: text},
+            in order of first appearance.
+    """
+    chunks = []
+    groups = {}
+    for index, line in enumerate(lines):
+        for text in split_text_into_chunks(line["text"], max_chars, line["language"]):
+            chunks.append((index, text))
+            key = (line["sample_file"], line["language"], line["speed"])
+            groups.setdefault(key, {})[len(chunks)] = text
+    return chunks, groups
+
+
+def script_key(lines, max_chars, output_file):
+    """
+    Identifies a script job for JobStore: the same script rendered to the
+    same output gets the same job directory (see job_store.job_key).
+    """
+    raw = json.dumps([[sample_id(line["sample_file"]), line["language"], line["speed"], line["text"]]
+                      for line in lines] + [max_chars, os.path.abspath(os.path.expanduser(output_file))])
+    return "script-" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def render_script(script, output_file, max_chars=2000, pause_ms=200, turn_pause_ms=400, bitrate="192k",
+                  use_cache=True, metrics=None, resume=True, max_attempts=5, postprocess=None):
+    """
+    Renders a multi-speaker script into one audio file.
+
+    Args:
+        script: Path of a script file, or the lines returned by parse_script.
+        output_file: Output file (.wav, .mp3, .flac, .ogg, .opus or .m4a).
+        max_chars: Maximum characters per chunk, capped by the XTTS limit
+            of the language (see make_audio.split_text_into_chunks).
+        pause_ms: Silence between the chunks of a line.
+        turn_pause_ms: Silence between lines, unless the script sets one
+            with [pause N].
+        bitrate: Bitrate of compressed formats.
+        use_cache: Reuse cached audio of identical chunks (see ChunkCache).
+        metrics: Metrics to record the stages in (default: make_audio.METRICS).
+        resume: Keep finished chunks in a job directory and reuse them
+            (see make_audio).
+        max_attempts: Attempts per chunk for transient errors.
+        postprocess: Post-processing of the chunks (see make_audio.get_postprocessor).
+
+    Returns:
+        dict: {"lines", "chunks", "voices", "audio_seconds", "bytes",
+            "seconds"} on success, None on error.
+    """
+    start = time.perf_counter()
+    output_file = os.path.expanduser(output_file)
+    metrics = metrics or METRICS
+
+    if isinstance(script, str):
+        script = os.path.expanduser(script)
+        with open(script, 'r', encoding='utf-8') as f:
+            lines = parse_script(f.read(), os.path.dirname(os.path.abspath(script)))
+    else:
+        lines = script
+
+    with metrics.stage("split", chars=sum(len(line["text"]) for line in lines)):
+        chunks, groups = schedule(lines, max_chars)
+    if not chunks:
+        print("❌ Empty script.")
+        return None
+
+    missing = sorted({line["sample_file"] for line in lines if not voice_exists(line["sample_file"])})
+    if missing:
+        print(f"❌ Voice(s) not found: {', '.join(missing)}")
+        return None
+
+    print(f"📝 {len(lines)} lines, {len(chunks)} chunks, {len(groups)} voice group(s).")
+
+    store = None
+    results = {}
+    if resume:
+        jobs_dir = load_database().get(JOBS_DIR_KEY, DEFAULT_JOBS_DIR)
+        try:
+            store = JobStore(jobs_dir, script_key(lines, max_chars, output_file), [text for _, text in chunks])
+        except JobLocked as e:
+            print(f"⚠️  {e}, this run will not save its chunks")
+        else:
+            results = store.load_parts()
+            if results:
+                print(f"♻️  Resuming script: {len(results)}/{len(chunks)} chunks already done ({store.path})")
+
+    try:
+        return _render(lines, chunks, groups, results, store, output_file, pause_ms, turn_pause_ms, bitrate,
+                       use_cache, metrics, max_attempts, postprocess, start)
+    finally:
+        # Releases the job directory on every exit path, errors included
+        if store is not None:
+            store.close()
+
+
+def _render(lines, chunks, groups, results, store, output_file, pause_ms, turn_pause_ms, bitrate,
+            use_cache, metrics, max_attempts, postprocess, start):
+    """
+    Generates the missing chunks of a script and writes the output (see
+    render_script).
+    """
+    post = get_postprocessor(postprocess, metrics)
+    for chunk_id, part in results.items():
+        post.submit(chunk_id, *part)
+
+    def on_result(chunk_id, samples, sample_rate):
+        if store:
+            store.save_part(chunk_id, samples, sample_rate)
+        post.submit(chunk_id, samples, sample_rate)
+
+    # One batch per voice group: latents computed once, homogeneous batches
+    with post:
+        for (sample_file, language, speed), group in groups.items():
+            pending = {i: text for i, text in group.items() if i not in results}
+            if not pending:
+                continue
+            print(f"\n🎙️  {os.path.basename(sample_file)} ({language}, x{speed}): {len(pending)} chunk(s)")
+            results.update(generate_with_retry(pending, sample_file, language, speed, use_cache, metrics,
+                                               max_attempts=max_attempts, on_result=on_result))
+            if any(i not in results for i in pending):
+                break
+        processed = post.results()
+
+    failed = [i for i in range(1, len(chunks) + 1) if i not in results]
+    if failed:
+        print(f"❌ Failed to generate chunk(s): {', '.join(map(str, failed))}")
+        if store and store.completed:
+            print(f"💾 Finished chunks kept in {store.path}, run the same script again to resume.")
+        elif store:
+            store.remove()
+        return None
+
+    # Back to script order
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    sink = None
+    try:
+        with metrics.stage("export") as record:
+            previous_line = None
+            for chunk_id, (line_index, _) in enumerate(chunks, 1):
+                samples, sample_rate = processed[chunk_id]
+                if sink is None:
+                    sink = open_sink(output_file, sample_rate, bitrate)
+                elif line_index == previous_line:
+                    sink.write_silence(pause_ms)
+                else:
+                    explicit = lines[line_index]["pause_ms"]
+                    sink.write_silence(turn_pause_ms if explicit is None else explicit)
+                sink.write(samples)
+                record["audio_seconds"] += samples.size / sample_rate
+                previous_line = line_index
+        info = sink.close()
+    except BaseException:
+        if sink is not None:
+            sink.abort()
+        raise
+
+    if store:
+        store.remove()
+    return {
+        "lines": len(lines),
+        "chunks": len(chunks),
+        "voices": len({line["voice"] for line in lines}),
+        **info,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a multi-speaker script into one audio file")
+    parser.add_argument("script", help="Script file (text or JSON format, see script_render.py)")
+    parser.add_argument("output_file", help="Output file (.wav, .mp3, .flac, .ogg, .opus or .m4a)")
+    parser.add_argument("--max-chars", type=int, default=2000, help="Maximum characters per chunk (capped by the XTTS limit of the language)")
+    parser.add_argument("--pause-ms", type=int, default=200, help="Silence between the chunks of a line")
+    parser.add_argument("--turn-pause-ms", type=int, default=400, help="Silence between lines")
+    parser.add_argument("--bitrate", default="192k", help="Bitrate of compressed formats")
+    args = parser.parse_args()
+    if args.max_chars < 1:
+        parser.error("--max-chars must be at least 1")
+
+    try:
+        result = render_script(args.script, args.output_file, max_chars=args.max_chars,
+                               pause_ms=args.pause_ms, turn_pause_ms=args.turn_pause_ms,
+                               bitrate=args.bitrate)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if result is None:
+        sys.exit(1)
+
+    print(f"🎉 {args.output_file}: {result['lines']} lines, {result['voices']} voices, "
+          f"{result['audio_seconds'] / 60:.1f} min of audio in {result['seconds']:.1f}s")
@@ -0,0 +1,582 @@
+"""
+Local HTTP service for the XTTS wrapper.
+
+Endpoints:
+    POST /jobs                 {"text", "sample_file", "language", "speed", "format", "weight"}
+                               -> {"job_id", ...}
+    GET  /jobs/<id>            Job status and progress
+    GET  /jobs/<id>/result     Final audio once the job is done (MP3 by default)
+    GET  /jobs/<id>/stream     Raw 16-bit PCM of the chunks, sent as they are ready
+    GET  /health               Queue, scheduler and worker status
+    GET  /metrics              Per-stage timings of the server and its workers
+                               (Prometheus text, or JSON with ?format=json)
+
+Usage:
+    python server.py --port 8020 --queue-size 16 --max-active 4
+
+Accepted jobs wait in a bounded queue, in the order of the scheduler policy
+of make_audio (see scheduler.py): shortest predicted job first by default.
+Up to max_active of them run at once and share the worker(s) through the
+scheduler, with long jobs preempted between chunks, so short requests are
+not stuck behind an audiobook.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from audio_merge import to_int16
+from audio_sink import open_sink, OrderedWriter
+from make_audio import (
+    split_text_into_chunks, get_worker, get_scheduler, get_chunk_cache, iter_audio_batch, request_key,
+    worker_metrics, get_postprocessor, voice_exists, METRICS
+)
+from metrics import render_prometheus
+from retry import is_transient, backoff_delay
+from worker_client import WorkerPool
+
+RESULTS_DIR = os.path.join(tempfile.gettempdir(), "xtts_jobs")
+MAX_BODY_BYTES = 10 * 1024 * 1024
+# Jobs generating at once (the others wait in the queue)
+DEFAULT_MAX_ACTIVE = 4
+# The streamable chunks of a finished job are kept this long for /stream
+# clients that have not connected yet
+STREAM_TTL = 60
+# Attempts per chunk for transient errors
+MAX_ATTEMPTS = 5
+
+# Output formats ("format" of a job) and their media types
+MEDIA_TYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg",
+    "opus": "audio/ogg",
+    "m4a": "audio/mp4",
+}
+
+
+class Job:
+    """
+    One synthesis request and its progress.
+    """
+
+    def __init__(self, key, text, sample_file, language, speed, max_chars, fmt="mp3", weight=1.0):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.text = text
+        self.sample_file = sample_file
+        self.language = language
+        self.speed = speed
+        self.max_chars = max_chars
+        self.format = fmt
+        self.weight = weight
+
+        self.status = "queued"
+        self.error = None
+        self.chunks = []
+        self.generated = set()  # Indexes (1-based) of the chunks generated
+        # Post-processed chunks for /stream: index -> 16-bit PCM bytes,
+        # dropped once the job is finished and streamed (see release_parts)
+        self.parts = {}
+        self.sample_rate = None
+        self.streams = 0        # /stream requests reading the parts
+        self.streamed = False   # A /stream request is done
+        self.parts_released = False
+        self.output_file = None
+        self.estimated_seconds = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Notified whenever a chunk completes or the job finishes
+        self.changed = asyncio.Condition()
+
+    @property
+    def finished_ok(self):
+        return self.status == "done"
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "chunks_total": len(self.chunks),
+            "chunks_done": len(self.generated),
+            "estimated_seconds": self.estimated_seconds,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class SynthesisServer:
+    """
+    Accepts jobs over HTTP and runs them on the warm XTTS worker(s).
+
+    Jobs wait in a bounded queue: when queue_size jobs are waiting, new
+    jobs are rejected with 503 so callers back off instead of piling up
+    work. The queue is ordered like the scheduler orders the requests it
+    runs (Scheduler.queue_priority), and max_active dispatchers take the
+    next job from it; running jobs take turns on the worker(s) through the
+    scheduler. Identical jobs submitted while one is queued or running
+    share that job.
+    """
+
+    def __init__(self, queue_size=16, max_chars=2000, job_ttl=3600, results_dir=RESULTS_DIR,
+                 max_active=DEFAULT_MAX_ACTIVE):
+        self.queue_size = queue_size
+        self.max_active = max(int(max_active), 1)
+        self.max_chars = max_chars
+        self.job_ttl = job_ttl
+        self.results_dir = results_dir
+
+        self.jobs = {}
+        self.inflight = {}  # job key -> queued/running job
+        self.queue = []     # Jobs waiting for a dispatcher
+        self.queue_changed = None
+        self.worker = None
+        self.scheduler = None
+        self.loop = None
+        # Generation threads mostly wait for a worker slot: one per running job
+        self.executor = ThreadPoolExecutor(max_workers=self.max_active, thread_name_prefix="job")
+
+    # --- Job execution ---
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue_changed = asyncio.Condition()
+        os.makedirs(self.results_dir, exist_ok=True)
+
+        # Start or attach to the worker(s) now, so the first job is warm
+        self.worker = get_worker()
+        if isinstance(self.worker, WorkerPool):
+            await self.loop.run_in_executor(None, self.worker.start)
+        else:
+            await self.loop.run_in_executor(None, self.worker.ensure_running)
+        self.scheduler = get_scheduler()
+
+        for _ in range(self.max_active):
+            asyncio.create_task(self.dispatch())
+        asyncio.create_task(self.cleanup())
+
+    def prepare(self, job):
+        """
+        Runs in a thread: splits the text and predicts the cost of the job,
+        which orders the queue.
+        """
+        with METRICS.stage("split", chars=len(job.text)):
+            job.chunks = split_text_into_chunks(job.text, job.max_chars, job.language)
+        if not job.chunks:
+            raise ValueError("Empty or invalid text")
+        job.estimated_seconds = self.scheduler.cost_model.estimate(job.chunks, job.language, job.speed)
+
+    def count_jobs(self, status):
+        """
+        Number of in-flight jobs with that status. Jobs still being split
+        (not in the queue yet) count as queued.
+        """
+        return sum(1 for job in self.inflight.values() if job.status == status)
+
+    def next_job(self):
+        """
+        The queued job that runs next, in the order of the scheduler policy.
+        """
+        now = time.time()
+        return min(self.queue, key=lambda job: (
+            self.scheduler.queue_priority(job.estimated_seconds, job.weight, now - job.created), job.created
+        ))
+
+    async def dispatch(self):
+        while True:
+            async with self.queue_changed:
+                await self.queue_changed.wait_for(lambda: self.queue)
+                job = self.next_job()
+                self.queue.remove(job)
+
+            job.status = "running"
+            job.started = time.time()
+            try:
+                await self.run_job(job)
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished = time.time()
+                self.inflight.pop(job.key, None)
+                await self.notify(job)
+                self.release_parts(job)
+
+    async def run_job(self, job):
+        pending = {i: chunk for i, chunk in enumerate(job.chunks, 1)}
+        errors = {}
+        # Chunks are post-processed (denoise, trim, loudness) and written to
+        # the output encoder in the background while the next ones are generated
+        output_file = os.path.join(self.results_dir, f"{job.id}.{job.format}")
+        output = OrderedWriter(lambda sample_rate: open_sink(output_file, sample_rate), metrics=METRICS)
+
+        def processed(chunk_id, samples, sample_rate):
+            output.add(chunk_id, samples, sample_rate)
+            data = to_int16(samples).astype("<i2").tobytes()
+            self.loop.call_soon_threadsafe(self.part_ready, job, chunk_id, data, sample_rate)
+
+        post = get_postprocessor(metrics=METRICS, callback=processed)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            errors = await self.loop.run_in_executor(self.executor, self.generate, job, pending, post)
+            pending = {i: chunk for i, chunk in pending.items() if i not in job.generated}
+            # Only transient failures (timeouts, OOM, lost worker) are retried
+            if not pending or not all(is_transient(errors.get(i, "")) for i in pending):
+                break
+            if attempt < MAX_ATTEMPTS:
+                await asyncio.sleep(backoff_delay(attempt))
+
+        try:
+            await self.loop.run_in_executor(None, post.results)
+        except Exception:
+            output.abort()
+            raise
+        finally:
+            post.close()
+        if pending:
+            output.abort()
+            raise RuntimeError(f"Failed chunks {sorted(pending)}: {next(iter(errors.values()), '')}")
+
+        await self.loop.run_in_executor(None, output.close)
+        job.output_file = output_file
+        job.status = "done"
+
+    def generate(self, job, chunks, post):
+        """
+        Runs in a thread: generates the chunks, queues each finished one for
+        post-processing and hands it back to the event loop.
+
+        Returns:
+            dict: {chunk_id: error} for the chunks that failed.
+        """
+        errors = {}
+        try:
+            for chunk_id, part, error in iter_audio_batch(
+                chunks, job.sample_file, job.language, job.speed, weight=job.weight
+            ):
+                if error is not None:
+                    errors[chunk_id] = error
+                else:
+                    post.submit(chunk_id, *part)
+                    # Callbacks run in order, so every chunk is counted before
+                    # run_job resumes after this thread returns
+                    self.loop.call_soon_threadsafe(self.chunk_done, job, chunk_id)
+        except Exception as e:
+            errors.update({chunk_id: e for chunk_id in chunks if chunk_id not in errors})
+        return errors
+
+    def chunk_done(self, job, chunk_id):
+        job.generated.add(chunk_id)
+        asyncio.create_task(self.notify(job))
+
+    def part_ready(self, job, chunk_id, data, sample_rate):
+        if job.parts_released:
+            return
+        job.parts[chunk_id] = data
+        job.sample_rate = sample_rate
+        asyncio.create_task(self.notify(job))
+
+    def release_parts(self, job, force=False):
+        """
+        Drops the streamable chunks of a finished job once no stream reads
+        them: when the last stream is done, or after STREAM_TTL (force) if
+        nobody streamed the job. The result file stays until job_ttl.
+        """
+        if job.finished and not job.streams and (force or job.streamed):
+            job.parts.clear()
+            job.parts_released = True
+
+    async def notify(self, job):
+        async with job.changed:
+            job.changed.notify_all()
+
+    async def cleanup(self):
+        """
+        Forgets finished jobs (and deletes their result files) after job_ttl.
+        """
+        while True:
+            await asyncio.sleep(60)
+            now = time.time()
+            for job in list(self.jobs.values()):
+                if job.finished and now - job.finished > STREAM_TTL:
+                    self.release_parts(job, force=True)
+                if job.finished and now - job.finished > self.job_ttl:
+                    del self.jobs[job.id]
+                    if job.output_file and os.path.exists(job.output_file):
+                        os.remove(job.output_file)
+
+    # --- HTTP ---
+
+    async def handle(self, reader, writer):
+        try:
+            request = await read_request(reader)
+            if request is None:
+                return
+            method, path, body = request
+            await self.route(writer, method, path, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            await send_json(writer, HTTPStatus.BAD_REQUEST, {"error": str(e)})
+        except Exception as e:
+            await send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+        finally:
+            writer.close()
+
+    async def route(self, writer, method, path, body):
+        parts = [p for p in path.split("?")[0].split("/") if p]
+
+        if method == "GET" and parts == ["health"]:
+            cache = get_chunk_cache()
+            return await send_json(writer, HTTPStatus.OK, {
+                "status": "ok",
+                "queued": self.count_jobs("queued"),
+                "queue_size": self.queue_size,
+                "running": self.count_jobs("running"),
+                "max_active": self.max_active,
+                "inflight": len(self.inflight),
+                "scheduler": self.scheduler.stats(),
+                "cost_model": self.scheduler.cost_model.snapshot(),
+                "chunk_cache": cache.stats() if cache else None,
+            })
+
+        if method == "GET" and parts == ["metrics"]:
+            return await self.send_metrics(writer, "format=json" in path)
+
+        if method == "POST" and parts == ["jobs"]:
+            return await self.submit(writer, body)
+
+        if method == "GET" and len(parts) >= 2 and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return await send_json(writer, HTTPStatus.NOT_FOUND, {"error": "Unknown job"})
+            if len(parts) == 2:
+                return await send_json(writer, HTTPStatus.OK, job.to_dict())
+            if parts[2:] == ["result"]:
+                return await self.send_result(writer, job)
+            if parts[2:] == ["stream"]:
+                return await self.stream(writer, job)
+
+        await send_json(writer, HTTPStatus.NOT_FOUND, {"error": "Not found"})
+
+    async def send_metrics(self, writer, as_json):
+        workers = await self.loop.run_in_executor(None, worker_metrics)
+        snapshots = [({"process": "server"}, METRICS.snapshot())]
+        snapshots += [({"process": "worker", "pid": snapshot["pid"]}, snapshot) for snapshot in workers]
+
+        if as_json:
+            return await send_json(writer, HTTPStatus.OK, {
+                "server": snapshots[0][1],
+                "workers": workers,
+            })
+
+        body = render_prometheus(snapshots).encode("utf-8")
+        await send_head(writer, HTTPStatus.OK, {
+            "Content-Type": "text/plain; version=0.0.4; charset=utf-8",
+            "Content-Length": str(len(body)),
+        })
+        writer.write(body)
+        await writer.drain()
+
+    async def submit(self, writer, body):
+        try:
+            data = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            raise ValueError("Body must be JSON")
+
+        text = data.get("text")
+        sample_file = os.path.expanduser(data.get("sample_file") or "")
+        language = data.get("language", "en")
+        speed = float(data.get("speed", 1.0))
+        fmt = str(data.get("format", "mp3")).lower()
+        weight = float(data.get("weight", 1.0))
+        max_chars = int(data.get("max_chars", self.max_chars))
+
+        if not text or not isinstance(text, str):
+            raise ValueError("Missing 'text'")
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported format {fmt!r} ({', '.join(MEDIA_TYPES)})")
+        if not weight > 0:
+            raise ValueError("'weight' must be positive")
+        if max_chars < 1:
+            raise ValueError("'max_chars' must be at least 1")
+        if not voice_exists(sample_file):
+            raise ValueError(f"Voice not found: {sample_file}")
+
+        # Identical requests in flight are coalesced into one job
+        key = request_key(text, sample_file, language, speed, settings={"format": fmt, "max_chars": max_chars})
+        job = self.inflight.get(key)
+        if job is not None:
+            return await send_json(writer, HTTPStatus.OK, {**job.to_dict(), "coalesced": True})
+
+        # Jobs still being split count as queued
+        if self.count_jobs("queued") >= self.queue_size:
+            return await send_json(
+                writer, HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Queue is full, retry later"},
+                headers={"Retry-After": "5"}
+            )
+
+        job = Job(key, text, sample_file, language, speed, max_chars, fmt, weight)
+        self.jobs[job.id] = job
+        self.inflight[key] = job
+        try:
+            await self.loop.run_in_executor(None, self.prepare, job)
+        except Exception:
+            del self.jobs[job.id]
+            del self.inflight[key]
+            raise
+        async with self.queue_changed:
+            self.queue.append(job)
+            self.queue_changed.notify()
+        await send_json(writer, HTTPStatus.ACCEPTED, {**job.to_dict(), "coalesced": False})
+
+    async def send_result(self, writer, job):
+        if not job.finished_ok:
+            return await send_json(writer, HTTPStatus.CONFLICT, job.to_dict())
+
+        size = os.path.getsize(job.output_file)
+        await send_head(writer, HTTPStatus.OK, {
+            "Content-Type": MEDIA_TYPES[job.format],
+            "Content-Length": str(size),
+            "Content-Disposition": f'attachment; filename="{job.id}.{job.format}"',
+        })
+        with open(job.output_file, 'rb') as f:
+            for block in iter(lambda: f.read(64 * 1024), b""):
+                writer.write(block)
+                await writer.drain()
+
+    async def stream(self, writer, job):
+        """
+        Sends the post-processed chunks as raw mono 16-bit PCM (chunked
+        transfer encoding), in order, as soon as each one is ready. The
+        sample rate in the media type is the backend's, known once the
+        first chunk is ready.
+        """
+        if job.parts_released:
+            return await send_json(writer, HTTPStatus.GONE, {
+                "error": "The stream of this job is no longer available, get its result instead"
+            })
+
+        job.streams += 1
+        try:
+            async with job.changed:
+                await job.changed.wait_for(lambda: job.sample_rate is not None or job.finished is not None)
+            if job.sample_rate is None:
+                # Failed before its first chunk
+                return await send_json(writer, HTTPStatus.CONFLICT, job.to_dict())
+
+            await send_head(writer, HTTPStatus.OK, {
+                "Content-Type": f"audio/L16; rate={job.sample_rate}; channels=1",
+                "Transfer-Encoding": "chunked",
+            })
+
+            next_index = 1
+            while True:
+                while next_index in job.parts:
+                    data = job.parts[next_index]
+                    writer.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                    await writer.drain()
+                    next_index += 1
+
+                if job.finished and (job.status != "done" or next_index > len(job.chunks)):
+                    break
+
+                async with job.changed:
+                    await job.changed.wait_for(
+                        lambda: next_index in job.parts or job.finished is not None
+                    )
+
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            job.streams -= 1
+            job.streamed = True
+            self.release_parts(job)
+
+
+# --- Minimal HTTP/1.1 helpers ---
+
+async def read_request(reader):
+    """
+    Reads one HTTP request.
+
+    Returns:
+        tuple: (method, path, body) or None if the client sent nothing.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    try:
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise ValueError("Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        raise ValueError("Request body too large")
+    body = await reader.readexactly(length) if length else b""
+
+    return method.upper(), path, body
+
+
+async def send_head(writer, status, headers):
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+
+
+async def send_json(writer, status, data, headers=None):
+    body = json.dumps(data).encode("utf-8")
+    await send_head(writer, status, {
+        "Content-Type": "application/json",
+        "Content-Length": str(len(body)),
+        **(headers or {}),
+    })
+    writer.write(body)
+    await writer.drain()
+
+
+async def main(host, port, queue_size, max_chars, max_active):
+    service = SynthesisServer(queue_size=queue_size, max_chars=max_chars, max_active=max_active)
+    await service.start()
+
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"🌐 Listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP service for XTTS synthesis")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8020)
+    parser.add_argument("--queue-size", type=int, default=16, help="Maximum number of jobs waiting to run")
+    parser.add_argument("--max-active", type=int, default=DEFAULT_MAX_ACTIVE,
+                        help="Jobs running at once, sharing the worker(s) through the scheduler")
+    parser.add_argument("--max-chars", type=int, default=2000, help="Maximum characters per chunk (capped by the XTTS limit of the language)")
+    args = parser.parse_args()
+    if args.max_chars < 1:
+        parser.error("--max-chars must be at least 1")
+
+    try:
+        asyncio.run(main(args.host, args.port, args.queue_size, args.max_chars, args.max_active))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,36 @@
+import numpy as np
+
+from audio_merge import merge_pcm, merged_length, to_int16, to_float32
+
+
+def test_pause_between_parts():
+    parts = [np.ones(100, dtype=np.float32), np.full(50, 0.5, dtype=np.float32)]
+    merged = merge_pcm(parts, 1000, pause_ms=10)
+    assert merged.dtype == np.float32
+    assert merged.size == 160
+    assert np.all(merged[:100] == 1.0)
+    assert np.all(merged[100:110] == 0.0)
+    assert np.all(merged[110:] == 0.5)
+
+
+def test_crossfade_overlaps_parts():
+    parts = [np.ones(100, dtype=np.float32), np.ones(100, dtype=np.float32)]
+    merged = merge_pcm(parts, 1000, crossfade_ms=20)
+    assert merged.size == merged_length([100, 100], 0, 20) == 180
+    # A linear crossfade of equal signals keeps the level
+    assert np.allclose(merged, 1.0)
+
+
+def test_int16_parts_are_rescaled():
+    merged = merge_pcm([np.array([16384, -16384], dtype=np.int16)], 1000)
+    assert np.allclose(merged, [0.5, -0.5])
+
+
+def test_no_parts():
+    assert merge_pcm([], 24000).size == 0
+
+
+def test_int16_round_trip_clips():
+    samples = np.array([0.0, 0.5, 2.0, -2.0], dtype=np.float32)
+    assert list(to_int16(samples)) == [0, 16383, 32767, -32767]
+    assert np.allclose(to_float32(to_int16(samples[:2])), samples[:2], atol=1e-4)
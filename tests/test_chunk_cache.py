@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+
+from chunk_cache import ChunkCache, normalize_text
+
+
+def test_normalize_text():
+    assert normalize_text("  Hello \n\t world ") == "Hello world"
+
+
+def test_key(tmp_path):
+    sample_file = tmp_path / "voice.wav"
+    sample_file.write_bytes(b"voice")
+    cache = ChunkCache(tmp_path / "cache", model_version="stub")
+
+    key = cache.key_for("Hello  world.", str(sample_file), "en", 1.0)
+    assert key == cache.key_for("Hello world.", str(sample_file), "en", 1.0)
+    assert key != cache.key_for("Hello world.", str(sample_file), "en", 1.1)
+    assert key != ChunkCache(tmp_path / "cache", model_version="xtts").key_for(
+        "Hello world.", str(sample_file), "en", 1.0)
+
+
+def test_put_and_get(tmp_path):
+    cache = ChunkCache(tmp_path)
+    assert cache.get("ab" * 32) is None
+
+    cache.put("ab" * 32, np.full(100, 0.5, dtype=np.float32), 24000)
+    samples, sample_rate = cache.get("ab" * 32)
+    assert sample_rate == 24000 and samples.size == 100
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_rewrite_is_counted_once(tmp_path):
+    cache = ChunkCache(tmp_path)
+    cache.put("ab" * 32, np.zeros(100, dtype=np.int16), 24000)
+    size = cache.total_bytes
+    cache.put("ab" * 32, np.zeros(100, dtype=np.int16), 24000)
+    assert cache.total_bytes == size
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ChunkCache(tmp_path, max_bytes=2500)
+    for i, key in enumerate(("aa" * 32, "bb" * 32)):
+        cache.put(key, np.zeros(500, dtype=np.int16), 24000)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+
+    cache.put("cc" * 32, np.zeros(500, dtype=np.int16), 24000)
+    assert cache.get("aa" * 32) is None
+    assert cache.get("cc" * 32) is not None
+    assert cache.total_bytes <= 2500 * 0.9
@@ -0,0 +1,42 @@
+import socket
+
+import numpy as np
+import pytest
+
+from ipc import send_message, recv_message, pcm_header, decode_pcm
+
+
+def test_message_with_pcm_payload():
+    left, right = socket.socketpair()
+    with left, right:
+        samples = np.linspace(-1.0, 1.0, 1000, dtype=np.float32)
+        send_message(left, {"op": "audio", **pcm_header(samples, 24000)}, samples)
+        header, payload = recv_message(right)
+
+    assert header["op"] == "audio" and header["payload_bytes"] == samples.nbytes
+    decoded, sample_rate = decode_pcm(header, payload)
+    assert sample_rate == 24000
+    assert np.array_equal(decoded, samples)
+
+
+def test_message_without_payload():
+    left, right = socket.socketpair()
+    with left, right:
+        send_message(left, {"op": "ping"})
+        assert recv_message(right) == ({"op": "ping", "payload_bytes": 0}, bytearray())
+
+
+def test_closed_connection():
+    left, right = socket.socketpair()
+    with right:
+        left.sendall(b"\x00\x00")
+        left.close()
+        with pytest.raises(ConnectionError):
+            recv_message(right)
+
+
+def test_invalid_pcm():
+    with pytest.raises(ValueError):
+        decode_pcm({"dtype": "float64", "sample_rate": 24000}, b"")
+    with pytest.raises(ValueError):
+        decode_pcm({"dtype": "int16", "sample_rate": 24000, "num_samples": 3}, b"\x00\x00")
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from job_store import JobStore, JobLocked, job_key
+
+
+def test_job_key():
+    key = job_key("text", "voice:anna", "en", 1.0, 250, "out.wav")
+    assert key == job_key("text", "voice:anna", "en", 1, 250, "out.wav")
+    assert key != job_key("text", "voice:anna", "en", 1.0, 250, "other.wav")
+    assert key != job_key("text", "voice:anna", "en", 1.0, 250, "out.wav", stable=True)
+    assert key != job_key("text", "voice:anna", "fr", 1.0, 250, "out.wav")
+
+
+def test_resume(tmp_path):
+    store = JobStore(tmp_path, "job", ["One.", "Two."])
+    store.save_part(1, np.full(10, 0.5, dtype=np.float32), 24000)
+    store.close()
+
+    store = JobStore(tmp_path, "job", ["One.", "Two."])
+    parts = store.load_parts()
+    assert list(parts) == [1]
+    samples, sample_rate = parts[1]
+    assert sample_rate == 24000 and samples.dtype == np.int16 and samples.size == 10
+
+    store.remove()
+    assert not (tmp_path / "job").exists()
+
+
+def test_changed_chunks_start_over(tmp_path):
+    store = JobStore(tmp_path, "job", ["One.", "Two."])
+    store.save_part(1, np.zeros(10, dtype=np.int16), 24000)
+    store.close()
+
+    store = JobStore(tmp_path, "job", ["One.", "Three."])
+    assert store.load_parts() == {}
+    assert not list((tmp_path / "job").glob("part_*"))
+    store.close()
+
+
+def test_truncated_manifest_line(tmp_path):
+    store = JobStore(tmp_path, "job", ["One.", "Two."])
+    store.save_part(1, np.zeros(10, dtype=np.int16), 24000)
+    store.close()
+    with open(tmp_path / "job" / "manifest.jsonl", 'a') as f:
+        f.write('{"id": 2, "samp')
+
+    store = JobStore(tmp_path, "job", ["One.", "Two."])
+    assert list(store.completed) == [1]
+    store.close()
+
+
+def test_job_is_locked_while_running(tmp_path):
+    store = JobStore(tmp_path, "job", ["One."])
+    with pytest.raises(JobLocked):
+        JobStore(tmp_path, "job", ["One."])
+    store.close()
+    JobStore(tmp_path, "job", ["One."]).close()
@@ -0,0 +1,78 @@
+"""
+End-to-end renders on a worker running the stub backend (no model needed).
+"""
+import json
+import os
+import re
+import shutil
+import wave
+
+import pytest
+
+import make_audio
+from worker_client import XttsWorker
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "female.wav")
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+
+@pytest.fixture
+def stub_worker(tmp_path, monkeypatch):
+    database_file = tmp_path / "database.json"
+    database_file.write_text(json.dumps({
+        "backend": "stub",
+        "stub_rtf": 0.01,
+        "chunk_cache_mb": 0,
+        "jobs_dir": str(tmp_path / "jobs"),
+        "scheduler": {"cost_model": None},
+    }))
+    worker = XttsWorker(str(tmp_path), socket_path=str(tmp_path / "worker.sock"), backend="stub", stub_rtf=0.01)
+
+    monkeypatch.setattr(make_audio, "DATABASE_FILE", str(database_file))
+    monkeypatch.setattr(make_audio, "_WORKER", worker)
+    monkeypatch.setattr(make_audio, "_SCHEDULER", None)
+    monkeypatch.setattr(make_audio, "_CHUNK_CACHE", None)
+    monkeypatch.setattr(make_audio, "_VOICE_BANK", None)
+    yield tmp_path
+    worker.shutdown()
+
+
+def paragraphs(count):
+    return "\n\n".join(
+        f"Paragraph {i} starts here. It has a second sentence about topic number {i}. "
+        f"And a third one, a little longer, so that the paragraph fills a chunk of its own."
+        for i in range(count)
+    )
+
+
+def wav_seconds(path):
+    with wave.open(str(path), 'rb') as f:
+        return f.getnframes() / f.getframerate()
+
+
+def test_render_to_wav(stub_worker):
+    output_file = stub_worker / "out.wav"
+    assert make_audio.make_audio(paragraphs(3), str(output_file), SAMPLE_FILE)
+
+    assert wav_seconds(output_file) > 5
+    # Normal renders leave no manifest, and the finished job is removed
+    assert not os.path.exists(f"{output_file}.manifest.json")
+    assert os.listdir(stub_worker / "jobs") == []
+
+
+def test_incremental_render_reuses_unchanged_chunks(stub_worker, capsys):
+    output_file = stub_worker / "out.wav"
+    text = paragraphs(12)
+    assert make_audio.make_audio(text, str(output_file), SAMPLE_FILE, incremental=True)
+    assert os.path.exists(f"{output_file}.manifest.json")
+    first = wav_seconds(output_file)
+    capsys.readouterr()
+
+    edited = text + " One more sentence at the very end."
+    assert make_audio.make_audio(edited, str(output_file), SAMPLE_FILE, incremental=True)
+    out = capsys.readouterr().out
+    assert "Reusing" in out
+    reused, generated = map(int, re.search(r"(\d+) chunk\(s\) reused, (\d+) generated", out).groups())
+    assert reused > generated >= 1
+    assert wav_seconds(output_file) > first
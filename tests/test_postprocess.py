@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from postprocess import PostProcessor, process, trim_silence, normalize_loudness, _frame_db
+
+SAMPLE_RATE = 24000
+
+
+def tone(seconds, level=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    return (level * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+
+
+def test_trim_silence_keeps_the_padding():
+    silence = np.zeros(SAMPLE_RATE // 2, dtype=np.float32)
+    samples = np.concatenate([silence, tone(1.0), silence])
+    trimmed = trim_silence(samples, SAMPLE_RATE, pad_ms=30)
+    assert trimmed.size == pytest.approx(SAMPLE_RATE * 1.06, abs=SAMPLE_RATE * 0.02)
+
+
+def test_normalize_loudness_reaches_the_target():
+    normalized = normalize_loudness(tone(1.0, level=0.05), SAMPLE_RATE, target_db=-20.0)
+    level = 10 * np.log10(np.mean(10 ** (_frame_db(normalized, SAMPLE_RATE // 20) / 10)))
+    assert level == pytest.approx(-20.0, abs=0.5)
+
+
+def test_normalize_loudness_respects_the_peak():
+    normalized = normalize_loudness(tone(1.0, level=0.5), SAMPLE_RATE, target_db=0.0, peak_db=-1.0)
+    assert np.abs(normalized).max() <= 10 ** (-1.0 / 20) + 1e-4
+
+
+def test_all_steps_off_by_default():
+    samples = (tone(0.5) * 32767).astype(np.int16)
+    processed = process(samples, SAMPLE_RATE)
+    assert processed.dtype == np.float32
+    assert np.allclose(processed, samples / 32768.0)
+
+
+def test_postprocessor_passes_chunks_through():
+    received = []
+    with PostProcessor(callback=lambda *args: received.append(args[0])) as processor:
+        assert not processor.enabled
+        processor.submit(1, tone(0.1), SAMPLE_RATE)
+        results = processor.results()
+    assert received == [1]
+    assert results[1][1] == SAMPLE_RATE
+
+
+def test_postprocessor_runs_enabled_steps():
+    received = []
+    silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    with PostProcessor({"trim": True}, callback=lambda *args: received.append(args[0])) as processor:
+        processor.submit(1, np.concatenate([silence, tone(0.5)]), SAMPLE_RATE)
+        processor.submit(2, tone(0.5), SAMPLE_RATE)
+        results = processor.results()
+    assert sorted(received) == [1, 2]
+    assert results[1][0].size < SAMPLE_RATE
@@ -0,0 +1,35 @@
+from render_manifest import load_manifest, save_manifest, remove_manifest, manifest_path, plan_reuse
+
+SETTINGS = {"voice": "abc", "language": "en", "speed": 1.0}
+
+
+def test_manifest_round_trip(tmp_path):
+    output_file = str(tmp_path / "out.wav")
+    open(output_file, 'wb').close()
+    save_manifest(output_file, SETTINGS, ["One.", "Two."], {1: 100, 2: 50}, 1000, pause_ms=10)
+
+    manifest = load_manifest(output_file, SETTINGS)
+    assert [(c["start"], c["samples"]) for c in manifest["chunks"]] == [(0, 100), (110, 50)]
+    assert load_manifest(output_file, {**SETTINGS, "speed": 1.2}) is None
+
+    remove_manifest(output_file)
+    assert load_manifest(output_file, SETTINGS) is None
+
+
+def test_manifest_of_a_missing_output(tmp_path):
+    output_file = str(tmp_path / "out.wav")
+    save_manifest(output_file, SETTINGS, ["One."], {1: 100}, 1000, pause_ms=0)
+    assert (tmp_path / "out.wav.manifest.json").exists()
+    assert manifest_path(output_file).endswith(".manifest.json")
+    assert load_manifest(output_file, SETTINGS) is None
+
+
+def test_plan_reuse(tmp_path):
+    output_file = str(tmp_path / "out.wav")
+    open(output_file, 'wb').close()
+    save_manifest(output_file, SETTINGS, ["A.", "B.", "A.", "C."], {1: 10, 2: 20, 3: 30, 4: 40}, 1000, pause_ms=0)
+    manifest = load_manifest(output_file, SETTINGS)
+
+    reuse = plan_reuse(manifest, ["A.", "New.", "C.", "A."])
+    # Repeated chunks take the copies in order
+    assert reuse == {1: (0, 10), 3: (60, 40), 4: (30, 30)}
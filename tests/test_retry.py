@@ -0,0 +1,36 @@
+from core import error_response
+from retry import is_transient, permanent_errors, backoff_delay
+from worker_client import WorkerError
+
+
+def test_transient_errors():
+    assert is_transient(TimeoutError("Worker request timed out"))
+    assert is_transient(ConnectionResetError())
+    assert is_transient(MemoryError())
+    assert is_transient(WorkerError("Worker failed mid-request: Connection closed by peer", transient=True))
+    assert is_transient(WorkerError.from_response({"status": "error", "error": "CUDA out of memory", "transient": True}))
+
+
+def test_permanent_errors():
+    assert not is_transient(FileNotFoundError("female.wav"))
+    assert not is_transient(ValueError("Unsupported language: xx"))
+    # Only the flag counts, never the wording of the message
+    assert not is_transient(WorkerError("Connection to the database timed out"))
+    assert not is_transient(WorkerError.from_response({"status": "error", "error": "Voice not found: x.wav"}))
+    assert not is_transient("out of memory")
+
+
+def test_permanent_errors_of_a_batch():
+    errors = {1: TimeoutError(), 2: ValueError("bad input"), 4: ValueError("not pending")}
+    assert permanent_errors([1, 2, 3], errors) == {2: errors[2]}
+
+
+def test_backoff_delay():
+    assert 0.4 <= backoff_delay(1) <= 0.6
+    assert 1.6 <= backoff_delay(3) <= 2.4
+    assert backoff_delay(20, max_delay=30.0) <= 36.0
+
+
+def test_worker_error_responses():
+    assert error_response(MemoryError())["transient"]
+    assert not error_response(ValueError("bad input"))["transient"]
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import CostModel, Scheduler
+
+
+def test_cost_model_calibrates():
+    model = CostModel()
+    for chars in range(20, 220, 10):
+        audio_seconds = chars / 12.0
+        model.observe(chars, "en", 1.0, 0.1 + 0.5 * audio_seconds, audio_seconds)
+
+    rtf, overhead = model.parameters()
+    assert rtf == pytest.approx(0.5, rel=1e-3)
+    assert overhead == pytest.approx(0.1, abs=1e-3)
+    assert model.audio_seconds(120, "en") == pytest.approx(10.0)
+    assert model.estimate(["x" * 120] * 2, "en") == pytest.approx(2 * (0.1 + 0.5 * 10.0), rel=1e-3)
+
+
+def test_cost_model_is_saved(tmp_path):
+    path = tmp_path / "cost_model.json"
+    model = CostModel(str(path), profile="stub/1")
+    model.observe(150, "en", 1.0, 2.0, 10.0)
+    model.save()
+    assert CostModel(str(path), profile="stub/1").rates == model.rates
+    assert CostModel(str(path), profile="other").rates == {}
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        Scheduler(policy="random")
+
+
+def test_slices_follow_slice_seconds():
+    scheduler = Scheduler(slots=1, slice_seconds=10.0, cost_model=CostModel())
+    # 0.2s overhead + 1.0 * 60/15 = 4.2s per chunk
+    ticket = scheduler.open({i: "x" * 60 for i in range(1, 6)}, "en")
+
+    assert scheduler.acquire(ticket) == [1, 2]
+    scheduler.release(ticket)
+    assert scheduler.acquire(ticket) == [3, 4]
+    scheduler.release(ticket)
+    scheduler.close(ticket)
+    assert scheduler.acquire(ticket) == []
+    assert scheduler.stats()["requests"] == 0
+
+
+def run_order(policy):
+    """
+    Holds the only slot, queues a long and then a short request, and
+    returns the order in which they get the slot.
+    """
+    scheduler = Scheduler(slots=1, policy=policy, slice_seconds=1000.0, aging=0.0, cost_model=CostModel())
+    holder = scheduler.open({1: "x"}, "en")
+    assert scheduler.acquire(holder) == [1]
+
+    order = []
+    long_ticket = scheduler.open({1: "x" * 3000}, "en")
+    short_ticket = scheduler.open({1: "x" * 30}, "en")
+
+    def run(name, ticket):
+        if scheduler.acquire(ticket):
+            order.append(name)
+            scheduler.release(ticket)
+
+    threads = [threading.Thread(target=run, args=("long", long_ticket))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=run, args=("short", short_ticket)))
+    threads[1].start()
+    time.sleep(0.05)
+
+    scheduler.release(holder)
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+
+def test_sjf_runs_the_short_request_first():
+    assert run_order("sjf") == ["short", "long"]
+
+
+def test_fifo_keeps_arrival_order():
+    assert run_order("fifo") == ["long", "short"]
+
+
+def test_queue_priority():
+    sjf = Scheduler(policy="sjf", aging=0.5, cost_model=CostModel())
+    assert sjf.queue_priority(10.0) < sjf.queue_priority(20.0)
+    assert sjf.queue_priority(20.0, weight=2.0) == sjf.queue_priority(10.0)
+    assert sjf.queue_priority(20.0, waited=20.0) == sjf.queue_priority(10.0)
+    assert Scheduler(policy="fair", cost_model=CostModel()).queue_priority(20.0) == 0.0
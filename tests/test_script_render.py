@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+import make_audio
+import script_render
+from job_store import JobStore
+from script_render import parse_script, script_key, render_script
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+@voice narrator = male.wav
+@voice alice = female.wav language=pt speed=1.1
+
+narrator: It was a cold morning when Alice came in.
+alice: Bom dia! Tudo bem?
+[pause 800]
+narrator: Nobody answered.
+"""
+
+
+def test_parse_script():
+    lines = parse_script(SCRIPT, ROOT)
+    assert [line["voice"] for line in lines] == ["narrator", "alice", "narrator"]
+    assert lines[1]["language"] == "pt" and lines[1]["speed"] == 1.1
+    assert lines[2]["pause_ms"] == 800
+
+
+def test_script_key_covers_the_output():
+    lines = parse_script(SCRIPT, ROOT)
+    key = script_key(lines, 250, "podcast.wav")
+    assert key == script_key(lines, 250, os.path.abspath("podcast.wav"))
+    assert key != script_key(lines, 250, "other.wav")
+    assert key != script_key(lines, 200, "podcast.wav")
+
+
+def test_failed_render_releases_the_job(tmp_path, monkeypatch):
+    database_file = tmp_path / "database.json"
+    database_file.write_text(json.dumps({"jobs_dir": str(tmp_path / "jobs")}))
+    monkeypatch.setattr(make_audio, "DATABASE_FILE", str(database_file))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("worker exploded")
+
+    monkeypatch.setattr(script_render, "generate_with_retry", fail)
+    lines = parse_script(SCRIPT, ROOT)
+    output_file = str(tmp_path / "podcast.wav")
+    with pytest.raises(RuntimeError):
+        render_script(lines, output_file)
+
+    # The job directory is unlocked: a later render can use it
+    chunks, _ = script_render.schedule(lines, 2000)
+    JobStore(tmp_path / "jobs", script_key(lines, 2000, output_file), [text for _, text in chunks]).close()
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from text_splitter import split_text, char_limit, XTTS_CHAR_LIMITS
+
+
+def sample_text(sentences=120, seed=1):
+    rng = random.Random(seed)
+    words = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(5, 25))).capitalize() + "."
+            for _ in range(sentences)]
+
+
+def test_chunks_keep_the_text_and_the_language_limit():
+    text = " ".join(sample_text())
+    chunks = split_text(text, "en")
+    assert " ".join(chunks) == text
+    assert max(len(chunk) for chunk in chunks) <= XTTS_CHAR_LIMITS["en"]
+
+
+def test_max_chars_only_lowers_the_limit():
+    text = " ".join(sample_text())
+    assert max(len(chunk) for chunk in split_text(text, "en", max_chars=100)) <= 100
+    assert max(len(chunk) for chunk in split_text(text, "en", max_chars=5000)) <= char_limit("en")
+
+
+def test_language_limit():
+    assert char_limit("zh-cn") == XTTS_CHAR_LIMITS["zh"]
+    assert char_limit("xx") == 250
+
+
+def test_empty_text():
+    assert split_text("", "en") == []
+    assert split_text(None, "en") == []
+
+
+def test_overlong_sentence_is_broken_up():
+    text = ", ".join(["word " * 10] * 20) + "."
+    chunks = split_text(text, "en")
+    assert len(chunks) > 1
+    assert max(len(chunk) for chunk in chunks) <= char_limit("en")
+
+
+def test_stable_chunks_survive_a_local_edit():
+    sentences = sample_text()
+    edited = sentences[:10] + ["An inserted sentence that was not there before."] + sentences[10:]
+    before = split_text(" ".join(sentences), "en", stable=True)
+    after = split_text(" ".join(edited), "en", stable=True)
+
+    assert " ".join(before) == " ".join(sentences)
+    assert max(len(chunk) for chunk in before) <= char_limit("en")
+    # Only the chunks around the edit change
+    assert len(set(before) - set(after)) <= 3
+
+
+def test_stable_chunking_merges_short_paragraphs():
+    text = "\n\n".join(["Hello there."] * 30)
+    assert len(split_text(text, "en", stable=True)) < 30
+
+
+def test_invalid_max_chars():
+    for max_chars in (0, -5):
+        with pytest.raises(ValueError):
+            split_text("Some text.", "en", max_chars=max_chars)
@@ -0,0 +1,269 @@
+import math
+import re
+import zlib
+
+# Per-language character limits of the XTTS-v2 tokenizer: longer inputs
+# trigger a warning and get truncated or split again inside the model.
+XTTS_CHAR_LIMITS = {
+    "en": 250, "de": 253, "fr": 273, "es": 239, "it": 213, "pt": 203,
+    "pl": 224, "tr": 226, "ru": 182, "nl": 251, "cs": 186, "ar": 166,
+    "zh": 82, "ja": 71, "hu": 224, "ko": 95, "hi": 150,
+}
+DEFAULT_CHAR_LIMIT = 250
+# The XTTS GPT accepts at most 402 text tokens (including start/stop tokens)
+XTTS_MAX_TOKENS = 400
+
+# Sentence ends: terminal punctuation (plus closing quotes/brackets) followed
+# by whitespace, CJK full stops (no whitespace needed) and paragraph breaks
+SENTENCE_END = re.compile(r'[.!?…]+["\'”’)\]]*(?=\s|$)|[。！？]+["\'”’」』)\]]*|\n\s*\n')
+# Clause ends, used to break sentences that are too long on their own
+CLAUSE_END = re.compile(r'[,;:]["\'”’)\]]*(?=\s|$)|[，；：、]|\s[—–-]\s')
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+# Stable chunking: on average one sentence in ANCHOR_EVERY ends a segment,
+# and segments shorter than MIN_SEGMENT chunk limits run on into the next one
+ANCHOR_EVERY = 4
+MIN_SEGMENT = 1.5
+
+
+def char_limit(language):
+    """
+    Returns the XTTS character limit for a language code (e.g. "en", "zh-cn").
+    """
+    return XTTS_CHAR_LIMITS.get(language.lower().split("-")[0], DEFAULT_CHAR_LIMIT)
+
+
+def split_on(pattern, text):
+    """
+    Splits text after each match of pattern, keeping the delimiters.
+    """
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        piece = text[start:match.end()].strip()
+        if piece:
+            pieces.append(piece)
+        start = match.end()
+
+    tail = text[start:].strip()
+    if tail:
+        pieces.append(tail)
+    return pieces
+
+
+def split_sentences(text):
+    """
+    Splits text into sentences (single pass over the text).
+    """
+    return split_on(SENTENCE_END, text)
+
+
+def is_anchor(sentence, every=ANCHOR_EVERY):
+    """
+    Tells whether a sentence ends a segment in stable chunking. Decided by
+    the sentence's own content (a checksum, the same in every process), so
+    an edit elsewhere in the text never moves it.
+    """
+    return zlib.crc32(sentence.encode("utf-8")) % every == 0
+
+
+def break_unit(unit, fits, max_chars):
+    """
+    Breaks a sentence that does not fit on its own at clause boundaries,
+    then at spaces, and as a last resort every max_chars characters.
+
+    Returns:
+        list: Pieces that each fit.
+    """
+    for splitter in (lambda t: split_on(CLAUSE_END, t), str.split):
+        pieces = splitter(unit)
+        if len(pieces) > 1:
+            result = []
+            for piece in pack(pieces, fits):
+                result.extend([piece] if fits(piece) else break_unit(piece, fits, max_chars))
+            return result
+
+    return [unit[i:i + max_chars] for i in range(0, len(unit), max_chars)]
+
+
+def join(left, right):
+    """
+    Joins two pieces of text, without a space between CJK characters.
+    """
+    if not left:
+        return right
+    if left[-1] >= "\u2e80" and right[0] >= "\u2e80":
+        return left + right
+    return f"{left} {right}"
+
+
+def pack(units, fits):
+    """
+    Greedily joins consecutive units while the result still fits.
+    """
+    chunks = []
+    current = ""
+    for unit in units:
+        candidate = join(current, unit)
+        if current and not fits(candidate):
+            chunks.append(current)
+            current = unit
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def balance(units, chunks, fits):
+    """
+    Repacks the units into the same number of chunks with sizes as even as
+    possible, so parallel workers finish at similar times (greedy packing
+    leaves a short last chunk).
+    """
+    count = len(chunks)
+    if count < 2:
+        return chunks
+
+    total = sum(len(unit) for unit in units) + len(units) - 1
+    target = math.ceil(total / count)
+    longest = max(len(chunk) for chunk in chunks)
+
+    while target < longest:
+        balanced = pack(units, lambda text: len(text) <= target and fits(text))
+        if len(balanced) <= count:
+            return balanced
+        target = min(longest, math.ceil(target * 1.05) + 1)
+
+    return chunks
+
+
+def split_text(text, language="en", max_chars=None, token_len=None,
+               max_tokens=XTTS_MAX_TOKENS, balanced=True, stable=False):
+    """
+    Splits text into chunks the model can synthesize in one call.
+
+    Chunks end at sentence boundaries when possible (clause, then word
+    boundaries for overlong sentences), respect the XTTS limits of the
+    language and, with balanced=True, have similar sizes.
+
+    With stable=True, chunk boundaries are content-defined: the text is cut
+    into segments at paragraph breaks and after "anchor" sentences (see
+    is_anchor), and each segment is chunked on its own. A boundary only
+    ends a segment once it holds MIN_SEGMENT times the character limit, so
+    short paragraphs and sentences don't end up as chunks of their own.
+    Editing a sentence then only changes the chunks of its segment (and
+    usually the next one if it becomes or stops being a boundary), and
+    every other chunk keeps the exact same text, so a re-render can reuse
+    its audio. Chunks are balanced within each segment only, which gives a
+    few more chunks than the default.
+
+    Args:
+        text: Text to split.
+        language: Language code, selects the XTTS character limit.
+        max_chars: Optional lower character limit (None for the XTTS limit
+            alone). It can only lower the XTTS limit of the language, never
+            raise it: max_chars=2000 still gives chunks of at most 250
+            characters in English.
+        token_len: Optional callable(text) -> number of model tokens
+            (e.g. the XTTS tokenizer); chunks then also stay under max_tokens.
+        max_tokens: Token limit used with token_len.
+        balanced: Even out chunk sizes.
+        stable: Content-defined boundaries that stay put under local edits.
+
+    Returns:
+        list: Text chunks.
+
+    Raises:
+        ValueError: If max_chars is lower than 1.
+    """
+    if max_chars is not None and max_chars < 1:
+        raise ValueError(f"max_chars must be at least 1, got {max_chars}")
+    if not text or not isinstance(text, str):
+        return []
+
+    limit = char_limit(language)
+    if max_chars is not None:
+        limit = min(limit, max_chars)
+
+    def fits(chunk):
+        if len(chunk) > limit:
+            return False
+        return token_len is None or token_len(chunk) <= max_tokens
+
+    def chunk(sentences):
+        units = []
+        for sentence in sentences:
+            # Newlines inside a sentence are just formatting
+            sentence = " ".join(sentence.split())
+            units.extend([sentence] if fits(sentence) else break_unit(sentence, fits, limit))
+        chunks = pack(units, fits)
+        return balance(units, chunks, fits) if balanced else chunks
+
+    if not stable:
+        return chunk(split_sentences(text))
+
+    chunks = []
+    segment = []
+    size = 0
+    min_size = limit * MIN_SEGMENT
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        sentences = split_sentences(paragraph)
+        for i, sentence in enumerate(sentences):
+            segment.append(sentence)
+            size += len(sentence) + 1
+            boundary = i == len(sentences) - 1 or is_anchor(" ".join(sentence.split()))
+            if boundary and size >= min_size:
+                chunks.extend(chunk(segment))
+                segment = []
+                size = 0
+    chunks.extend(chunk(segment))
+    return chunks
+
+
+def iter_text_chunks(stream, language="en", max_chars=None, token_len=None,
+                     max_tokens=XTTS_MAX_TOKENS, read_size=64 * 1024):
+    """
+    Chunks text read lazily from a file-like object (or any iterable of
+    strings), so arbitrarily long inputs are processed in constant memory.
+
+    The text is buffered up to a window of about read_size characters and
+    cut after the last complete sentence in it; the rest is carried over
+    to the next window. Chunks are the same as split_text would produce,
+    except that sizes are balanced per window.
+
+    Yields:
+        str: Text chunks, in order.
+    """
+    if hasattr(stream, "read"):
+        blocks = iter(lambda: stream.read(read_size), "")
+    else:
+        blocks = iter(stream)
+
+    buffer = ""
+    for block in blocks:
+        buffer += block
+        if len(buffer) < read_size:
+            continue
+
+        cut = last_boundary(buffer)
+        yield from split_text(buffer[:cut], language, max_chars, token_len, max_tokens)
+        buffer = buffer[cut:]
+
+    yield from split_text(buffer, language, max_chars, token_len, max_tokens)
+
+
+def last_boundary(text):
+    """
+    Returns the position after the last sentence end of text, falling back
+    to the last whitespace and finally the end of the text. A sentence end
+    at the very end does not count: the next block may continue it.
+    """
+    cut = 0
+    for match in SENTENCE_END.finditer(text):
+        if match.end() < len(text):
+            cut = match.end()
+    if cut:
+        return cut
+
+    space = max(text.rfind(" "), text.rfind("\n"))
+    return space + 1 if space > 0 else len(text)
@@ -0,0 +1,263 @@
+"""
+Prebuilt voice bank: the conditioning latents of many voices in two
+memory-mapped arrays plus a name index.
+
+Layout of a bank directory:
+    index.json               {"model_version", "voices": {name: {"row", "source", "sha256"}}}
+    gpt_cond_latents.npy     float32 (voices, 32, 1024)
+    speaker_embeddings.npy   float32 (voices, 512, 1)
+
+Workers open the arrays with mmap, so every worker on the host shares the
+same pages through the OS page cache, and no worker loads the pickled
+speakers_xtts.pth or recomputes a custom voice from its audio.
+
+A voice of the bank is selected with "voice:<name>" wherever a voice sample
+file is expected (make_audio, the CLI, the HTTP server, scripts).
+
+Usage:
+    python voice_bank.py build ~/.cache/xtts-local-api/voices.bank \
+        --folder_xtts ~/xtts-webui-v1_0-portable/webui --voices ~/voices
+    python voice_bank.py list ~/.cache/xtts-local-api/voices.bank
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+DEFAULT_VOICE_BANK = os.path.expanduser("~/.cache/xtts-local-api/voices.bank")
+VOICE_PREFIX = "voice:"
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+
+
+def voice_name(sample_file):
+    """
+    Returns the bank voice name of a "voice:<name>" sample, None for a file.
+    """
+    if isinstance(sample_file, str) and sample_file.startswith(VOICE_PREFIX):
+        return sample_file[len(VOICE_PREFIX):].strip()
+    return None
+
+
+def sample_id(sample_file):
+    """
+    Identifies a voice sample in cache and job keys: the absolute path of a
+    file, or the "voice:<name>" reference itself.
+    """
+    if voice_name(sample_file) is not None:
+        return sample_file
+    return os.path.abspath(os.path.expanduser(sample_file))
+
+
+class VoiceBank:
+    """
+    Read-only view of a bank directory (see build_voice_bank).
+    """
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        with open(os.path.join(self.path, "index.json"), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.voices = self.index["voices"]
+        self.model_version = self.index.get("model_version", "")
+        self.gpt_cond_latents = np.load(os.path.join(self.path, "gpt_cond_latents.npy"), mmap_mode="r")
+        self.speaker_embeddings = np.load(os.path.join(self.path, "speaker_embeddings.npy"), mmap_mode="r")
+
+    def __contains__(self, name):
+        return name in self.voices
+
+    def __len__(self):
+        return len(self.voices)
+
+    def names(self):
+        return sorted(self.voices)
+
+    def voice_hash(self, name):
+        """
+        Content hash of a voice's latents (for cache keys).
+        """
+        return self.voices[name]["sha256"]
+
+    def get(self, name):
+        """
+        Returns (gpt_cond_latent, speaker_embedding) of a voice as float32
+        arrays with the leading batch dimension of the model latents.
+
+        Raises:
+            KeyError: Unknown voice.
+        """
+        row = self.voices[name]["row"]
+        # Copies of one row: the rest of the file stays in the page cache
+        return (np.array(self.gpt_cond_latents[row][None]),
+                np.array(self.speaker_embeddings[row][None]))
+
+
+def latents_hash(gpt_cond_latent, speaker_embedding):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(gpt_cond_latent, dtype=np.float32).tobytes())
+    digest.update(np.ascontiguousarray(speaker_embedding, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def as_array(latent):
+    """
+    Converts a latent (torch tensor or array) to float32 without its
+    leading batch dimension.
+    """
+    if hasattr(latent, "detach"):
+        latent = latent.detach().float().cpu().numpy()
+    latent = np.asarray(latent, dtype=np.float32)
+    return latent.reshape(latent.shape[-2:])
+
+
+def load_builtin_speakers(speaker_file):
+    """
+    Reads the built-in speakers of the model (speakers_xtts.pth).
+
+    Returns:
+        dict: {name: (gpt_cond_latent, speaker_embedding)} as float32 arrays.
+    """
+    import torch
+
+    speakers = torch.load(speaker_file, map_location="cpu")
+    return {
+        name: (as_array(entry["gpt_cond_latent"]), as_array(entry["speaker_embedding"]))
+        for name, entry in speakers.items()
+    }
+
+
+def build_voice_bank(output_dir, voices, model_version=""):
+    """
+    Writes a bank directory, replacing an existing one atomically.
+
+    Args:
+        output_dir: Bank directory.
+        voices: Dict {name: (gpt_cond_latent, speaker_embedding, source)}.
+        model_version: Model the latents were computed with.
+
+    Returns:
+        int: Number of voices written.
+
+    Raises:
+        ValueError: If the voices do not all have the same latent shapes.
+    """
+    output_dir = os.path.expanduser(output_dir)
+    names = sorted(voices)
+    if not names:
+        raise ValueError("No voices to write")
+
+    gpt_latents = [as_array(voices[name][0]) for name in names]
+    speaker_embeddings = [as_array(voices[name][1]) for name in names]
+    for name, gpt, spk in zip(names, gpt_latents, speaker_embeddings):
+        if gpt.shape != gpt_latents[0].shape or spk.shape != speaker_embeddings[0].shape:
+            raise ValueError(f"Voice {name!r} has latents of shape {gpt.shape}/{spk.shape}, "
+                             f"expected {gpt_latents[0].shape}/{speaker_embeddings[0].shape}")
+
+    index = {
+        "format": 1,
+        "model_version": model_version,
+        "voices": {
+            name: {"row": row, "source": voices[name][2], "sha256": latents_hash(gpt, spk)}
+            for row, (name, gpt, spk) in enumerate(zip(names, gpt_latents, speaker_embeddings))
+        },
+    }
+
+    tmp_dir = f"{output_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        np.save(os.path.join(tmp_dir, "gpt_cond_latents.npy"), np.stack(gpt_latents))
+        np.save(os.path.join(tmp_dir, "speaker_embeddings.npy"), np.stack(speaker_embeddings))
+        with open(os.path.join(tmp_dir, "index.json"), 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=4, ensure_ascii=False)
+
+        # Workers that already mapped the old files keep reading them until
+        # they restart: the old directory is renamed away, not overwritten
+        old_dir = f"{output_dir}.old-{os.getpid()}"
+        if os.path.exists(output_dir):
+            os.rename(output_dir, old_dir)
+        os.rename(tmp_dir, output_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return len(names)
+
+
+def build_from_model(output_dir, backend, speaker_file=None, voices_dir=None, model_version=""):
+    """
+    Collects the built-in speakers and the voice samples of a folder (named
+    after their file) and writes them as a bank.
+
+    Args:
+        output_dir: Bank directory.
+        backend: Loaded backend, used to encode the voice samples.
+        speaker_file: speakers_xtts.pth of the model, None to skip the
+            built-in speakers.
+        voices_dir: Folder of voice samples, None to skip.
+        model_version: See build_voice_bank.
+    """
+    voices = {}
+    if speaker_file and os.path.exists(speaker_file):
+        for name, (gpt, spk) in load_builtin_speakers(speaker_file).items():
+            voices[name] = (gpt, spk, "builtin")
+        print(f"📦 {len(voices)} built-in speakers")
+
+    if voices_dir:
+        files = sorted(path for path in glob.glob(os.path.join(os.path.expanduser(voices_dir), "*"))
+                       if path.lower().endswith(AUDIO_EXTENSIONS))
+        for path in files:
+            name = os.path.splitext(os.path.basename(path))[0]
+            try:
+                gpt, spk = backend.get_conditioning_latents(path)
+            except Exception as e:
+                print(f"❌ {name}: {e}")
+                continue
+            voices[name] = (gpt, spk, os.path.abspath(path))
+            print(f"   ✅ {name}")
+
+    return build_voice_bank(output_dir, voices, model_version)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or list a memory-mapped voice bank")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Precompute a voice bank")
+    build.add_argument("output", nargs="?", default=DEFAULT_VOICE_BANK,
+                       help=f"Bank directory (default: {DEFAULT_VOICE_BANK})")
+    build.add_argument("--folder_xtts", default="", help="Location of the xtts folder")
+    build.add_argument("--voices", help="Folder of voice samples to add (named after the files)")
+    build.add_argument("--no-builtin", action="store_true", help="Skip the built-in speakers of the model")
+    build.add_argument("--backend", default="xtts", help="Backend used to encode the samples (default: xtts)")
+    build.add_argument("--use-cuda", action="store_true", help="Use CUDA GPU if available")
+
+    listing = commands.add_parser("list", help="List the voices of a bank")
+    listing.add_argument("bank", nargs="?", default=DEFAULT_VOICE_BANK, help="Bank directory")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        bank = VoiceBank(args.bank)
+        for name in bank.names():
+            print(f"{name:<30} {bank.voices[name]['source']}")
+        print(f"{len(bank)} voices, model {bank.model_version or '-'}")
+        sys.exit(0)
+
+    # Building needs the model: run with the Python of the XTTS venv
+    import core
+
+    core.BACKEND = args.backend
+    if args.folder_xtts:
+        core.set_xtts_dir(args.folder_xtts)
+    backend = core.load_model(args.use_cuda) if args.voices else None
+    speaker_file = None if args.no_builtin or args.backend != "xtts" else core.SPEAKER_FILE_PATH
+    try:
+        count = build_from_model(args.output, backend, speaker_file, args.voices, core.model_version())
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"🎉 {count} voices written to {args.output}")
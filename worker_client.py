@@ -0,0 +1,658 @@
+import contextlib
+import os
+import queue
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from ipc import DEFAULT_SOCKET_PATH, send_message, recv_message, decode_pcm
+from voice_bank import sample_id
+
+CORE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "core.py")
+
+
+class WorkerError(Exception):
+    """
+    Raised when the worker cannot be reached or reports an error.
+    `transient` is True when retrying may succeed: the worker was lost or
+    did not start in time, or it reported a transient failure (out of
+    memory, timeout, see core.error_response).
+    """
+
+    def __init__(self, message, transient=False):
+        super().__init__(message)
+        self.transient = transient
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(response.get("error", "Unknown worker error"), bool(response.get("transient")))
+
+
+class XttsWorker:
+    """
+    Client for a persistent `core.py --worker` process.
+
+    Attaches to a worker already listening on `socket_path` or starts a new
+    one with the Python interpreter of the XTTS venv. Requests that fail
+    because the worker died or hung trigger an automatic restart.
+
+    With max_jobs, max_rss_mb or max_cuda_mb, the worker recycles itself
+    past that watermark (see core.recycle_worker): a replacement takes over
+    the socket path and this client reconnects to it transparently.
+    """
+
+    def __init__(self, folder_xtts, socket_path=DEFAULT_SOCKET_PATH,
+                 use_cuda=True, startup_timeout=600, request_timeout=300,
+                 threads=None, interop_threads=None, cpu_affinity=None,
+                 backend="xtts", stub_rtf=None, quantize=False, compile_model=False, voice_bank=None,
+                 max_jobs=None, max_rss_mb=None, max_cuda_mb=None, warmup_sample=None):
+        self.folder_xtts = os.path.expanduser(folder_xtts)
+        self.backend = backend
+        self.stub_rtf = stub_rtf
+        # CPU performance mode of the model (see cpu_mode.py)
+        self.quantize = quantize
+        self.compile_model = compile_model
+        self.voice_bank = voice_bank
+        # Lifecycle of the worker process (see core.py, worker lifecycle)
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.max_cuda_mb = max_cuda_mb
+        self.warmup_sample = warmup_sample
+        self.socket_path = socket_path
+        self.use_cuda = use_cuda
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.cpu_affinity = cpu_affinity
+        self.startup_timeout = startup_timeout
+        self.request_timeout = request_timeout
+
+        self.process = None
+        self.pid = None
+        # Whether this client started the worker (or the replacement of one
+        # it started): attached workers are shared and never killed
+        self.owned = False
+        self.sock = None
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """
+        Holds the worker for the duration of a request (same interface as
+        WorkerPool.acquire): the connection serves one request at a time.
+        """
+        with self.lock:
+            yield self
+
+    # --- Connection management ---
+
+    def _connect(self):
+        """
+        Tries to connect to the worker socket.
+
+        Returns:
+            bool: True if connected.
+        """
+        self._disconnect()
+        if not os.path.exists(self.socket_path):
+            return False
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.request_timeout)
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            return False
+
+        self.sock = sock
+        return True
+
+    def _disconnect(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def _spawn(self):
+        """
+        Starts a new worker process in its own session so that it keeps
+        serving other callers after this one exits.
+        """
+        if self.backend == "xtts":
+            python_venv = os.path.join(self.folder_xtts, "venv", "bin", "python3")
+        else:
+            # Other backends do not need the XTTS venv
+            python_venv = sys.executable
+        command = [
+            python_venv,
+            CORE_SCRIPT,
+            '--worker',
+            '--socket',
+            self.socket_path,
+            '-folder_xtts',
+            self.folder_xtts,
+            '--backend',
+            self.backend
+        ]
+        if self.stub_rtf is not None:
+            command += ['--stub-rtf', str(self.stub_rtf)]
+        if self.use_cuda:
+            command.append('--use-cuda')
+        if self.quantize:
+            command.append('--quantize')
+        if self.compile_model:
+            command.append('--compile')
+        if self.voice_bank:
+            command += ['--voice-bank', os.path.expanduser(self.voice_bank)]
+        if self.threads:
+            command += ['--threads', str(self.threads)]
+        if self.interop_threads:
+            command += ['--interop-threads', str(self.interop_threads)]
+        if self.cpu_affinity:
+            command += ['--cpu-affinity', ",".join(map(str, self.cpu_affinity))]
+        if self.max_jobs:
+            command += ['--max-jobs', str(self.max_jobs)]
+        if self.max_rss_mb:
+            command += ['--max-rss-mb', str(self.max_rss_mb)]
+        if self.max_cuda_mb:
+            command += ['--max-cuda-mb', str(self.max_cuda_mb)]
+        if self.warmup_sample is not None:
+            command += ['--warmup-sample', os.path.expanduser(self.warmup_sample)]
+
+        log_name = os.path.splitext(os.path.basename(self.socket_path))[0]
+        log_path = os.path.join(tempfile.gettempdir(), f"{log_name}.log")
+        print(f"🚀 Starting XTTS worker (log: {log_path})")
+
+        self.owned = True
+        with open(log_path, 'ab') as log_file:
+            self.process = subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                cwd=os.path.dirname(CORE_SCRIPT),
+                start_new_session=True
+            )
+
+        # Wait until the model is loaded and the socket answers a ping
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise WorkerError(
+                    f"Worker exited during startup (code {self.process.returncode}), see {log_path}"
+                )
+            if self._connect() and self.ping():
+                return
+            time.sleep(0.5)
+
+        self.kill()
+        raise WorkerError(f"Worker did not become ready within {self.startup_timeout}s", transient=True)
+
+    def ping(self):
+        """
+        Health check: asks the worker for its status.
+
+        Returns:
+            bool: True if the worker answered.
+        """
+        if self.sock is None:
+            return False
+        try:
+            send_message(self.sock, {"op": "ping"})
+            header, _ = recv_message(self.sock)
+        except (OSError, ConnectionError, ValueError):
+            self._disconnect()
+            return False
+
+        if header.get("status") != "ok":
+            return False
+
+        self.pid = header.get("pid")
+        return True
+
+    def ensure_running(self):
+        """
+        Attaches to a healthy worker, starting a new one if needed.
+        """
+        if self.sock is not None:
+            return
+        if self._connect() and self.ping():
+            return
+        self._spawn()
+
+    def recover(self, error=None, attempts=3):
+        """
+        Handles a lost connection. The connection is tried again a few times
+        first: a recycled worker closes its idle connections once its
+        replacement serves the socket path, and a dropped connection to a
+        live worker just needs a new one. If no worker answers (it died), or
+        `error` is a timeout and it hangs, the worker is restarted.
+        """
+        previous_pid = self.pid
+        if not isinstance(error, TimeoutError):
+            for attempt in range(attempts):
+                if self._connect() and self.ping():
+                    if self.pid != previous_pid:
+                        # The process this client started (if any) is draining
+                        self.process = None
+                        print(f"🔁 Reconnected to the replacement worker (pid {self.pid})")
+                    return
+                time.sleep(0.5 * (attempt + 1))
+        self.restart()
+
+    def restart(self):
+        """
+        Kills the current worker (if this client started it) and starts a
+        fresh one. A new worker only replaces a stale socket, so restarting
+        fails if an attached worker still listens on the socket path.
+        """
+        print("🔄 Restarting XTTS worker...")
+        self.kill()
+        self._spawn()
+
+    def kill(self):
+        """
+        Terminates the worker process if this client started it (or it is
+        the replacement of one it started). An attached worker is shared
+        with other clients: the connection is only closed.
+        """
+        self._disconnect()
+
+        if self.owned:
+            if self.process is not None and self.process.poll() is None:
+                self.process.kill()
+                self.process.wait()
+            elif self.pid:
+                try:
+                    os.kill(self.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            if os.path.exists(self.socket_path):
+                try:
+                    os.unlink(self.socket_path)
+                except OSError:
+                    pass
+
+        self.process = None
+        self.pid = None
+        self.owned = False
+
+    def shutdown(self):
+        """
+        Asks the worker to exit gracefully.
+        """
+        for attempt in range(2):
+            if self.sock is None and not self._connect():
+                return
+            try:
+                send_message(self.sock, {"op": "shutdown"})
+                recv_message(self.sock)
+                break
+            except (OSError, ConnectionError):
+                # A draining worker drops the request: send it again to the
+                # worker now on the socket path
+                self._disconnect()
+        self._disconnect()
+        if self.process is not None:
+            self.process.wait(timeout=30)
+            self.process = None
+
+    def metrics(self, reset=False):
+        """
+        Returns the per-stage metrics snapshot of the worker (see metrics.py),
+        or None if no worker is running.
+
+        Uses a connection of its own, so it can be called while another
+        request is in progress.
+        """
+        if not os.path.exists(self.socket_path):
+            return None
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.request_timeout)
+            sock.connect(self.socket_path)
+            send_message(sock, {"op": "metrics", "reset": reset})
+            header, _ = recv_message(sock)
+        except (OSError, ConnectionError, ValueError):
+            return None
+        finally:
+            sock.close()
+
+        if header.get("status") != "ok":
+            return None
+        return {"pid": header.get("pid"), **header["metrics"]}
+
+    # --- Requests ---
+
+    def request(self, header, payload=b"", retries=1):
+        """
+        Sends a request and waits for the response.
+
+        A broken connection or a timeout is treated as a dead/hung worker:
+        the worker is restarted and the request is sent again.
+
+        Returns:
+            tuple: (response header, response payload)
+
+        Raises:
+            WorkerError: If the worker keeps failing or reports an error.
+        """
+        for attempt in range(retries + 1):
+            try:
+                self.ensure_running()
+                send_message(self.sock, header, payload)
+                response, response_payload = recv_message(self.sock)
+            except (OSError, ConnectionError, ValueError) as e:
+                print(f"⚠️  Worker connection failed: {e}")
+                if attempt >= retries:
+                    raise WorkerError(str(e), transient=True) from e
+                self.recover(e)
+                continue
+
+            if response.get("status") != "ok":
+                raise WorkerError.from_response(response)
+
+            return response, response_payload
+
+    def _send(self, header, payload=b""):
+        """
+        Sends a request that is answered with several messages, restarting
+        the worker once if it cannot be reached.
+        """
+        for attempt in range(2):
+            try:
+                self.ensure_running()
+                send_message(self.sock, header, payload)
+                return
+            except (OSError, ConnectionError) as e:
+                print(f"⚠️  Worker connection failed: {e}")
+                if attempt:
+                    raise WorkerError(str(e), transient=True) from e
+                self.recover(e)
+
+    def _iter_responses(self):
+        """
+        Yields the (header, payload) messages of a multi-message response
+        until the final "done" message.
+
+        Once messages have been consumed the request cannot be replayed, so
+        a dead worker is restarted and the failure reported. If the caller
+        stops iterating early, the connection is dropped so the worker stops
+        the remaining work.
+        """
+        done = False
+        try:
+            while True:
+                try:
+                    response, payload = recv_message(self.sock)
+                except (OSError, ConnectionError, ValueError) as e:
+                    self.recover(e)
+                    raise WorkerError(f"Worker failed mid-request: {e}", transient=True) from e
+
+                if response.get("done"):
+                    done = True
+                    return
+                yield response, payload
+        finally:
+            if not done:
+                self._disconnect()
+
+    def synthesize(self, text, output_file, sample_file, language='en', speed=1.0):
+        """
+        Generates audio for one chunk and saves it to output_file.
+        """
+        response, _ = self.request({
+            "op": "synthesize",
+            "text": text,
+            "output_file": os.path.abspath(os.path.expanduser(output_file)),
+            "sample_file": sample_id(sample_file),
+            "language": language,
+            "speed": speed
+        })
+        return response
+
+    def synthesize_pcm(self, text, sample_file, language='en', speed=1.0, dtype="float32"):
+        """
+        Generates audio for one chunk and returns the raw samples, without
+        any intermediate file or lossy encode.
+
+        Returns:
+            tuple: (samples as a mono NumPy array, sample rate)
+        """
+        response, payload = self.request({
+            "op": "synthesize",
+            "text": text,
+            "sample_file": sample_id(sample_file),
+            "language": language,
+            "speed": speed,
+            "dtype": dtype
+        })
+        return decode_pcm(response, payload)
+
+
+    def stream_pcm(self, text, sample_file, language='en', speed=1.0, dtype="float32",
+                   stream_chunk_size=20):
+        """
+        Generates audio for one chunk and yields it in PCM frames as soon as
+        the model produces them.
+
+        Yields:
+            tuple: (samples as a mono NumPy array, sample rate)
+        """
+        self._send({
+            "op": "stream",
+            "text": text,
+            "sample_file": sample_id(sample_file),
+            "language": language,
+            "speed": speed,
+            "dtype": dtype,
+            "stream_chunk_size": stream_chunk_size
+        })
+
+        for response, payload in self._iter_responses():
+            if response.get("status") != "ok":
+                raise WorkerError.from_response(response)
+            yield decode_pcm(response, payload)
+
+    def synthesize_batch(self, chunks, sample_file, language='en', speed=1.0, dtype="float32"):
+        """
+        Generates several chunks in one request; the worker computes the
+        voice latents once and runs the chunks back to back.
+
+        Args:
+            chunks: Dict {chunk_id: text}.
+
+        Yields:
+            tuple: (chunk_id, (samples, sample_rate) or None, WorkerError
+                or None) as each chunk finishes.
+        """
+        self._send({
+            "op": "batch",
+            "chunks": [{"id": chunk_id, "text": text} for chunk_id, text in chunks.items()],
+            "sample_file": sample_id(sample_file),
+            "language": language,
+            "speed": speed,
+            "dtype": dtype
+        })
+        # Ids come back through JSON; map them to the caller's keys
+        ids = {str(chunk_id): chunk_id for chunk_id in chunks}
+
+        for response, payload in self._iter_responses():
+            if "id" not in response:
+                raise WorkerError.from_response(response)
+
+            chunk_id = ids.get(str(response["id"]), response["id"])
+            if response["status"] == "ok":
+                yield chunk_id, decode_pcm(response, payload), None
+            else:
+                yield chunk_id, None, WorkerError.from_response(response)
+
+
+def partition_cpus(num_workers, cpus=None):
+    """
+    Splits the CPUs available to this process into `num_workers` contiguous,
+    equally sized groups (the first groups get one extra CPU if needed).
+
+    Returns:
+        list: One list of CPU ids per worker.
+    """
+    if cpus is None:
+        if hasattr(os, "sched_getaffinity"):
+            cpus = sorted(os.sched_getaffinity(0))
+        else:
+            cpus = list(range(os.cpu_count() or 1))
+
+    groups = []
+    start = 0
+    for i in range(num_workers):
+        size = len(cpus) // num_workers + (1 if i < len(cpus) % num_workers else 0)
+        groups.append(cpus[start:start + max(size, 1)] or cpus[-1:])
+        start += size
+    return groups
+
+
+class WorkerPool:
+    """
+    A fixed set of XTTS workers that generate chunks concurrently.
+
+    The host CPUs are partitioned among the workers: each worker gets its
+    own group of cores and uses that many torch intra-op threads, so the
+    pool never runs more compute threads than there are cores. With
+    `pin_cpus`, each worker is also pinned to its group.
+    """
+
+    def __init__(self, folder_xtts, num_workers=2, socket_path=DEFAULT_SOCKET_PATH,
+                 use_cuda=True, pin_cpus=False, interop_threads=1, **worker_options):
+        root, ext = os.path.splitext(socket_path)
+        self.workers = []
+        # A worker connection serves one request at a time: callers check
+        # workers out of this queue and put them back when done
+        self.idle = queue.Queue()
+
+        for i, cpus in enumerate(partition_cpus(num_workers)):
+            self.workers.append(XttsWorker(
+                folder_xtts,
+                socket_path=f"{root}_{i}{ext}",
+                use_cuda=use_cuda,
+                threads=len(cpus),
+                interop_threads=interop_threads,
+                cpu_affinity=cpus if pin_cpus else None,
+                **worker_options
+            ))
+        for worker in self.workers:
+            self.idle.put(worker)
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """
+        Checks out an idle worker for the duration of a request.
+        """
+        worker = self.idle.get()
+        try:
+            yield worker
+        finally:
+            self.idle.put(worker)
+
+    def start(self):
+        """
+        Starts (or attaches to) all workers in parallel.
+        """
+        errors = []
+
+        def start_worker(worker):
+            try:
+                worker.ensure_running()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=start_worker, args=(w,)) for w in self.workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise WorkerError(f"{len(errors)} worker(s) failed to start: {errors[0]}")
+
+    def shutdown(self):
+        """
+        Stops all workers, waiting for in-flight requests to finish.
+        """
+        workers = [self.idle.get() for _ in self.workers]
+        try:
+            for worker in workers:
+                worker.shutdown()
+        finally:
+            for worker in workers:
+                self.idle.put(worker)
+
+    def metrics(self, reset=False):
+        """
+        Returns the metrics snapshots of the running workers.
+        """
+        snapshots = [worker.metrics(reset) for worker in self.workers]
+        return [snapshot for snapshot in snapshots if snapshot is not None]
+
+    def synthesize(self, *args, **kwargs):
+        with self.acquire() as worker:
+            return worker.synthesize(*args, **kwargs)
+
+    def synthesize_pcm(self, *args, **kwargs):
+        with self.acquire() as worker:
+            return worker.synthesize_pcm(*args, **kwargs)
+
+    def stream_pcm(self, *args, **kwargs):
+        with self.acquire() as worker:
+            yield from worker.stream_pcm(*args, **kwargs)
+
+    def synthesize_batch(self, chunks, sample_file, language='en', speed=1.0, dtype="float32"):
+        """
+        Generates the chunks on all workers concurrently. Each worker pulls
+        the next chunk from a shared queue, so faster workers take more.
+
+        Same interface as XttsWorker.synthesize_batch; results are yielded
+        in completion order, callers reorder them by chunk id.
+        """
+        tasks = queue.Queue()
+        for item in chunks.items():
+            tasks.put(item)
+        results = queue.Queue()
+        stop = threading.Event()
+
+        def run():
+            with self.acquire() as worker:
+                while not stop.is_set():
+                    try:
+                        chunk_id, text = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        for result in worker.synthesize_batch({chunk_id: text}, sample_file,
+                                                              language, speed, dtype):
+                            results.put(result)
+                    except Exception as e:
+                        # The exception itself is kept: retry.is_transient looks at it
+                        results.put((chunk_id, None, e))
+
+        num_threads = min(len(self.workers), len(chunks))
+        threads = [threading.Thread(target=run, daemon=True) for _ in range(num_threads)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for _ in range(len(chunks)):
+                yield results.get()
+        finally:
+            # If the caller stopped early, skip the remaining chunks. Either
+            # way, wait until every worker has read its final message and is
+            # back in the idle queue.
+            stop.set()
+            for thread in threads:
+                thread.join()